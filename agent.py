@@ -0,0 +1,487 @@
+"""
+Агент без графического интерфейса
+Управляет Config, APIClient, GameLauncher и процессами мониторинга через
+локальный JSON-RPC 2.0 (Unix сокет на Linux, именованный канал на Windows),
+PyQt5 не загружается. Подходит для киоск-оболочек клубов и автотестов запуска.
+
+Сообщения передаются кадрами multiprocessing.connection (send_bytes/recv_bytes),
+подключение проверяется ключом из файла agent.key в каталоге конфигурации.
+
+Запуск агента:   python agent.py serve [--launcher steam=launchers.testing:FakeLauncher]
+Команды:         python agent.py status | games | launch <id> [--hours N] | cancel | end | shutdown
+Профилирование:  python agent.py profile start [--interval-ms 5] | stop | status
+Любой метод:     python agent.py call <метод> [--params '{"game_id": 1}']
+"""
+import argparse
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+from typing import Optional, Dict, Any, Callable
+
+from config import get_config_dir
+from launch_state import LaunchBusyError, IDLE, RUNNING
+
+logger = logging.getLogger(__name__)
+
+PIPE_ADDRESS = r'\\.\pipe\RentalDesktopAgent'
+
+# Коды ошибок JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+APPLICATION_ERROR = -32000
+
+
+def default_address() -> str:
+    """Адрес канала управления по умолчанию"""
+    if sys.platform == 'win32':
+        return PIPE_ADDRESS
+    return str(get_config_dir() / "agent.sock")
+
+
+def _family(address: str) -> str:
+    return 'AF_PIPE' if address.startswith('\\\\') else 'AF_UNIX'
+
+
+def load_authkey(create: bool = False) -> bytes:
+    """Ключ доступа к каналу управления (создается агентом при первом запуске)"""
+    key_file = get_config_dir() / "agent.key"
+    if key_file.exists():
+        return key_file.read_bytes()
+    if not create:
+        raise FileNotFoundError(f"Ключ агента не найден: {key_file}. Агент запущен?")
+    key = secrets.token_hex(32).encode('ascii')
+    fd = os.open(str(key_file), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+class RPCError(Exception):
+    """Ошибка, возвращаемая клиенту в поле error"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class AgentService:
+    """Методы агента, доступные через канал управления"""
+
+    def __init__(self, config, api_client, game_launcher):
+        from scheduler import get_scheduler
+        from profiler import ProfilerControl, hot_path_stats
+
+        self.config = config
+        self.api_client = api_client
+        self.game_launcher = game_launcher
+        self.scheduler = get_scheduler()
+        self.started_at = time.time()
+        self.hot_path_stats = hot_path_stats
+        # Профилирование агента и процессов мониторинга по требованию
+        self.profiling = ProfilerControl(config.config_dir / "profiles", "agent",
+                                         game_launcher.set_monitor_profiling)
+
+        self._monitor_task = None
+        self.stop_requested = threading.Event()
+        # Состояние запуска ведет GameLauncher; агент по переходам включает
+        # и выключает проверку процесса игры
+        game_launcher.launch_state.subscribe(self._on_launch_state)
+
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "status": self.status,
+            "metrics": self.metrics,
+            "games.list": self.list_games,
+            "game.launch": self.launch_game,
+            "game.cancel": self.cancel_launch,
+            "rental.active": self.active_rental,
+            "rental.end": self.end_rental,
+            "key.set": self.set_key,
+            "profile.start": self.profile_start,
+            "profile.stop": self.profile_stop,
+            "profile.status": self.profile_status,
+            "agent.shutdown": self.shutdown,
+        }
+
+    def dispatch(self, method: str, params: Any) -> Any:
+        func = self.methods.get(method)
+        if func is None:
+            raise RPCError(METHOD_NOT_FOUND, f"Неизвестный метод: {method}")
+        try:
+            if isinstance(params, dict):
+                return func(**params)
+            if isinstance(params, list):
+                return func(*params)
+            return func()
+        except TypeError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+
+    # Методы
+
+    def status(self) -> Dict[str, Any]:
+        launch = self.game_launcher.launch_state.snapshot
+        session = self.game_launcher.current_session
+        monitor = self.game_launcher.monitor_process
+        game_process = self.game_launcher.game_process
+        return {
+            "state": launch.state,
+            "error": launch.error,
+            "cancelled": launch.cancelled,
+            "pc_key_set": bool(self.api_client.pc_key),
+            "session_id": session.id if session else None,
+            "game": {"id": launch.game_id, "title": launch.game_title} if launch.busy else None,
+            "game_pid": getattr(game_process, 'pid', None),
+            "monitor_pid": monitor.pid if monitor else None,
+            "monitors": self.game_launcher.monitor_status(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "rss_mb": self._rss_mb(),
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "api": self.api_client.get_stats(),
+            "scheduler": self.scheduler.stats(),
+            "launchers_loaded": self.game_launcher.launchers.loaded(),
+            "last_session": self.game_launcher.last_session_summary,
+            "hot_paths": self.hot_path_stats(),
+        }
+
+    def list_games(self, search: Optional[str] = None) -> list:
+        return [
+            {"id": game.id, "title": game.title, "available_accounts": game.available_accounts}
+            for game in self.api_client.get_games(search)
+        ]
+
+    def launch_game(self, game_id: int, duration_hours: int = 1) -> Dict[str, Any]:
+        """Начинает запуск игры в фоне; ход запуска виден в status"""
+        if self.game_launcher.launch_state.busy:
+            # Проверка до запроса каталога; окончательно решает begin
+            raise RPCError(APPLICATION_ERROR, f"Уже выполняется: {self.game_launcher.launch_state.state}")
+        game = self.api_client.get_game(int(game_id))
+        try:
+            generation = self.game_launcher.request_launch(game, int(duration_hours))
+        except LaunchBusyError as e:
+            raise RPCError(APPLICATION_ERROR, str(e))
+        return {"accepted": True, "game": game.title, "generation": generation}
+
+    def cancel_launch(self) -> Dict[str, Any]:
+        return {"cancelled": self.game_launcher.cancel_launch()}
+
+    def _on_launch_state(self, snapshot):
+        if snapshot.state == RUNNING:
+            self.scheduler.cancel(self._monitor_task)
+            self._monitor_task = self.scheduler.call_every(2, self._check_game, name="agent-game-monitor")
+        elif snapshot.state == IDLE:
+            self.scheduler.cancel(self._monitor_task)
+            self._monitor_task = None
+
+    def _check_game(self):
+        task = self._monitor_task
+        if task is None or task.cancelled:
+            return
+        if not self.game_launcher.monitor_game():
+            task.cancel()
+            logger.info("Игра закрыта, сессия завершена")
+
+    def active_rental(self) -> Optional[Dict[str, Any]]:
+        rental = self.api_client.get_active_rental()
+        if rental is None:
+            return None
+        return {
+            "id": rental.id,
+            "game_title": rental.game_title,
+            "remaining_hours": rental.remaining_hours,
+            "planned_duration_hours": rental.planned_duration_hours,
+        }
+
+    def end_rental(self) -> Dict[str, Any]:
+        if self._monitor_task:
+            self.scheduler.cancel(self._monitor_task)
+            self._monitor_task = None
+        had_session = self.game_launcher.launch_state.busy
+        if had_session:
+            # Во время запуска - отмена; конвейер сам завершит аренду
+            self.game_launcher.end_session()
+        else:
+            self.api_client.end_rental()
+        return {"ended": True, "had_session": had_session}
+
+    def set_key(self, pc_key: str) -> Dict[str, Any]:
+        if not self.config.save_key(pc_key):
+            raise RPCError(APPLICATION_ERROR, "Не удалось сохранить ключ")
+        self.api_client.set_key(pc_key)
+        return {"saved": True}
+
+    def profile_start(self, interval_ms: float = 5, monitors: bool = True) -> Dict[str, Any]:
+        if not 1 <= interval_ms <= 1000:
+            raise RPCError(INVALID_PARAMS, "interval_ms должен быть от 1 до 1000")
+        return self.profiling.start(interval_ms / 1000, monitors)
+
+    def profile_stop(self) -> Dict[str, Any]:
+        return self.profiling.stop()
+
+    def profile_status(self) -> Dict[str, Any]:
+        status = self.profiling.status()
+        status["monitors"] = [
+            {"pid": monitor["pid"], "role": monitor["role"], "profiling": monitor.get("profiling")}
+            for monitor in self.game_launcher.monitor_status()
+        ]
+        return status
+
+    def shutdown(self) -> Dict[str, Any]:
+        self.stop_requested.set()
+        return {"stopping": True}
+
+    @staticmethod
+    def _rss_mb() -> Optional[float]:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+        except Exception:
+            return None
+
+
+class ControlServer:
+    """Сервер канала управления: по потоку на подключение"""
+
+    def __init__(self, service: AgentService, address: str, authkey: bytes):
+        self.service = service
+        self.address = address
+        self.authkey = authkey
+        self._listener: Optional[Listener] = None
+        self._closed = threading.Event()
+
+    def start(self):
+        family = _family(self.address)
+        if family == 'AF_UNIX' and os.path.exists(self.address):
+            # Сокет от предыдущего запуска, завершившегося аварийно
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family=family, authkey=self.authkey)
+        if family == 'AF_UNIX':
+            os.chmod(self.address, 0o600)
+        threading.Thread(target=self._accept_loop, name="agent-accept", daemon=True).start()
+        logger.info("Канал управления агента: %s", self.address)
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed.is_set():
+                    return
+                logger.warning("Ошибка подключения к агенту", exc_info=True)
+                continue
+            except Exception as e:
+                # Неверный ключ доступа (AuthenticationError) и т.п.
+                logger.warning("Отклонено подключение к агенту: %s", e)
+                continue
+            threading.Thread(target=self._serve, args=(conn,), name="agent-conn", daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while not self._closed.is_set():
+                try:
+                    raw = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                response = self.handle(raw)
+                if response is not None:
+                    try:
+                        conn.send_bytes(response)
+                    except OSError:
+                        return
+
+    def handle(self, raw: bytes) -> Optional[bytes]:
+        """Обрабатывает одно сообщение JSON-RPC; для уведомлений ответа нет"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(raw)
+            except ValueError:
+                raise RPCError(PARSE_ERROR, "Некорректный JSON")
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RPCError(INVALID_REQUEST, "Ожидается объект с полем method")
+            request_id = request.get("id")
+            result = self.service.dispatch(request["method"], request.get("params"))
+            if "id" not in request:
+                return None
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RPCError as e:
+            response = {"jsonrpc": "2.0", "id": request_id,
+                        "error": {"code": e.code, "message": e.message, "data": e.data}}
+        except Exception as e:
+            status = getattr(e, 'status', None)
+            logger.warning("Ошибка метода агента: %s", e)
+            response = {"jsonrpc": "2.0", "id": request_id,
+                        "error": {"code": APPLICATION_ERROR, "message": str(e),
+                                  "data": {"type": type(e).__name__, "status": status}}}
+        return json.dumps(response, ensure_ascii=False, default=str).encode('utf-8')
+
+    def close(self):
+        self._closed.set()
+        if self._listener:
+            self._listener.close()
+            self._listener = None
+        if _family(self.address) == 'AF_UNIX' and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class AgentClient:
+    """Клиент канала управления"""
+
+    def __init__(self, address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.address = address or default_address()
+        self.conn = Client(self.address, family=_family(self.address), authkey=authkey or load_authkey())
+        self._next_id = 1
+
+    def call(self, method: str, **params) -> Any:
+        request_id = self._next_id
+        self._next_id += 1
+        self.conn.send_bytes(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                                         "params": params}).encode('utf-8'))
+        response = json.loads(self.conn.recv_bytes())
+        if "error" in response:
+            error = response["error"]
+            raise RPCError(error.get("code", APPLICATION_ERROR), error.get("message", ""), error.get("data"))
+        return response.get("result")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def serve(args) -> int:
+    """Запускает агент и ждет agent.shutdown или сигнала завершения"""
+    started = time.perf_counter()
+    from config import Config
+    from api_client import APIClient
+    from api_errors import APIError
+    from app_logging import setup_logging
+    from game_launcher import GameLauncher
+
+    config = Config()
+    setup_logging("agent", config.get_setting('log_level', 'INFO'), config.get_setting('log_levels'))
+    api_client = APIClient.from_config(config)
+    pc_key = config.load_key()
+    if pc_key:
+        api_client.set_key(pc_key)
+    else:
+        logger.warning("Ключ ПК не задан; задайте его методом key.set")
+
+    game_launcher = GameLauncher(api_client, config)
+    for override in args.launcher or []:
+        platform, _, spec = override.partition('=')
+        game_launcher.launchers.register(platform, spec)
+
+    service = AgentService(config, api_client, game_launcher)
+    if config.get_setting('profiling', False):
+        service.profiling.start()
+    server = ControlServer(service, args.address or default_address(), load_authkey(create=True))
+    server.start()
+    logger.info("Агент запущен за %.0f мс, память %s МБ", (time.perf_counter() - started) * 1000, service._rss_mb())
+
+    if pc_key and args.check_key:
+        try:
+            api_client.bootstrap()
+        except APIError as e:
+            logger.warning("Не удалось проверить ключ: %s", e)
+
+    import signal
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            signal.signal(sig, lambda *_: service.stop_requested.set())
+        except (ValueError, OSError):
+            pass
+
+    try:
+        while not service.stop_requested.wait(0.5):
+            pass
+    finally:
+        server.close()
+        if service.profiling.running:
+            service.profiling.stop()
+        if game_launcher.launch_state.busy:
+            logger.info("Завершаем активную сессию перед остановкой агента")
+            game_launcher.end_session()
+            # Прерванный запуск сворачивается в своем потоке
+            game_launcher.launch_state.wait_for([IDLE], timeout=30)
+    return 0
+
+
+def run_command(args) -> int:
+    """Выполняет команду CLI через работающий агент"""
+    if args.command == "call":
+        method = args.method
+        params = json.loads(args.params) if args.params else {}
+    elif args.command == "launch":
+        method, params = "game.launch", {"game_id": args.game_id, "duration_hours": args.hours}
+    elif args.command == "profile":
+        method = f"profile.{args.action}"
+        params = {"interval_ms": args.interval_ms} if args.action == "start" else {}
+    else:
+        method = {"status": "status", "games": "games.list", "end": "rental.end",
+                  "shutdown": "agent.shutdown", "metrics": "metrics", "cancel": "game.cancel"}[args.command]
+        params = {}
+
+    try:
+        with AgentClient(args.address) as client:
+            result = client.call(method, **params)
+    except RPCError as e:
+        print(json.dumps({"error": {"code": e.code, "message": e.message, "data": e.data}},
+                         ensure_ascii=False, indent=2), file=sys.stderr)
+        return 1
+    except (OSError, FileNotFoundError) as e:
+        print(f"Агент недоступен: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Агент Rental Games Desktop без графического интерфейса")
+    parser.add_argument("--address", help="Адрес канала управления (Unix сокет или \\\\.\\pipe\\имя)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Запустить агент")
+    serve_parser.add_argument("--launcher", action="append", metavar="ПЛАТФОРМА=МОДУЛЬ:КЛАСС",
+                              help="Подменить плагин лаунчера (например, steam=launchers.testing:FakeLauncher)")
+    serve_parser.add_argument("--no-check-key", dest="check_key", action="store_false",
+                              help="Не проверять ключ ПК при запуске")
+
+    commands.add_parser("status", help="Состояние агента")
+    commands.add_parser("metrics", help="Счетчики API и планировщика")
+    commands.add_parser("games", help="Список игр")
+    launch_parser = commands.add_parser("launch", help="Запустить игру")
+    launch_parser.add_argument("game_id", type=int)
+    launch_parser.add_argument("--hours", type=int, default=1)
+    commands.add_parser("cancel", help="Отменить идущий запуск")
+    commands.add_parser("end", help="Завершить аренду")
+    commands.add_parser("shutdown", help="Остановить агент")
+    profile_parser = commands.add_parser("profile", help="Профилирование агента и мониторов")
+    profile_parser.add_argument("action", choices=["start", "stop", "status"])
+    profile_parser.add_argument("--interval-ms", type=float, default=5, help="Период выборки, мс")
+    call_parser = commands.add_parser("call", help="Вызвать метод JSON-RPC")
+    call_parser.add_argument("method")
+    call_parser.add_argument("--params", help="Параметры в JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        return serve(args)
+    return run_command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
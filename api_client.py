@@ -1,87 +1,455 @@
 """
 Клиент для работы с API бэкенда
 """
+import logging
+import random
+import re
+import threading
+import time
 import requests
-from typing import Optional, Dict, List, Any
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Any, Tuple, Callable, Iterator
+from json_stream import iter_json_array
+from profiler import timed
+from models import Game, Session, Rental, TwoFactorResponse, loads
+from api_errors import (APIError, NetworkError, ServerError, ClientError, ActiveRentalError,
+                        CircuitOpenError, error_from_status, parse_retry_after)
+from api_transport import Transport, RequestsTransport, create_transport
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Ограничитель частоты запросов (token bucket)"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """Забирает токен, при необходимости ожидая; возвращает время ожидания"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RetryPolicy:
+    """Политика повторов: экспоненциальная задержка со случайным разбросом"""
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0,
+                 max_retry_after: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+    
+    def delay_for(self, attempt: int, error: APIError) -> Optional[float]:
+        """Задержка перед повтором номер attempt (с 1) или None - не повторять"""
+        if not error.retryable or attempt >= self.max_attempts:
+            return None
+        if isinstance(error, CircuitOpenError):
+            # Предохранитель для того и нужен, чтобы не ждать впустую
+            return None
+        if error.retry_after is not None:
+            if error.retry_after > self.max_retry_after:
+                return None
+            return error.retry_after
+        # "Full jitter": равномерно от 0 до экспоненциальной границы
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Предохранитель эндпоинта
+    
+    После failure_threshold подряд идущих сбоев (сеть/5xx) эндпоинт считается
+    недоступным на reset_timeout секунд: запросы сразу получают CircuitOpenError.
+    Затем пропускается один пробный запрос (half-open).
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def before_request(self, endpoint: str):
+        """Проверяет, можно ли отправить запрос"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(f"Эндпоинт {endpoint} временно недоступен", retry_after=remaining)
+                self.state = self.HALF_OPEN
+                return
+            if self.state == self.HALF_OPEN:
+                # Пробный запрос уже идет
+                raise CircuitOpenError(f"Эндпоинт {endpoint} временно недоступен",
+                                       retry_after=self.reset_timeout)
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+    
+    def record_failure(self, error: APIError):
+        with self._lock:
+            # Ошибки клиента (4xx) не говорят о недоступности бэкенда
+            if not isinstance(error, (NetworkError, ServerError)):
+                if self.state == self.HALF_OPEN:
+                    self.state = self.CLOSED
+                    self._failures = 0
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def record_aborted(self):
+        """Запрос прерван исключением без ответа бэкенда
+        
+        Пробный запрос не должен занимать half-open навсегда: предохранитель
+        снова открывается, следующая проба - через reset_timeout.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class _InFlightCall:
+    """Выполняющийся запрос, результат которого ждут несколько потоков"""
+    
+    __slots__ = ('event', 'result', 'error')
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые вызовы в один"""
+    
+    def __init__(self):
+        self._calls: Dict[Any, _InFlightCall] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Выполняет func или ждет уже идущий вызов с тем же ключом
+        
+        Returns:
+            (результат, был ли вызов объединен с уже идущим)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+
+@dataclass(frozen=True)
+class Bootstrap:
+    """Данные для старта приложения: активная аренда (она же проверка ключа) и каталог"""
+    pc_key: str
+    active_rental: Optional[Rental]
+    # None - каталог не получен (ошибка в games_error) или не запрашивался; ключ при этом проверен
+    games: Optional[List[Game]]
+    games_error: Optional[Exception] = None
+    # Получено одним запросом /club/bootstrap
+    combined: bool = False
+    fetched_at: float = 0.0
 
-class ActiveRentalError(Exception):
-    """Исключение для случая, когда у ПК уже есть активная аренда"""
-    pass
 
 class APIClient:
     """Клиент для взаимодействия с API бэкенда"""
     
-    def __init__(self, base_url: str = "https://passplay.ru"):
+    # Лимиты по умолчанию: эндпоинт -> (запросов в секунду, размер всплеска)
+    DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+        '/club/rental/2fa': (0.5, 3),
+        '/club/rental/active': (2.0, 5),
+        '/club/rental/start': (0.5, 2),
+        '/club/rental/end': (1.0, 3),
+        '*': (5.0, 10),
+    }
+    
+    # Объединенный запрос старта; старые бэкенды отвечают на него 404/405/501
+    BOOTSTRAP_ENDPOINT = '/club/bootstrap'
+    BOOTSTRAP_UNSUPPORTED_STATUSES = (404, 405, 501)
+    
+    def __init__(self, base_url: str = "https://passplay.ru",
+                 rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+                 retry_policy: Optional[RetryPolicy] = None, transport: Optional[Transport] = None):
         self.base_url = base_url.rstrip('/')
         self.pc_key: Optional[str] = None
+        # Сеть, запись или воспроизведение запросов (см. api_transport)
+        self.transport = transport or RequestsTransport()
+        
+        self.rate_limits = dict(self.DEFAULT_RATE_LIMITS)
+        if rate_limits:
+            self.rate_limits.update(rate_limits)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # None - поддержка /club/bootstrap еще не известна
+        self.bootstrap_supported: Optional[bool] = None
+        self._bootstrap: Optional[Bootstrap] = None
+        
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "coalesced": 0, "throttled": 0,
+                                      "retries": 0, "circuit_open": 0}
+    
+    @classmethod
+    def from_config(cls, config) -> 'APIClient':
+        """Клиент с адресом и транспортом из настроек приложения"""
+        transport = create_transport(
+            record_file=config.get_setting('api_record_file'),
+            replay_file=config.get_setting('api_replay_file'),
+            latency_scale=float(config.get_setting('api_replay_latency', 1.0)),
+        )
+        return cls(config.get_api_base_url(), transport=transport)
     
     def set_key(self, pc_key: str):
         """Устанавливает ключ ПК для аутентификации"""
+        if pc_key != self.pc_key:
+            self._bootstrap = None
         self.pc_key = pc_key
     
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Выполняет HTTP запрос к API"""
-        url = f"{self.base_url}/api{endpoint}"
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает счетчики запросов: отправленные, объединенные, задержанные"""
+        with self._stats_lock:
+            return dict(self.stats)
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    @staticmethod
+    def _endpoint_group(endpoint: str) -> str:
+        """Нормализует эндпоинт для лимитов: /games/42 -> /games/{id}"""
+        return re.sub(r'/\d+(?=/|$)', '/{id}', endpoint)
+    
+    def _bucket_for(self, endpoint: str) -> TokenBucket:
+        group = self._endpoint_group(endpoint)
+        with self._buckets_lock:
+            bucket = self._buckets.get(group)
+            if bucket is None:
+                rate, burst = self.rate_limits.get(group) or self.rate_limits['*']
+                bucket = TokenBucket(rate, burst)
+                self._buckets[group] = bucket
+            return bucket
+    
+    def _breaker_for(self, endpoint: str) -> CircuitBreaker:
+        group = self._endpoint_group(endpoint)
+        with self._buckets_lock:
+            breaker = self._breakers.get(group)
+            if breaker is None:
+                breaker = CircuitBreaker()
+                self._breakers[group] = breaker
+            return breaker
+    
+    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, params: Optional[Dict] = None,
+                      retry: Optional[bool] = None) -> Dict[str, Any]:
+        """Выполняет HTTP запрос к API
         
-        try:
+        Одновременные одинаковые GET запросы из разных потоков объединяются
+        в один сетевой вызов; все запросы проходят через лимит эндпоинта.
+        
+        Args:
+            retry: Повторять ли запрос по политике повторов. По умолчанию
+                повторяются только GET; для POST повтор безопасен не всегда.
+        """
+        if retry is None:
+            retry = method.upper() == 'GET'
+        
+        with timed(f"api {method.upper()} {self._endpoint_group(endpoint)}"):
             if method.upper() == 'GET':
-                response = requests.get(url, params=params, timeout=30)
-            elif method.upper() == 'POST':
-                response = requests.post(url, json=data, timeout=30)
-            else:
-                raise ValueError(f"Неподдерживаемый метод: {method}")
-            
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            # Пытаемся получить детали ошибки из ответа
-            error_details = None
-            error_msg = None
-            status_code = None
-            
-            if hasattr(e, 'response') and e.response is not None:
-                status_code = e.response.status_code
-                try:
-                    error_data = e.response.json()
-                    error_details = error_data
-                    if isinstance(error_data, dict):
-                        error_msg = error_data.get('message') or error_data.get('error') or str(e)
-                        print(f"Ошибка API ({status_code}): {error_msg}")
-                        print(f"Полный ответ сервера: {error_data}")
-                        # Пробрасываем исключение с полным сообщением
-                        raise Exception(f"{status_code} {error_msg}")
-                except (ValueError, AttributeError):
-                    # Если не JSON, выводим текст ответа
-                    error_text = e.response.text[:1000] if hasattr(e.response, 'text') else str(e)
-                    error_msg = error_text
-                    print(f"Ошибка API ({status_code}): {error_text}")
-                    raise Exception(f"{status_code} Server Error: {error_text}")
+                key = (endpoint, tuple(sorted((params or {}).items())))
+                result, coalesced = self._single_flight.do(
+                    key, lambda: self._request_with_retry(method, endpoint, data, params, retry)
+                )
+                if coalesced:
+                    self._count("coalesced")
+                return result
             
-            # Если не удалось получить детали
-            raise Exception(f"{status_code or 'Unknown'} HTTP Error: {str(e)}")
-            
-            print(f"Ошибка API запроса: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Статус: {e.response.status_code}")
-                print(f"Ответ: {e.response.text[:500]}")
+            return self._request_with_retry(method, endpoint, data, params, retry)
+    
+    def _request_with_retry(self, method: str, endpoint: str, data: Optional[Dict], params: Optional[Dict],
+                            retry: bool, stream: bool = False) -> Any:
+        """Выполняет запрос с повторами по политике"""
+        attempt = 1
+        while True:
+            try:
+                return self._throttled_request(method, endpoint, data, params, stream)
+            except APIError as e:
+                delay = self.retry_policy.delay_for(attempt, e) if retry else None
+                if delay is None:
+                    raise
+                self._count("retries")
+                logger.warning("Повтор запроса %s %s через %.1f с (попытка %s): %s", method, endpoint, delay,
+                               attempt + 1, e)
+                time.sleep(delay)
+                attempt += 1
+    
+    def _throttled_request(self, method: str, endpoint: str, data: Optional[Dict], params: Optional[Dict],
+                           stream: bool = False) -> Any:
+        """Проверяет предохранитель, ждет токен лимита эндпоинта и выполняет запрос"""
+        breaker = self._breaker_for(endpoint)
+        try:
+            breaker.before_request(endpoint)
+        except CircuitOpenError:
+            self._count("circuit_open")
             raise
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка API запроса: {e}")
+        
+        if self._bucket_for(endpoint).acquire() > 0:
+            self._count("throttled")
+        self._count("requests")
+        try:
+            result = self._send_request(method, endpoint, data, params, stream)
+        except APIError as e:
+            breaker.record_failure(e)
+            raise
+        except BaseException:
+            breaker.record_aborted()
             raise
+        breaker.record_success()
+        return result
     
-    def get_games(self, search: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Получает список игр"""
+    def _send_request(self, method: str, endpoint: str, data: Optional[Dict] = None, params: Optional[Dict] = None,
+                      stream: bool = False) -> Any:
+        """Отправляет HTTP запрос и разбирает ответ
+        
+        Args:
+            stream: Вернуть успешный ответ без чтения тела (см. _iter_array)
+        
+        Raises:
+            APIError: типизированная ошибка (см. api_errors)
+        """
+        url = f"{self.base_url}/api{endpoint}"
+        
+        try:
+            response = self.transport.request(method, url, params=params, json=data, timeout=30, stream=stream)
+        except requests.exceptions.RequestException as e:
+            logger.error("Ошибка API запроса: %s", e)
+            raise NetworkError(str(e)) from e
+        
+        if response.status_code < 400 and stream:
+            return response
+        if response.status_code < 400:
+            try:
+                return loads(response.content)
+            except ValueError as e:
+                raise ServerError(f"Некорректный JSON в ответе: {e}", status=response.status_code) from e
+        
+        raise self._error_from_response(response)
+    
+    @staticmethod
+    def _error_from_response(response) -> APIError:
+        """Создает типизированное исключение по ответу с ошибкой"""
+        status = response.status_code
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        payload = None
+        code = None
+        try:
+            payload = loads(response.content)
+        except ValueError:
+            pass
+        
+        if isinstance(payload, dict):
+            message = payload.get('message') or payload.get('error') or response.reason or 'HTTP Error'
+            code = payload.get('code') or payload.get('errorCode')
+            logger.error("Ошибка API (%s): %s", status, message)
+            logger.debug("Полный ответ сервера: %s", payload)
+        else:
+            # Если не JSON, выводим текст ответа
+            message = response.text[:1000] or response.reason or 'HTTP Error'
+            logger.error("Ошибка API (%s): %s", status, message)
+        
+        return error_from_status(status, message, code=str(code) if code is not None else None,
+                                 retry_after=retry_after, payload=payload)
+    
+    # Размер порции при потоковом чтении ответа (после распаковки)
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    def _iter_array(self, endpoint: str, params: Optional[Dict] = None) -> Iterator[Any]:
+        """Элементы JSON массива из ответа по мере его загрузки
+        
+        Запрос повторяется по политике только до начала ответа; обрыв
+        посреди тела - NetworkError, поврежденный JSON - ServerError.
+        """
+        # Время всей загрузки, включая обработку элементов вызывающим
+        with timed(f"api GET {self._endpoint_group(endpoint)} (stream)"):
+            response = self._request_with_retry('GET', endpoint, None, params, True, stream=True)
+            try:
+                yield from iter_json_array(response.iter_content(self.STREAM_CHUNK_SIZE))
+            except requests.exceptions.RequestException as e:
+                logger.error("Обрыв ответа %s: %s", endpoint, e)
+                raise NetworkError(str(e)) from e
+            except ValueError as e:
+                raise ServerError(f"Некорректный JSON в ответе: {e}", status=response.status_code) from e
+            finally:
+                response.close()
+    
+    def iter_games(self, search: Optional[str] = None) -> Iterator[Game]:
+        """Каталог по мере загрузки: игры отдаются, пока ответ еще идет"""
         params = {}
         if search:
             params['search'] = search
         
-        return self._make_request('GET', '/games', params=params)
+        for item in self._iter_array('/games', params):
+            yield Game.from_dict(item)
     
-    def get_game(self, game_id: int) -> Dict[str, Any]:
+    def get_games(self, search: Optional[str] = None) -> List[Game]:
+        """Получает список игр"""
+        # Одновременные загрузки каталога объединяются, как GET в _make_request
+        games, coalesced = self._single_flight.do(('games', search), lambda: list(self.iter_games(search)))
+        if coalesced:
+            self._count("coalesced")
+            # Список у каждого вызывающего свой
+            return list(games)
+        return games
+    
+    def get_game(self, game_id: int) -> Game:
         """Получает информацию об игре"""
-        return self._make_request('GET', f'/games/{game_id}')
+        return Game.from_dict(self._make_request('GET', f'/games/{game_id}'))
     
-    def start_rental(self, game_id: int, duration_hours: int = 1, auto_end_active: bool = True) -> Dict[str, Any]:
+    def start_rental(self, game_id: int, duration_hours: int = 1, auto_end_active: bool = True) -> Session:
         """Начинает аренду игры
         
         Args:
@@ -98,32 +466,31 @@ class APIClient:
             "durationHours": duration_hours
         }
         
+        self._bootstrap = None
         try:
-            return self._make_request('POST', '/club/rental/start', data=data)
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # Проверяем, это ли ошибка об активной аренде (400 Bad Request)
-            # Сообщение: "У этого ПК уже есть активная аренда. Завершите текущую сессию перед началом новой."
-            is_active_rental_error = (
-                ("400" in str(e) or "bad request" in error_msg) and
-                ("активная аренда" in error_msg or 
-                 "active rental" in error_msg or
-                 "уже есть активная" in error_msg or
-                 "завершите текущую" in error_msg or
-                 "already has active" in error_msg)
-            )
-            
-            if is_active_rental_error:
-                if auto_end_active:
-                    # Пробрасываем специальное исключение для обработки
-                    raise ActiveRentalError("У этого ПК уже есть активная аренда")
-                else:
-                    raise e
-            else:
-                raise e
-    
-    def get_2fa_code(self, session_id: Optional[int] = None) -> Dict[str, Any]:
+            response = self._make_request('POST', '/club/rental/start', data=data)
+        except ClientError as e:
+            # Ошибка об активной аренде (400 Bad Request), сообщение:
+            # "У этого ПК уже есть активная аренда. Завершите текущую сессию перед началом новой."
+            if auto_end_active and e.status == 400 and self._is_active_rental_error(e):
+                raise ActiveRentalError(e.message, code=e.code, payload=e.payload) from e
+            raise
+        
+        if not response.get('success') or not response.get('session'):
+            raise Exception("Не удалось начать аренду")
+        
+        return Session.from_dict(response['session'])
+    
+    # Фрагменты сообщений бэкенда об уже активной аренде
+    ACTIVE_RENTAL_MARKERS = ("активная аренда", "уже есть активная", "завершите текущую",
+                             "active rental", "already has active")
+    
+    @classmethod
+    def _is_active_rental_error(cls, error: APIError) -> bool:
+        message = (error.message or '').lower()
+        return any(marker in message for marker in cls.ACTIVE_RENTAL_MARKERS)
+    
+    def get_2fa_code(self, session_id: Optional[int] = None) -> TwoFactorResponse:
         """Получает код двухфакторной авторизации
         
         Args:
@@ -149,13 +516,13 @@ class APIClient:
                 # Бэкенд сам найдет активную сессию
                 pass
         
-        # Логируем данные запроса для отладки
-        print(f"Запрос 2FA на {self.base_url}/api/club/rental/2fa с данными: {data}")
+        # Ключ ПК в лог не пишем: отладочный лог уходит в файл с ротацией
+        logger.debug("Запрос 2FA на %s/api/club/rental/2fa, sessionId=%s", self.base_url, data.get("sessionId"))
         
-        return self._make_request('POST', '/club/rental/2fa', data=data)
+        return TwoFactorResponse.from_dict(self._make_request('POST', '/club/rental/2fa', data=data))
     
-    def get_active_rental(self) -> Dict[str, Any]:
-        """Получает активную аренду"""
+    def get_active_rental(self) -> Optional[Rental]:
+        """Получает активную аренду (None, если активной аренды нет)"""
         if not self.pc_key:
             raise ValueError("Ключ ПК не установлен")
         
@@ -163,7 +530,7 @@ class APIClient:
             "pcKey": self.pc_key
         }
         
-        return self._make_request('GET', '/club/rental/active', params=params)
+        return Rental.from_active_response(self._make_request('GET', '/club/rental/active', params=params))
     
     def end_rental(self, session_id: Optional[int] = None) -> Dict[str, Any]:
         """Завершает аренду"""
@@ -177,5 +544,94 @@ class APIClient:
         if session_id:
             data["sessionId"] = session_id
         
-        return self._make_request('POST', '/club/rental/end', data=data)
-
+        self._bootstrap = None
+        # Повторное завершение уже завершенной аренды безопасно
+        return self._make_request('POST', '/club/rental/end', data=data, retry=True)
+    
+    def bootstrap(self, max_age: float = 0.0, games: bool = True) -> Bootstrap:
+        """Активная аренда и каталог для старта приложения
+        
+        Сначала пробует объединенный запрос /club/bootstrap; если бэкенд его не
+        поддерживает, запрашивает аренду и каталог параллельно. Результат
+        запоминается: main.py проверяет им ключ, а главное окно берет из него
+        аренду без повторного запроса.
+        
+        Args:
+            max_age: Вернуть запомненный результат, если он не старше (секунд)
+            games: False - только аренда (games=None): каталог целиком ждать
+                не нужно, окно загрузит его потоком (iter_games)
+        
+        Raises:
+            APIError: Не удалось получить активную аренду (ClientError - ключ недействителен)
+        """
+        if not self.pc_key:
+            raise ValueError("Ключ ПК не установлен")
+        
+        cached = self._bootstrap
+        if (cached is not None and max_age > 0 and cached.pc_key == self.pc_key
+                and (not games or cached.games is not None)
+                and time.monotonic() - cached.fetched_at <= max_age):
+            return cached
+        
+        result, _ = self._single_flight.do(('bootstrap', self.pc_key, games),
+                                           lambda: self._fetch_bootstrap(games))
+        return result
+    
+    def _fetch_bootstrap(self, games: bool = True) -> Bootstrap:
+        pc_key = self.pc_key
+        result = None
+        if not games:
+            result = Bootstrap(pc_key=pc_key, active_rental=self.get_active_rental(), games=None,
+                               fetched_at=time.monotonic())
+        elif self.bootstrap_supported is not False:
+            try:
+                result = self._combined_bootstrap(pc_key)
+                self.bootstrap_supported = True
+            except APIError as e:
+                if e.status not in self.BOOTSTRAP_UNSUPPORTED_STATUSES:
+                    raise
+                logger.info("Бэкенд не поддерживает %s (%s), аренда и каталог запрашиваются параллельно",
+                            self.BOOTSTRAP_ENDPOINT, e.status)
+                self.bootstrap_supported = False
+        if result is None:
+            result = self._parallel_bootstrap(pc_key)
+        # Аренда могла измениться, пока шел запрос
+        if self.pc_key == pc_key:
+            self._bootstrap = result
+        return result
+    
+    def _combined_bootstrap(self, pc_key: str) -> Bootstrap:
+        """Один запрос: {"activeRental": <ответ /club/rental/active>, "games": [...]}"""
+        response = self._make_request('GET', self.BOOTSTRAP_ENDPOINT, params={"pcKey": pc_key})
+        games = response.get('games')
+        return Bootstrap(
+            pc_key=pc_key,
+            active_rental=Rental.from_active_response(response.get('activeRental') or {}),
+            games=[Game.from_dict(item) for item in games] if games is not None else None,
+            games_error=None if games is not None else ServerError("В ответе нет каталога"),
+            combined=True,
+            fetched_at=time.monotonic(),
+        )
+    
+    def _parallel_bootstrap(self, pc_key: str) -> Bootstrap:
+        """Аренда в текущем потоке, каталог - параллельно в отдельном"""
+        catalog: Dict[str, Any] = {}
+        
+        def fetch_games():
+            try:
+                catalog['games'] = self.get_games()
+            except Exception as e:
+                catalog['error'] = e
+        
+        thread = threading.Thread(target=fetch_games, name="bootstrap-games", daemon=True)
+        thread.start()
+        # Ошибка аренды (недействительный ключ) возвращается сразу, без ожидания каталога
+        active_rental = self.get_active_rental()
+        thread.join()
+        return Bootstrap(
+            pc_key=pc_key,
+            active_rental=active_rental,
+            games=catalog.get('games'),
+            games_error=catalog.get('error'),
+            fetched_at=time.monotonic(),
+        )
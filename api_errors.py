@@ -0,0 +1,104 @@
+"""
+Типизированные ошибки API
+Каждое исключение несет HTTP статус, код ошибки бэкенда и признак того,
+имеет ли смысл повторять запрос
+"""
+import email.utils
+import time
+from typing import Optional, Any
+
+
+class APIError(Exception):
+    """Базовая ошибка API"""
+
+    # Значение по умолчанию для класса; может быть переопределено в экземпляре
+    retryable = False
+
+    def __init__(self, message: str, status: Optional[int] = None, code: Optional[str] = None,
+                 retry_after: Optional[float] = None, payload: Any = None, retryable: Optional[bool] = None):
+        self.message = message
+        self.status = status
+        self.code = code
+        self.retry_after = retry_after
+        self.payload = payload
+        if retryable is not None:
+            self.retryable = retryable
+        # Строковое представление "<статус> <сообщение>" сохранено для логов
+        super().__init__(f"{status} {message}" if status else message)
+
+
+class NetworkError(APIError):
+    """Бэкенд недоступен: таймаут, обрыв соединения, DNS"""
+    retryable = True
+
+
+class ServerError(APIError):
+    """Ошибка 5xx на стороне бэкенда"""
+    retryable = True
+
+
+class RateLimitedError(APIError):
+    """429 Too Many Requests"""
+    retryable = True
+
+
+class ClientError(APIError):
+    """Ошибка 4xx: повтор того же запроса не поможет"""
+    retryable = False
+
+
+class AuthError(ClientError):
+    """401/403: ключ ПК недействителен или нет доступа"""
+
+
+class NotFoundError(ClientError):
+    """404: ресурс не найден"""
+
+
+class ActiveRentalError(ClientError):
+    """Исключение для случая, когда у ПК уже есть активная аренда"""
+
+    def __init__(self, message: str = "У этого ПК уже есть активная аренда", **kwargs):
+        kwargs.setdefault('status', 400)
+        super().__init__(message, **kwargs)
+
+
+class CircuitOpenError(APIError):
+    """Эндпоинт временно отключен предохранителем после серии сбоев"""
+    retryable = True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбирает заголовок Retry-After (секунды или HTTP дата)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def error_from_status(status: int, message: str, code: Optional[str] = None,
+                      retry_after: Optional[float] = None, payload: Any = None) -> APIError:
+    """Создает исключение нужного типа по HTTP статусу"""
+    if status in (401, 403):
+        cls = AuthError
+    elif status == 404:
+        cls = NotFoundError
+    elif status == 429:
+        cls = RateLimitedError
+    elif status in (408, 425):
+        # Таймаут запроса на стороне сервера - повтор допустим
+        return ClientError(message, status=status, code=code, retry_after=retry_after,
+                           payload=payload, retryable=True)
+    elif 400 <= status < 500:
+        cls = ClientError
+    else:
+        cls = ServerError
+    return cls(message, status=status, code=code, retry_after=retry_after, payload=payload)
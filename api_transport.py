@@ -0,0 +1,275 @@
+"""
+Транспорт HTTP запросов APIClient
+По умолчанию запросы уходят в сеть через requests. Запись сохраняет запросы и
+ответы с задержками в файл JSON Lines, воспроизведение отдает их обратно без
+сети - для повторяемых бенчмарков и проверок запуска и мониторинга, в том
+числе по записям с рабочих ПК клуба.
+
+Формат записи (одна строка на запрос):
+    {"t": 1.25, "method": "GET", "path": "/api/club/rental/active",
+     "params": {"pcKey": "***"}, "body": null, "elapsed": 0.081,
+     "status": 200, "reason": "OK", "headers": {}, "response": {...}}
+Сетевая ошибка записывается как "error" вместо статуса и ответа.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional, Dict, List, Any, Tuple, Iterable
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Значения этих полей не попадают в файл записи (ключ ПК, пароли аккаунтов)
+REDACTED_KEYS = ("pcKey", "password")
+REDACTED_VALUE = "***"
+
+# Поля запроса, которые не учитываются при сопоставлении: в другой записи
+# или на другом ПК у них другие значения
+DEFAULT_IGNORED_KEYS = ("pcKey", "sessionId")
+
+# Заголовки ответа, которые сохраняются в записи (их читает APIClient)
+RECORDED_HEADERS = ("Retry-After", "Content-Type")
+
+
+class ReplayMissError(requests.exceptions.ConnectionError):
+    """В записи нет ответа на запрос
+
+    Наследуется от ошибки соединения requests, поэтому APIClient превращает
+    ее в NetworkError так же, как отсутствие сети.
+    """
+
+
+class Transport:
+    """Отправка HTTP запроса; ответ - объект с интерфейсом requests.Response
+    (status_code, reason, headers, content, text, iter_content)
+
+    stream=True - тело читается по мере поступления через iter_content
+    (уже распакованное из gzip/br); транспорт может игнорировать признак
+    и вернуть ответ целиком - iter_content отдаст его порциями.
+    """
+
+    def request(self, method: str, url: str, params: Optional[Dict] = None, json: Optional[Dict] = None,
+                timeout: float = 30, stream: bool = False) -> requests.Response:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """Запросы в сеть через requests
+
+    requests сам договаривается о сжатии (Accept-Encoding: gzip, deflate и br,
+    если установлен пакет brotli) и распаковывает ответ, в том числе потоковый.
+    """
+
+    def request(self, method, url, params=None, json=None, timeout=30, stream=False):
+        if method.upper() == 'GET':
+            return requests.get(url, params=params, timeout=timeout, stream=stream)
+        if method.upper() == 'POST':
+            return requests.post(url, json=json, timeout=timeout)
+        raise ValueError(f"Неподдерживаемый метод: {method}")
+
+
+def _redact(value: Any, keys: Iterable[str] = REDACTED_KEYS) -> Any:
+    if isinstance(value, dict):
+        return {k: (REDACTED_VALUE if k in keys and v is not None else _redact(v, keys)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(item, keys) for item in value]
+    return value
+
+
+class RecordingTransport(Transport):
+    """Выполняет запросы через другой транспорт и дописывает их в файл
+
+    Файл открывается на дозапись, каждая запись - одна строка и один вызов
+    write, поэтому в один файл могут писать главное окно и процессы мониторинга.
+
+    Args:
+        path: Файл записи (JSON Lines)
+        inner: Транспорт, выполняющий запросы (по умолчанию - сеть)
+        redact: Заменять ключ ПК и пароли на "***"
+    """
+
+    def __init__(self, path, inner: Optional[Transport] = None, redact: bool = True):
+        self.path = str(path)
+        self.inner = inner or RequestsTransport()
+        self.redact = redact
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def request(self, method, url, params=None, json=None, timeout=30, stream=False):
+        # Для записи нужен весь ответ, поэтому запрос всегда читается целиком
+        started = time.monotonic()
+        entry: Dict[str, Any] = {
+            "t": round(started - self._started, 4),
+            "method": method.upper(),
+            "path": urlsplit(url).path,
+            "params": params or None,
+            "body": json,
+        }
+        try:
+            response = self.inner.request(method, url, params=params, json=json, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            entry["elapsed"] = round(time.monotonic() - started, 4)
+            entry["error"] = f"{type(e).__name__}: {e}"
+            self._write(entry)
+            raise
+
+        entry["elapsed"] = round(time.monotonic() - started, 4)
+        entry["status"] = response.status_code
+        entry["reason"] = response.reason
+        entry["headers"] = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        try:
+            entry["response"] = response.json()
+        except ValueError:
+            entry["response_text"] = response.text
+        self._write(entry)
+        return response
+
+    def _write(self, entry: Dict[str, Any]):
+        if self.redact:
+            entry = _redact(entry)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            try:
+                self._file.write(line)
+                self._file.flush()
+            except (OSError, ValueError) as e:
+                logger.warning("Не удалось записать запрос в %s: %s", self.path, e)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class _ReplayResponse(requests.Response):
+    """Ответ из записи"""
+
+    def __init__(self, entry: Dict[str, Any]):
+        super().__init__()
+        self.status_code = entry["status"]
+        self.reason = entry.get("reason") or ""
+        self.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        if "response" in entry:
+            self._content = json.dumps(entry["response"], ensure_ascii=False).encode('utf-8')
+        else:
+            self._content = (entry.get("response_text") or "").encode('utf-8')
+        self.encoding = 'utf-8'
+        # Тело уже в памяти: iter_content отдает его порциями
+        self._content_consumed = True
+
+
+def load_recording(path) -> List[Dict[str, Any]]:
+    """Читает файл записи; поврежденные строки (обрыв при записи) пропускаются"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning("%s:%s: пропущена поврежденная запись", path, number)
+    return entries
+
+
+class ReplayTransport(Transport):
+    """Отдает ответы из записи без обращения к сети
+
+    Запрос сопоставляется с записью по убыванию точности:
+      1. метод, путь, параметры и тело (без полей ignore_keys);
+      2. метод и путь;
+      3. метод и шаблон пути (/api/games/42 -> /api/games/{id}).
+    Совпавшие записи отдаются по порядку; когда они закончились, повторяется
+    последняя - опрос аренды может длиться дольше, чем в записи.
+
+    Args:
+        entries: Записи (load_recording) или путь к файлу записи
+        latency_scale: Множитель задержки: 1 - как в записи, 0 - без задержки
+        ignore_keys: Поля параметров и тела, не влияющие на сопоставление
+        strict: Без совпадения - ReplayMissError (иначе ответ 404)
+    """
+
+    def __init__(self, entries, latency_scale: float = 1.0, ignore_keys: Iterable[str] = DEFAULT_IGNORED_KEYS,
+                 strict: bool = True):
+        if not isinstance(entries, list):
+            entries = load_recording(entries)
+        self.entries = entries
+        self.latency_scale = latency_scale
+        self.ignore_keys = frozenset(ignore_keys)
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._queues: List[Dict[Tuple, List[Dict[str, Any]]]] = [{}, {}, {}]
+        self._served: Dict[Tuple, int] = {}
+        self.hits = 0
+        self.misses = 0
+        for entry in entries:
+            for level, key in enumerate(self._keys(entry["method"], entry["path"], entry.get("params"),
+                                                   entry.get("body"))):
+                self._queues[level].setdefault(key, []).append(entry)
+
+    @staticmethod
+    def _template(path: str) -> str:
+        return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+    def _keys(self, method: str, path: str, params, body) -> Tuple[Tuple, Tuple, Tuple]:
+        def normalize(values):
+            if not isinstance(values, dict):
+                return values
+            return json.dumps({k: v for k, v in values.items() if k not in self.ignore_keys}, sort_keys=True)
+        method = method.upper()
+        return ((method, path, normalize(params or None), normalize(body)),
+                (method, path),
+                (method, self._template(path)))
+
+    def _match(self, method: str, path: str, params, body) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for level, key in enumerate(self._keys(method, path, params, body)):
+                queue = self._queues[level].get(key)
+                if not queue:
+                    continue
+                served = self._served.get((level, key), 0)
+                self._served[(level, key)] = served + 1
+                self.hits += 1
+                return queue[min(served, len(queue) - 1)]
+            self.misses += 1
+            return None
+
+    def request(self, method, url, params=None, json=None, timeout=30, stream=False):
+        path = urlsplit(url).path
+        entry = self._match(method, path, params, json)
+        if entry is None:
+            if self.strict:
+                raise ReplayMissError(f"Нет записи для {method.upper()} {path}")
+            entry = {"status": 404, "reason": "Not Found", "response": {"message": "Нет записи"}}
+
+        delay = (entry.get("elapsed") or 0) * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        if "error" in entry:
+            raise requests.exceptions.ConnectionError(entry["error"])
+        return _ReplayResponse(entry)
+
+
+def create_transport(record_file: Optional[str] = None, replay_file: Optional[str] = None,
+                     latency_scale: float = 1.0) -> Transport:
+    """Транспорт по настройкам: воспроизведение, запись или сеть"""
+    if replay_file:
+        logger.info("Ответы API воспроизводятся из %s", replay_file)
+        return ReplayTransport(replay_file, latency_scale=latency_scale)
+    if record_file:
+        logger.info("Запросы API записываются в %s", record_file)
+        return RecordingTransport(record_file)
+    return RequestsTransport()
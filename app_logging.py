@@ -0,0 +1,173 @@
+"""
+Журналирование приложения
+Вызов логгера только кладет запись в очередь; форматирование и запись
+на диск выполняет отдельный поток. Записи пишутся в JSON Lines с ротацией
+в %APPDATA%/RentalDesktop/logs, повторяющиеся сообщения циклов прореживаются
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+# Стандартные атрибуты LogRecord; все остальные считаются структурными полями
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['AsyncQueueHandler'] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Прореживает повторяющиеся сообщения циклов
+
+    Применяется к записям с extra={"sample": True}: первая запись проходит,
+    далее - не чаще раза в interval секунд с числом пропущенных повторов.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        super().__init__()
+        self.interval = interval
+        # (логгер, шаблон) -> [время последней выдачи, пропущено]
+        self._seen: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'sample', False):
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None:
+                self._seen[key] = [now, 0]
+                return True
+            if now - state[0] < self.interval:
+                state[1] += 1
+                return False
+            record.suppressed = state[1]
+            state[0] = now
+            state[1] = 0
+            return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler без форматирования в вызывающем потоке
+
+    Переполненная очередь не блокирует вызывающий поток: запись отбрасывается
+    и учитывается в счетчике dropped.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def get_log_dir() -> Path:
+    """Каталог журналов (рядом с конфигурацией приложения)"""
+    log_dir = Path(os.path.expanduser("~")) / "AppData" / "Roaming" / "RentalDesktop" / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    return log_dir
+
+
+def _cleanup_old_logs(log_dir: Path, max_age_days: float):
+    """Удаляет журналы завершившихся процессов мониторинга"""
+    deadline = time.time() - max_age_days * 86400
+    for path in log_dir.glob("*.log*"):
+        try:
+            if path.stat().st_mtime < deadline:
+                path.unlink()
+        except OSError:
+            continue
+
+
+def setup_logging(process_name: str, level: str = "INFO", module_levels: Optional[Dict[str, str]] = None,
+                  max_bytes: int = 2 * 1024 * 1024, backup_count: int = 3, sample_interval: float = 60.0):
+    """Настраивает журналирование процесса
+
+    Args:
+        process_name: Имя файла журнала (main, monitor-<pid> и т.п.)
+        level: Уровень корневого логгера
+        module_levels: Уровни отдельных модулей, например {"api_client": "DEBUG"}
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_dir = get_log_dir()
+    _cleanup_old_logs(log_dir, max_age_days=7)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_dir / f"{process_name}.log", maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+
+    # Без консоли (pythonw, процессы мониторинга) sys.stderr может отсутствовать
+    if sys.stderr is not None:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handlers.append(console_handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=10000)
+    _queue_handler = AsyncQueueHandler(log_queue)
+    # Прореживание до постановки в очередь: подавленные записи не занимают ее
+    _queue_handler.addFilter(SamplingFilter(sample_interval))
+    root = logging.getLogger()
+    root.handlers[:] = [_queue_handler]
+    root.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(str(module_level).upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Дописывает очередь и останавливает поток записи"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _queue_handler = None
+    logging.shutdown()
+
+
+def dropped_records() -> int:
+    """Число записей, отброшенных из-за переполнения очереди"""
+    return _queue_handler.dropped if _queue_handler else 0
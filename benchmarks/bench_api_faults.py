@@ -0,0 +1,224 @@
+"""
+Проверка повторов и предохранителя APIClient на замене бэкенда с ошибками
+Замена бэкенда отдает заданные ошибки: 503, 429 с Retry-After и 401. Для
+каждой проверяется тип исключения, число запросов, дошедших до сервера, и
+ожидание перед повтором. Затем предохранитель эндпоинта проходит
+закрыт -> открыт -> пробный запрос -> закрыт, в том числе когда пробный
+запрос падает с исключением, не относящимся к API.
+
+Запуск: python benchmarks/bench_api_faults.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from api_client import APIClient, CircuitBreaker, RetryPolicy
+from api_errors import AuthError, CircuitOpenError, NotFoundError, RateLimitedError, ServerError
+from api_transport import RequestsTransport
+from standin_backend import BackendState, StandInBackend
+
+GAME_PATH = "/api/games/1"
+GAME_ENDPOINT = "GET /api/games/{id}"
+RESET_TIMEOUT = 0.3
+
+
+class FlakyTransport(RequestsTransport):
+    """Сеть через requests; следующие fail запросов падают с ValueError (ошибка в коде клиента)"""
+
+    def __init__(self):
+        self.fail = 0
+
+    def request(self, method, url, params=None, json=None, timeout=30, stream=False):
+        if self.fail:
+            self.fail -= 1
+            raise ValueError("ошибка разбора параметров запроса")
+        return super().request(method, url, params=params, json=json, timeout=timeout, stream=stream)
+
+
+def make_client(url: str, max_attempts: int = 3, transport=None) -> APIClient:
+    client = APIClient(url, retry_policy=RetryPolicy(max_attempts=max_attempts, base_delay=0.01, max_delay=0.05,
+                                                     max_retry_after=1.0),
+                       transport=transport)
+    client.set_key("pc-1")
+    return client
+
+
+def server_requests(state: BackendState, endpoint: str = GAME_ENDPOINT) -> int:
+    return state.snapshot()["requests"].get(endpoint, 0)
+
+
+def check_server_errors(state: BackendState, url: str, problems: list):
+    """503 повторяются по политике; после последней попытки - ServerError"""
+    client = make_client(url)
+    before = server_requests(state)
+    state.inject(GAME_PATH, 503, times=2)
+    client.get_game(1)
+    if server_requests(state) - before != 3 or client.get_stats()["retries"] != 2:
+        problems.append(f"503 x2: запросов {server_requests(state) - before}, повторов {client.get_stats()['retries']}")
+
+    before = server_requests(state)
+    state.inject(GAME_PATH, 503, times=3)
+    try:
+        client.get_game(1)
+        problems.append("503 на всех попытках: нет ServerError")
+    except ServerError:
+        pass
+    if server_requests(state) - before != 3:
+        problems.append(f"503 на всех попытках: запросов {server_requests(state) - before} вместо 3")
+
+
+def check_rate_limit(state: BackendState, url: str, problems: list):
+    """429 ждет Retry-After; слишком долгий Retry-After не ждется"""
+    client = make_client(url)
+    state.inject(GAME_PATH, 429, headers={"Retry-After": "0.4"})
+    started = time.monotonic()
+    client.get_game(1)
+    waited = time.monotonic() - started
+    if waited < 0.4:
+        problems.append(f"429: повтор через {waited:.2f} с, раньше Retry-After 0.4 с")
+
+    before = server_requests(state)
+    state.inject(GAME_PATH, 429, headers={"Retry-After": "120"})
+    try:
+        client.get_game(1)
+        problems.append("429 с Retry-After 120: нет RateLimitedError")
+    except RateLimitedError as e:
+        if e.retry_after != 120:
+            problems.append(f"429: retry_after {e.retry_after} вместо 120")
+    if server_requests(state) - before != 1:
+        problems.append("429 с Retry-After больше max_retry_after повторен")
+
+
+def check_auth(state: BackendState, url: str, problems: list):
+    """401 не повторяется и не открывает предохранитель"""
+    client = make_client(url)
+    endpoint = "GET /api/club/rental/active"
+    before = server_requests(state, endpoint)
+    for _ in range(6):
+        state.inject("/api/club/rental/active", 401)
+        try:
+            client.get_active_rental()
+            problems.append("401: нет AuthError")
+        except AuthError:
+            pass
+    if server_requests(state, endpoint) - before != 6:
+        problems.append(f"401: запросов {server_requests(state, endpoint) - before} вместо 6")
+    if client._breaker_for("/club/rental/active").state != CircuitBreaker.CLOSED:
+        problems.append("401 открыл предохранитель")
+
+
+def open_breaker(state: BackendState, client: APIClient) -> CircuitBreaker:
+    breaker = client._breaker_for("/games/1")
+    breaker.reset_timeout = RESET_TIMEOUT
+    state.inject(GAME_PATH, 503, times=breaker.failure_threshold)
+    for _ in range(breaker.failure_threshold):
+        try:
+            client.get_game(1)
+        except ServerError:
+            pass
+    return breaker
+
+
+def check_breaker(state: BackendState, url: str, problems: list):
+    """Открытие после серии 5xx, пробный запрос, повторное открытие и закрытие"""
+    client = make_client(url, max_attempts=1)
+    breaker = open_breaker(state, client)
+    if breaker.state != CircuitBreaker.OPEN:
+        problems.append(f"после {breaker.failure_threshold} ошибок 503 предохранитель {breaker.state}")
+        return
+
+    before = server_requests(state)
+    try:
+        client.get_game(1)
+        problems.append("открытый предохранитель пропустил запрос")
+    except CircuitOpenError:
+        pass
+    if server_requests(state) != before:
+        problems.append("запрос при открытом предохранителе дошел до сервера")
+
+    # Пробный запрос с ошибкой снова открывает предохранитель
+    time.sleep(RESET_TIMEOUT + 0.05)
+    state.inject(GAME_PATH, 503)
+    try:
+        client.get_game(1)
+    except ServerError:
+        pass
+    if breaker.state != CircuitBreaker.OPEN:
+        problems.append(f"после неудачной пробы предохранитель {breaker.state}")
+
+    # Во время пробы остальные запросы отклоняются
+    time.sleep(RESET_TIMEOUT + 0.05)
+    breaker.before_request("/games/1")
+    try:
+        breaker.before_request("/games/1")
+        problems.append("в half-open пропущен второй пробный запрос")
+    except CircuitOpenError:
+        pass
+    breaker.record_success()
+
+    # Ошибка клиента (4xx) на пробе - бэкенд отвечает, предохранитель закрывается
+    open_breaker(state, client)
+    time.sleep(RESET_TIMEOUT + 0.05)
+    state.inject(GAME_PATH, 404)
+    try:
+        client.get_game(1)
+    except NotFoundError:
+        pass
+    if breaker.state != CircuitBreaker.CLOSED:
+        problems.append(f"после ответа 404 на пробу предохранитель {breaker.state}")
+
+    client.get_game(1)
+    if breaker.state != CircuitBreaker.CLOSED:
+        problems.append(f"после успешного запроса предохранитель {breaker.state}")
+
+
+def check_aborted_probe(state: BackendState, url: str, problems: list):
+    """Проба, упавшая не с APIError, не оставляет предохранитель в half-open"""
+    transport = FlakyTransport()
+    client = make_client(url, max_attempts=1, transport=transport)
+    breaker = open_breaker(state, client)
+    time.sleep(RESET_TIMEOUT + 0.05)
+    transport.fail = 1
+    try:
+        client.get_game(1)
+    except ValueError:
+        pass
+    if breaker.state == CircuitBreaker.HALF_OPEN:
+        problems.append("проба с ValueError оставила предохранитель в half-open")
+        return
+
+    time.sleep(RESET_TIMEOUT + 0.05)
+    try:
+        client.get_game(1)
+    except CircuitOpenError:
+        problems.append("после пробы с ValueError эндпоинт не восстановился")
+    if breaker.state != CircuitBreaker.CLOSED:
+        problems.append(f"после успешной пробы предохранитель {breaker.state}")
+
+
+def main():
+    state = BackendState(latency_ms=1, latency_jitter_ms=0)
+    backend = StandInBackend(state).start()
+    problems = []
+    try:
+        check_server_errors(state, backend.url, problems)
+        check_rate_limit(state, backend.url, problems)
+        check_auth(state, backend.url, problems)
+        check_breaker(state, backend.url, problems)
+        check_aborted_probe(state, backend.url, problems)
+    finally:
+        backend.stop()
+
+    if problems:
+        print("НАРУШЕНИЯ: " + "; ".join(problems))
+        return 1
+    print("Повторы: 503 повторяются, 429 ждет Retry-After, 401 не повторяется")
+    print("Предохранитель: открытие, проба, повторное открытие и закрытие; проба с исключением не зависает")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Бенчмарк загрузки каталога: целиком против потокового разбора
+Большой каталог отдается локальной заменой бэкенда (gzip и ограничение
+скорости по желанию). Для каждого способа печатаются время до первой
+страницы списка, полное время и пиковая память (tracemalloc) во время загрузки.
+"Целиком" - прежний get_games: все тело в памяти, затем список словарей,
+затем модели. "Поток" - APIClient.iter_games.
+
+Запуск: python benchmarks/bench_catalog_stream.py [--games 50000] [--bandwidth-kbps 0] [--no-compress]
+"""
+import argparse
+import gc
+import gzip
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import requests
+
+from api_client import APIClient
+from models import Game, loads
+from standin_backend import BackendState, StandInBackend
+
+PAGE = 50
+
+
+def make_catalog(count: int) -> list:
+    """Каталог с редко используемыми полями, как у настоящего бэкенда"""
+    return [{
+        "id": i,
+        "title": f"Game {i}",
+        "availableAccounts": i % 7,
+        "steamUrl": f"https://store.steampowered.com/app/{100000 + i}/",
+        "imageUrl": f"https://passplay.ru/covers/{i}.jpg",
+        "description": "Описание игры " * 8,
+        "genres": ["action", "shooter"],
+        "releaseDate": "2020-01-01",
+    } for i in range(count)]
+
+
+def load_whole(url: str, marks: dict) -> list:
+    """Прежний способ: тело целиком, затем разбор"""
+    response = requests.get(f"{url}/api/games", timeout=60)
+    games = [Game.from_dict(item) for item in loads(response.content)]
+    marks["first_page"] = time.perf_counter()
+    return games
+
+
+def load_stream(url: str, marks: dict) -> list:
+    client = APIClient(url)
+    games = []
+    for game in client.iter_games():
+        games.append(game)
+        if len(games) == PAGE:
+            marks["first_page"] = time.perf_counter()
+    return games
+
+
+def measure(name: str, loader, url: str):
+    """Время - в прогоне без tracemalloc (он замедляет разбор в разы), память - в отдельном"""
+    gc.collect()
+    marks = {}
+    started = time.perf_counter()
+    games = loader(url, marks)
+    elapsed = time.perf_counter() - started
+    first_page = marks.get("first_page", started + elapsed) - started
+    del games
+
+    gc.collect()
+    tracemalloc.start()
+    games = loader(url, {})
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:8} игр: {len(games)}, первая страница: {first_page * 1000:6.0f} мс, "
+          f"все: {elapsed * 1000:6.0f} мс, пик памяти: {peak / 2 ** 20:6.1f} МБ, "
+          f"каталог: {retained / 2 ** 20:6.1f} МБ")
+    return games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка каталога целиком и потоком")
+    parser.add_argument("--games", type=int, default=50000)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0.0, help="Скорость отдачи ответа, КБ/с")
+    parser.add_argument("--no-compress", action="store_true", help="Без gzip")
+    args = parser.parse_args()
+
+    state = BackendState(catalog_size=0, latency_ms=20, latency_jitter_ms=0,
+                         compress=not args.no_compress, bandwidth_kbps=args.bandwidth_kbps)
+    state.catalog = make_catalog(args.games)
+    state.catalog_body = json.dumps(state.catalog, ensure_ascii=False).encode('utf-8')
+    state.catalog_gzip = gzip.compress(state.catalog_body)
+    backend = StandInBackend(state).start()
+    wire = len(state.catalog_body) if args.no_compress else len(state.catalog_gzip)
+    print(f"Каталог: {args.games} игр, JSON {len(state.catalog_body) / 2 ** 20:.1f} МБ, "
+          f"по сети {wire / 2 ** 20:.1f} МБ ({'без сжатия' if args.no_compress else 'gzip'})")
+    try:
+        whole = measure("Целиком", load_whole, backend.url)
+        streamed = measure("Поток", load_stream, backend.url)
+    finally:
+        backend.stop()
+    if whole != streamed:
+        print("ОШИБКА: каталоги различаются")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
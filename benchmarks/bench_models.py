@@ -0,0 +1,71 @@
+"""
+Бенчмарк декодирования каталога: время и память
+Сравнивает сырые dict из json/orjson с моделями Game на большом каталоге
+
+Запуск: python benchmarks/bench_models.py [количество_игр]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import models
+from models import Game
+
+
+def make_catalog(count: int) -> bytes:
+    """Создает синтетический ответ /api/games"""
+    games = []
+    for i in range(count):
+        games.append({
+            "id": i,
+            "title": f"Game {i}",
+            "availableAccounts": i % 7,
+            "steamUrl": f"https://store.steampowered.com/app/{100000 + i}/",
+            "imageUrl": f"https://passplay.ru/covers/{i}.jpg",
+            # Редко используемые поля
+            "description": "Описание игры " * 8,
+            "genres": ["action", "shooter"],
+            "releaseDate": "2020-01-01",
+        })
+    return json.dumps(games, ensure_ascii=False).encode('utf-8')
+
+
+def measure(name: str, func, payload: bytes, repeat: int = 5):
+    """Печатает лучшее время и удерживаемую память результата"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(payload)
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(payload)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    print(f"{name:<28} {best * 1000:9.1f} мс  удерживается {retained / 1e6:7.2f} МБ  пик {peak / 1e6:7.2f} МБ")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    payload = make_catalog(count)
+    print(f"Каталог: {count} игр, {len(payload) / 1e6:.2f} МБ JSON, orjson: {'да' if models.orjson else 'нет'}")
+
+    measure("json.loads -> dict", json.loads, payload)
+    measure("json.loads -> Game", lambda data: [Game.from_dict(item) for item in json.loads(data)], payload)
+    if models.orjson is not None:
+        measure("orjson.loads -> dict", models.orjson.loads, payload)
+        measure("orjson.loads -> Game", lambda data: [Game.from_dict(item) for item in models.orjson.loads(data)], payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Бенчмарк прогрева файлов игры на синтетической установке Steam (Linux)
+Создает библиотеку Steam с appmanifest и каталогом игры, вытесняет файлы из
+кэша страниц (posix_fadvise DONTNEED) и сравнивает "загрузку игры" - чтение
+исполняемых файлов и ресурсов - без прогрева и после него.
+
+Каталог должен быть на настоящем диске: на tmpfs файлы всегда в памяти.
+Запуск: python benchmarks/bench_prewarm.py [--dir /var/tmp/prewarm] [--size-mb 1024] [--bandwidth-mb 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prewarm import Prewarmer, find_steam_install_dir, select_files
+
+APP_ID = 730
+MB = 1024 * 1024
+
+
+def build_install(root: Path, size_mb: int, seed: int = 0) -> Path:
+    """Steam в root/Steam, игра во второй библиотеке root/Library"""
+    steam = root / "Steam"
+    library = root / "Library"
+    (steam / "steamapps").mkdir(parents=True, exist_ok=True)
+    (library / "steamapps").mkdir(parents=True, exist_ok=True)
+    (steam / "steam.exe").write_bytes(b"MZ")
+    (steam / "steamapps" / "libraryfolders.vdf").write_text(
+        '"libraryfolders"\n{\n\t"0"\n\t{\n\t\t"path"\t\t"%s"\n\t}\n\t"1"\n\t{\n\t\t"path"\t\t"%s"\n\t}\n}\n'
+        % (steam, library), encoding='utf-8')
+    (library / "steamapps" / f"appmanifest_{APP_ID}.acf").write_text(
+        '"AppState"\n{\n\t"appid"\t\t"%d"\n\t"installdir"\t\t"Synthetic Game"\n}\n' % APP_ID, encoding='utf-8')
+
+    game = library / "steamapps" / "common" / "Synthetic Game"
+    if game.exists():
+        return game
+    rng = random.Random(seed)
+    sizes = {"game.exe": 48, "bin/engine.dll": 24, "bin/render.dll": 16}
+    remaining = max(size_mb - sum(sizes.values()), 0)
+    index = 0
+    while remaining > 0:
+        size = min(remaining, rng.choice((8, 32, 64, 128)))
+        sizes[f"data/pak{index:03}.vpk"] = size
+        remaining -= size
+        index += 1
+    # Мелкие файлы (конфиги, шейдеры), которые прогрев пропускает последними
+    for i in range(200):
+        sizes[f"cfg/file{i:03}.cfg"] = 0
+    block = os.urandom(MB)
+    for relative, size in sizes.items():
+        path = game / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            if size:
+                for _ in range(size):
+                    f.write(block)
+            else:
+                f.write(os.urandom(4096))
+            f.flush()
+            os.fsync(f.fileno())
+    return game
+
+
+def evict(directory: Path):
+    """Вытесняет файлы каталога из кэша страниц"""
+    for path in directory.rglob("*"):
+        if path.is_file():
+            with open(path, 'rb') as f:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def game_load(files) -> float:
+    """Чтение, как при запуске игры: исполняемые файлы и ресурсы блоками по 256 КБ"""
+    started = time.perf_counter()
+    buffer = bytearray(256 * 1024)
+    for path, _ in files:
+        with open(path, 'rb', buffering=0) as f:
+            while f.readinto(buffer):
+                pass
+    return time.perf_counter() - started
+
+
+def main():
+    if not hasattr(os, 'posix_fadvise'):
+        print("Нужен Linux (posix_fadvise)")
+        return
+    parser = argparse.ArgumentParser(description="Бенчмарк прогрева файлов игры")
+    parser.add_argument("--dir", help="Каталог синтетической установки (по умолчанию - временный в /var/tmp)")
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--bandwidth-mb", type=float, default=0, help="Ограничение скорости прогрева, 0 - без ограничения")
+    args = parser.parse_args()
+
+    root = Path(args.dir) if args.dir else Path(tempfile.mkdtemp(prefix="prewarm-", dir="/var/tmp"))
+    started = time.perf_counter()
+    build_install(root, args.size_mb)
+    print(f"Установка: {root} ({args.size_mb} МБ, подготовка {time.perf_counter() - started:.1f} с)")
+
+    install_dir = find_steam_install_dir(root / "Steam", APP_ID)
+    files = select_files(install_dir, budget_bytes=args.size_mb * MB * 2)
+    total = sum(size for _, size in files)
+    print(f"Каталог игры по манифесту: {install_dir}, к прогреву {len(files)} файлов, {total / MB:.0f} МБ")
+
+    evict(install_dir)
+    cold = game_load(files)
+    print(f"Загрузка без прогрева:   {cold:.2f} с ({total / MB / cold:.0f} МБ/с)")
+
+    evict(install_dir)
+    prewarmer = Prewarmer(files, bandwidth=args.bandwidth_mb * MB)
+    print(f"Прогрев:                 {prewarmer.run()}")
+    warm = game_load(files)
+    print(f"Загрузка после прогрева: {warm:.2f} с ({total / MB / warm:.0f} МБ/с), ускорение {cold / warm:.1f}x")
+    if cold / warm < 1.5:
+        print("  (разница мала: каталог, вероятно, на tmpfs или fadvise не вытесняет страницы)")
+
+    evict(install_dir)
+    prewarmer = Prewarmer(files, bandwidth=args.bandwidth_mb * MB or 50 * MB)
+    threading.Timer(1.0, prewarmer.cancel).start()
+    print(f"Отмена через 1 с:        {prewarmer.run()}")
+
+
+if __name__ == "__main__":
+    main()
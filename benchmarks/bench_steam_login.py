@@ -0,0 +1,168 @@
+"""
+Бенчмарк стратегий входа в Steam на фейковом Steam
+Время виртуальное: ожидания стратегий не спят, а сдвигают часы стенда,
+поэтому сравнение занимает доли секунды и не требует Windows
+
+Запуск: python benchmarks/bench_steam_login.py [число_входов]
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from input_backend import RecordingInputBackend
+from steam_login import LoginStrategySelector, CommandLineLoginStrategy, GuiLoginStrategy
+from steam_manager import SteamManager
+
+LOGIN_WINDOW = 1
+TWO_FACTOR_WINDOW = 2
+# Главное окно клиента, уже вошедшего в аккаунт
+MAIN_WINDOW = 3
+
+
+class FakeSteamManager(SteamManager):
+    """SteamManager с моделью клиента Steam вместо процессов и окон
+
+    Args:
+        supports_login_arg: Принимает ли клиент -login (новые клиенты его игнорируют)
+        startup_delay: Через сколько секунд после запуска появляется окно
+        failure_rate: Доля входов, которые срываются по вине Steam
+    """
+
+    def __init__(self, selector: LoginStrategySelector, supports_login_arg: bool = True,
+                 startup_delay: float = 4.0, failure_rate: float = 0.0, seed: int = 0):
+        self.input = RecordingInputBackend({LOGIN_WINDOW: 2, TWO_FACTOR_WINDOW: 1})
+        super().__init__("steam.exe", input_backend=self.input, login_selector=selector)
+        self.supports_login_arg = supports_login_arg
+        self.startup_delay = startup_delay
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.clock = 0.0
+        self.running = False
+        self.window_at = 0.0
+        self.state = None
+        self.logged_in = False
+        self.credentials = None
+        self.two_factor_code = None
+        self._seen_submissions = 0
+        self.launched_app_id = None
+
+    def prepare(self, username: str, password: str, two_factor_code: str):
+        self.credentials = [username, password]
+        self.two_factor_code = two_factor_code
+
+    # Часы и процессы
+
+    def _wait(self, seconds: float):
+        self.clock += seconds
+        self._update()
+
+    def _now(self) -> float:
+        return self.clock
+
+    def is_steam_running(self) -> bool:
+        return self.running
+
+    def close_steam(self):
+        self.running = False
+        self.logged_in = False
+        self.state = None
+        self._wait(2)
+
+    def spawn_steam(self, args=None):
+        args = args or []
+        self.running = True
+        self.window_at = self.clock + self.startup_delay
+        self.input.fields = {hwnd: [''] * count for hwnd, count in self.input.windows.items()}
+        self.input.cursor = {hwnd: 0 for hwnd in self.input.windows}
+        if '-login' in args and self.supports_login_arg and args[1:3] == self.credentials:
+            self.state = '2fa'
+        else:
+            self.state = 'login'
+
+    def launch_game(self, game_id: int):
+        self.launched_app_id = game_id
+        self._wait(5)
+
+    def find_game_process(self, game_name: str):
+        return None
+
+    # Окна
+
+    def _find_steam_window(self):
+        self._update()
+        if not self.running or self.clock < self.window_at:
+            return None
+        return {'login': LOGIN_WINDOW, '2fa': TWO_FACTOR_WINDOW}.get(self.state, MAIN_WINDOW)
+
+    def steam_prompt(self, hwnd):
+        self._update()
+        return {LOGIN_WINDOW: "login", TWO_FACTOR_WINDOW: "two_factor"}.get(hwnd)
+
+    def _update(self):
+        """Обрабатывает отправленные формы"""
+        for hwnd, values in self.input.submissions[self._seen_submissions:]:
+            if hwnd == LOGIN_WINDOW and self.state == 'login' and values == self.credentials:
+                self.state = '2fa'
+            elif hwnd == TWO_FACTOR_WINDOW and self.state == '2fa' and values == [self.two_factor_code]:
+                self.logged_in = self.random.random() >= self.failure_rate
+                self.state = 'done'
+        self._seen_submissions = len(self.input.submissions)
+
+    def is_logged_in(self):
+        self._update()
+        return self.logged_in
+
+
+def run(label: str, logins: int, **steam_options):
+    selector = LoginStrategySelector(strategies=[CommandLineLoginStrategy(), GuiLoginStrategy()])
+    total_time = 0.0
+    successes = 0
+    for i in range(logins):
+        steam = FakeSteamManager(selector, seed=i, **steam_options)
+        # Steam уже запущен с прошлой сессии
+        steam.running = True
+        steam.prepare("club_account", "p@ss w0rd", "7KQ2X")
+        start = steam.clock
+        steam.login_to_steam("club_account", "p@ss w0rd")
+        steam.enter_two_factor_code("7KQ2X")
+        if steam.finish_login(timeout=10):
+            successes += 1
+        total_time += steam.clock - start
+
+    print(f"{label}: {successes}/{logins} входов, среднее время {total_time / logins:.1f} с (виртуальных)")
+    for name, entry in selector.stats("club_account").items():
+        print(f"    {name:13} попыток {entry['attempts']:3}, успешных {entry['success']:3}, "
+              f"в среднем {entry['seconds'] / entry['attempts']:.1f} с")
+
+
+def run_single(label: str, strategy, logins: int, **steam_options):
+    selector = LoginStrategySelector(strategies=[strategy], explore_every=0)
+    run_total = 0.0
+    for i in range(logins):
+        steam = FakeSteamManager(selector, seed=i, **steam_options)
+        steam.running = True
+        steam.prepare("club_account", "p@ss w0rd", "7KQ2X")
+        steam.login_to_steam("club_account", "p@ss w0rd")
+        steam.enter_two_factor_code("7KQ2X")
+        steam.finish_login(timeout=10)
+        run_total += steam.clock
+    print(f"{label}: среднее время {run_total / logins:.1f} с (виртуальных)")
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    print("Отдельные стратегии, клиент принимает -login:")
+    run_single("  gui         ", GuiLoginStrategy(), logins)
+    run_single("  command_line", CommandLineLoginStrategy(), logins)
+
+    print("\nВыбор по статистике:")
+    run("  клиент принимает -login    ", logins)
+    run("  клиент игнорирует -login   ", logins, supports_login_arg=False)
+    run("  -login, 20% срывов Steam   ", logins, failure_rate=0.2)
+
+
+if __name__ == "__main__":
+    main()
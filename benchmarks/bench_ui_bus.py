@@ -0,0 +1,203 @@
+"""
+Бенчмарк шины обновлений интерфейса
+Несколько потоков публикуют тексты статуса, состояние аренды и вызовы.
+Без Qt главный поток моделируется циклом кадров по 16 мс: каждое примененное
+событие, меняющее строку статуса, считается перерисовкой. Для сравнения
+считается доставка по событию (как QTimer.singleShot(0, ...) на каждое
+обновление). Если установлен PyQt5, тот же прогон выполняется на настоящей
+шине с QLabel на платформе offscreen и считаются вызовы paintEvent.
+
+Запуск: python benchmarks/bench_ui_bus.py [--threads 8] [--events 20000] [--max-pending 256]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ui.update_queue import UpdateQueue, StatusText, RentalUpdate, Invoke
+
+FRAME = 0.016
+
+
+def produce(post, threads: int, events: int, calls: list):
+    """Потоки пула: тексты статуса, состояние аренды и редкие вызовы"""
+    per_thread = events // threads
+
+    def worker(index: int):
+        for i in range(per_thread):
+            if i % 100 == 0:
+                post(Invoke(calls.append, (index,)))
+            elif i % 2:
+                post(StatusText(f"Поток {index}: шаг {i}"))
+            else:
+                post(RentalUpdate(i))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads, time.perf_counter() - started
+
+
+def apply(events, screen: dict):
+    """Применение пачки; возвращает число перерисовок строки статуса"""
+    repaints = 0
+    for event in events:
+        if isinstance(event, Invoke):
+            event.func(*event.args)
+            continue
+        text = event.text if isinstance(event, StatusText) else f"Осталось {event.rental}"
+        if text != screen.get("text"):
+            screen["text"] = text
+            repaints += 1
+    return repaints
+
+
+def check_overflow(max_pending: int, problems: list):
+    """При переполнении отбрасываются события с ключом, вызовы без ключа доходят все"""
+    queue = UpdateQueue(max_pending)
+    calls = []
+    for i in range(max_pending * 2):
+        queue.post(Invoke(calls.append, (i,), coalesce_key=("progress", i)))
+        queue.post(Invoke(calls.append, (-i,)))
+    queue.post(StatusText("готово"))
+    events = queue.drain()
+    for event in events:
+        if isinstance(event, Invoke):
+            event.func(*event.args)
+    keyless = [call for call in calls if call <= 0]
+    if len(keyless) != max_pending * 2:
+        problems.append(f"переполнение: дошло {len(keyless)} вызовов без ключа из {max_pending * 2}")
+    if not isinstance(events[-1], StatusText):
+        problems.append("переполнение: отброшено последнее событие с ключом")
+
+
+def run_headless(threads: int, events: int, max_pending: int, problems: list):
+    queue = UpdateQueue(max_pending)
+    screen, calls = {}, []
+    done = threading.Event()
+    frames = [0, 0]  # кадров, перерисовок
+
+    def ui_loop():
+        # Перерисовка строки - один раз за кадр, сколько бы текстов ни пришло
+        while True:
+            finished = done.is_set()
+            if apply(queue.drain(), screen):
+                frames[1] += 1
+            frames[0] += 1
+            if finished:
+                return
+            time.sleep(FRAME)
+
+    loop = threading.Thread(target=ui_loop)
+    loop.start()
+    posted, elapsed = produce(queue.post, threads, events, calls)
+    done.set()
+    loop.join()
+
+    stats = queue.stats
+    print(f"Шина (без Qt): {posted} событий из {threads} потоков за {elapsed * 1000:.0f} мс "
+          f"({posted / elapsed:,.0f} событий/с)")
+    print(f"  кадров: {frames[0]}, перерисовок: {frames[1]}, применено событий: {stats['delivered']}, "
+          f"схлопнуто: {stats['coalesced']}, отброшено: {stats['dropped']}, вызовов: {len(calls)}")
+    print(f"  по событию (singleShot на каждое): перерисовок ~{posted - len(calls)}")
+    invokes = (events // threads + 99) // 100 * threads
+    if len(calls) != invokes:
+        problems.append(f"без Qt: выполнено {len(calls)} вызовов из {invokes}")
+
+
+def run_qt(threads: int, events: int, max_pending: int):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtCore import QTimer, QObject, pyqtSignal
+        from PyQt5.QtWidgets import QApplication, QLabel
+    except ImportError:
+        print("PyQt5 не установлен - замер перерисовок на Qt пропущен")
+        return
+    from ui.update_bus import UIUpdateBus
+
+    app = QApplication.instance() or QApplication([])
+
+    class CountingLabel(QLabel):
+        def __init__(self):
+            super().__init__()
+            self.paints = 0
+
+        def paintEvent(self, event):
+            self.paints += 1
+            super().paintEvent(event)
+
+    class Direct(QObject):
+        """Доставка по событию через очередь сигналов"""
+        posted = pyqtSignal(object)
+
+    def measure(name: str, post, connect):
+        label = CountingLabel()
+        label.resize(400, 30)
+        label.show()
+        calls = []
+        connect(label)
+        app.processEvents()
+        label.paints = 0
+        result = {}
+
+        def producers():
+            result["posted"], result["elapsed"] = produce(post, threads, events, calls)
+            # Таймер Qt можно запускать только из главного потока
+            post(Invoke(QTimer.singleShot, (200, app.quit)))
+
+        threading.Thread(target=producers).start()
+        started = time.perf_counter()
+        app.exec_()
+        total = time.perf_counter() - started
+        print(f"{name}: {result['posted']} событий, доставлено за {total * 1000:.0f} мс, "
+              f"перерисовок: {label.paints}, вызовов: {len(calls)}")
+        label.close()
+
+    def show(label, event):
+        if isinstance(event, StatusText):
+            label.setText(event.text)
+        elif isinstance(event, RentalUpdate):
+            label.setText(f"Осталось {event.rental}")
+        else:
+            event.func(*event.args)
+
+    bus = UIUpdateBus(max_pending=max_pending)
+
+    def connect_bus(label):
+        bus.on(StatusText, lambda event: show(label, event))
+        bus.on(RentalUpdate, lambda event: show(label, event))
+
+    measure("Шина (Qt offscreen)", bus.post, connect_bus)
+    print(f"  схлопнуто: {bus.queue.stats['coalesced']}, отброшено: {bus.queue.stats['dropped']}, "
+          f"кадров: {bus.queue.stats['batches']}")
+
+    direct = Direct()
+    measure("По событию (Qt offscreen)", direct.posted.emit,
+            lambda label: direct.posted.connect(lambda event: show(label, event)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность и число перерисовок шины обновлений")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--max-pending", type=int, default=256)
+    args = parser.parse_args()
+    problems = []
+    check_overflow(args.max_pending, problems)
+    run_headless(args.threads, args.events, args.max_pending, problems)
+    if problems:
+        print("НАРУШЕНИЯ: " + "; ".join(problems))
+        return 1
+    run_qt(args.threads, args.events, args.max_pending)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
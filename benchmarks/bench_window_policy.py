@@ -0,0 +1,187 @@
+"""
+Проверка и бенчмарк политики окон на фейковой оконной системе
+Правила скрытия, кэши hwnd -> PID и PID -> имя процесса и показ окон при
+остановке проверяются на FakeWindowPlatform, без Windows: с событиями и в
+режиме опроса, при переиспользовании PID (Steam перезапускается при каждом
+входе) и hwnd, при отказе в доступе к процессу. Затем замеряется скрытие окна
+по событию и стоимость страховочного опроса на большом числе окон.
+
+Запуск: python benchmarks/bench_window_policy.py [--windows 2000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scheduler import get_scheduler
+from window_policy import FakeWindowPlatform, WindowPolicyEnforcer
+
+STEAM_PID = 4000
+GAME_PID = 5000
+EXPLORER_PID = 6000
+
+
+def make_enforcer(events: bool = True):
+    platform = FakeWindowPlatform(events=events)
+    platform.process_names.update({STEAM_PID: "steam.exe", GAME_PID: "game.exe", EXPLORER_PID: "explorer.exe"})
+    lookups = {"names": 0}
+
+    def resolve(pid: int) -> str:
+        lookups["names"] += 1
+        return platform.process_names.get(pid, "")
+
+    enforcer = WindowPolicyEnforcer(platform, process_name_resolver=resolve,
+                                    poll_interval=3600, safety_poll_interval=3600)
+    return platform, enforcer, lookups
+
+
+def check_rules(problems: list):
+    """Окна Steam скрываются при появлении, остальные не трогаются"""
+    platform, enforcer, _ = make_enforcer()
+    enforcer.start()
+    login = platform.create_window("Steam", "vguiPopupWindow", STEAM_PID)
+    helper = platform.create_window("", "Chrome_WidgetWin_1", STEAM_PID)
+    game = platform.create_window("Counter-Strike 2", "SDL_app", GAME_PID)
+    desktop = platform.create_window("Проводник", "CabinetWClass", EXPLORER_PID)
+    if platform.is_visible(login) or platform.is_visible(helper):
+        problems.append("окно Steam не скрыто по событию")
+    if not platform.is_visible(game) or not platform.is_visible(desktop):
+        problems.append("скрыто чужое окно")
+    # "Steam" в заголовке окна другого процесса - не повод его скрывать
+    steamworld = platform.create_window("SteamWorld Dig 2", "SDL_app", GAME_PID)
+    store_page = platform.create_window("Steam Store - Проводник", "CabinetWClass", EXPLORER_PID)
+    enforcer.poll()
+    if not platform.is_visible(steamworld):
+        problems.append("скрыто окно игры SteamWorld")
+    if not platform.is_visible(store_page):
+        problems.append("скрыто окно другого процесса со Steam в заголовке")
+    enforcer.stop()
+    if not platform.is_visible(login) or not platform.is_visible(helper):
+        problems.append("после остановки окна Steam не показаны")
+
+
+def check_polling(problems: list):
+    """Без событий окна скрываются опросом"""
+    platform, enforcer, _ = make_enforcer(events=False)
+    enforcer.start()
+    if enforcer.event_driven:
+        problems.append("режим событий без подписки")
+    login = platform.create_window("Steam", "vguiPopupWindow", STEAM_PID)
+    if not platform.is_visible(login):
+        problems.append("окно скрыто без события и опроса")
+    enforcer.poll()
+    if platform.is_visible(login):
+        problems.append("опрос не скрыл окно Steam")
+    enforcer.stop()
+
+
+def check_pid_reuse(problems: list, events: bool):
+    """PID перезапущенного Steam достался игре: окно игры не скрывается"""
+    platform, enforcer, _ = make_enforcer(events=events)
+    enforcer.start()
+    helper = platform.create_window("", "Chrome_WidgetWin_1", STEAM_PID)
+    enforcer.poll()
+    if platform.is_visible(helper):
+        problems.append("окно steamwebhelper не скрыто")
+
+    # Steam закрыт при входе, его PID переиспользован процессом игры
+    platform.destroy_window(helper)
+    platform.process_names[STEAM_PID] = "game.exe"
+    if not events:
+        enforcer.poll()
+    game = platform.create_window("Counter-Strike 2", "SDL_app", STEAM_PID)
+    enforcer.poll()
+    if not platform.is_visible(game):
+        problems.append(f"окно игры с PID бывшего Steam скрыто ({'события' if events else 'опрос'})")
+    enforcer.stop()
+
+
+def check_hwnd_reuse(problems: list):
+    """hwnd уничтоженного окна Steam достался окну игры"""
+    platform, enforcer, _ = make_enforcer()
+    enforcer.start()
+    login = platform.create_window("Steam", "vguiPopupWindow", STEAM_PID)
+    platform.destroy_window(login)
+    platform.windows[login] = {"title": "Counter-Strike 2", "class_name": "SDL_app", "pid": GAME_PID,
+                               "visible": True}
+    platform.show(login)
+    if not platform.is_visible(login):
+        problems.append("окно игры с hwnd бывшего окна Steam скрыто")
+    enforcer.stop()
+    if login in enforcer.hidden:
+        problems.append("hwnd уничтоженного окна остался в списке скрытых")
+
+
+def check_access_denied(problems: list):
+    """Имя процесса без доступа не кэшируется: после получения доступа окно скрывается"""
+    platform, enforcer, lookups = make_enforcer()
+    del platform.process_names[STEAM_PID]
+    enforcer.start()
+    helper = platform.create_window("", "Chrome_WidgetWin_1", STEAM_PID)
+    if not platform.is_visible(helper):
+        problems.append("скрыто окно неизвестного процесса")
+    platform.process_names[STEAM_PID] = "steamwebhelper.exe"
+    enforcer.poll()
+    if platform.is_visible(helper):
+        problems.append("пустое имя процесса закэшировано: окно так и не скрыто")
+    before = lookups["names"]
+    platform.show(helper)
+    if lookups["names"] != before:
+        problems.append("известное имя процесса запрашивается повторно")
+    enforcer.stop()
+
+
+def bench(windows: int):
+    platform, enforcer, lookups = make_enforcer()
+    for i in range(50):
+        platform.process_names[EXPLORER_PID + 1 + i] = f"app{i}.exe"
+    for i in range(windows):
+        platform.create_window(f"Окно {i}", "Notepad", EXPLORER_PID + 1 + i % 50)
+    enforcer.start()
+
+    started = time.perf_counter()
+    hides = 200
+    for _ in range(hides):
+        platform.destroy_window(platform.create_window("Steam", "vguiPopupWindow", STEAM_PID))
+    per_hide = (time.perf_counter() - started) / hides
+
+    lookups_before, pid_lookups_before = lookups["names"], platform.pid_lookups
+    started = time.perf_counter()
+    polls = 20
+    for _ in range(polls):
+        enforcer.poll()
+    per_poll = (time.perf_counter() - started) / polls
+    enforcer.stop()
+
+    print(f"Окон: {windows}; появление и скрытие окна Steam: {per_hide * 1e6:.0f} мкс, "
+          f"максимум от события до скрытия {enforcer.stats['max_hide_ms']:.2f} мс")
+    print(f"Страховочный опрос: {per_poll * 1000:.2f} мс, новых запросов PID "
+          f"{platform.pid_lookups - pid_lookups_before}, имен процессов {lookups['names'] - lookups_before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Правила скрытия окон на FakeWindowPlatform")
+    parser.add_argument("--windows", type=int, default=2000, help="Окон на рабочем столе для замера опроса")
+    args = parser.parse_args()
+
+    problems = []
+    check_rules(problems)
+    check_polling(problems)
+    check_pid_reuse(problems, events=True)
+    check_pid_reuse(problems, events=False)
+    check_hwnd_reuse(problems)
+    check_access_denied(problems)
+    if problems:
+        print("НАРУШЕНИЯ: " + "; ".join(problems))
+        return 1
+    print("Правила: окна Steam скрываются, чужие окна (в т.ч. с PID и hwnd бывших окон Steam) не трогаются")
+
+    bench(args.windows)
+    get_scheduler().shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Нагрузочная проверка состояния запуска GameLauncher
+Несколько потоков одновременно нажимают "Играть" (request_launch и
+launch_game), отменяют запуск и завершают сессию в случайные моменты.
+Бэкенд и лаунчер - фейки с задержками этапов. После каждого раунда
+проверяется, что одновременно была не больше одной аренды, каждая начатая
+аренда завершена, лаунчер закрыт, приоритеты возвращены, а состояние
+вернулось в idle. Игровой режим работает с политикой по умолчанию, но
+приоритеты процессов только записываются (собственный процесс проверки не
+понижается). Отдельно проверяется, что отмена прерывает долгое ожидание
+лаунчера при входе и игра после нее не запускается.
+
+Запуск: python benchmarks/launch_stress.py [--rounds 200] [--threads 16] [--interrupt 0.5] [--seed 1]
+"""
+import argparse
+import itertools
+import logging
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from game_launcher import GameLauncher
+from launch_state import LaunchBusyError, IDLE, RUNNING, LAUNCH_STATES, LOGGING_IN
+from launchers.testing import FakeLauncher, fake_game
+from models import Session, TwoFactorResponse
+from resource_governor import PriorityBackend
+
+
+class StubConfig:
+    """Настройки без файлов: без прогрева; игровой режим и частые замеры телеметрии"""
+
+    def __init__(self):
+        self.settings = {
+            "prewarm_enabled": False,
+            "telemetry_interval": 0.05,
+        }
+
+    def get_setting(self, key, default=None):
+        return self.settings.get(key, default)
+
+
+class RecordingPriorityBackend(PriorityBackend):
+    """Приоритеты не меняются, а считаются: изменено и восстановлено процессов"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.changed = 0
+        self.restored = 0
+
+    def snapshot(self, process):
+        return {}
+
+    def restore(self, process, state):
+        with self._lock:
+            self.restored += 1
+
+    def set_priority(self, process, level):
+        with self._lock:
+            self.changed += 1
+        return True
+
+    def set_io_priority(self, process, level):
+        return True
+
+    def set_affinity(self, process, cpus):
+        return True
+
+
+class StubAPI:
+    """Бэкенд аренды в памяти; считает одновременные аренды"""
+
+    def __init__(self, rng: random.Random, delay: float):
+        self.rng = rng
+        self.delay = delay
+        self.pc_key = None  # процессы мониторинга не запускаются
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.active = set()
+        self.max_active = 0
+        self.started = 0
+        self.ended = 0
+
+    def _pause(self):
+        time.sleep(self.rng.uniform(0, self.delay))
+
+    def start_rental(self, game_id, duration_hours=1, auto_end_active=True):
+        self._pause()
+        with self._lock:
+            session_id = next(self._ids)
+            self.active.add(session_id)
+            self.started += 1
+            self.max_active = max(self.max_active, len(self.active))
+        return Session(id=session_id, email="account", password="secret")
+
+    def end_rental(self, session_id=None):
+        self._pause()
+        with self._lock:
+            if session_id in self.active:
+                self.active.discard(session_id)
+                self.ended += 1
+        return {"success": True}
+
+    def get_active_rental(self):
+        return None
+
+    def get_2fa_code(self, session_id=None):
+        self._pause()
+        return TwoFactorResponse(success=True, code="7KQ2X")
+
+
+def make_launcher_class(rng: random.Random, delay: float):
+    class SlowFakeLauncher(FakeLauncher):
+        """Фейковый лаунчер с задержками входа и запуска"""
+
+        def __init__(self, config=None):
+            super().__init__(config, delays={"login": rng.uniform(0, delay), "launch": rng.uniform(0, delay)})
+            self.logins = 0
+            self.active_logins = 0
+            self.max_active_logins = 0
+
+        def login(self, session, two_factor):
+            self.logins += 1
+            self.active_logins += 1
+            self.max_active_logins = max(self.max_active_logins, self.active_logins)
+            try:
+                super().login(session, two_factor)
+            finally:
+                self.active_logins -= 1
+
+    return SlowFakeLauncher
+
+
+def check_cancel_during_login(rng: random.Random, problems: list):
+    """Отмена во время долгого входа: лаунчер не ждет до конца и не запускает игру"""
+    launcher = GameLauncher(StubAPI(rng, 0), StubConfig())
+    launcher.resource_governor.backend = RecordingPriorityBackend()
+
+    class HangingLoginLauncher(FakeLauncher):
+        def __init__(self, config=None):
+            super().__init__(config, delays={"login": 20})
+
+    launcher.launchers.register("steam", HangingLoginLauncher)
+    launcher.request_launch(fake_game())
+    if not launcher.launch_state.wait_for([LOGGING_IN], timeout=5):
+        problems.append(f"запуск не дошел до входа: {launcher.launch_state.state}")
+        return
+    time.sleep(0.05)
+    started = time.perf_counter()
+    launcher.cancel_launch()
+    if not launcher.launch_state.wait_for([IDLE], timeout=5):
+        problems.append("отмена не прервала ожидание входа за 5 с")
+        return
+    elapsed = time.perf_counter() - started
+    plugin = launcher.launchers.get("steam")
+    if "launch" in plugin.calls:
+        problems.append("игра запущена после отмены")
+    if elapsed > 1:
+        problems.append(f"отмена во время входа заняла {elapsed:.1f} с")
+    print(f"Отмена во время входа (пауза лаунчера 20 с): {elapsed * 1000:.0f} мс до idle")
+
+
+def run_round(launcher: GameLauncher, rng: random.Random, threads: int, interrupt: bool, stats: dict):
+    game = fake_game()
+    barrier = threading.Barrier(threads)
+    # Без прерываний все потоки только запускают игру, и запуск доходит до running
+    actions = 1.0 if interrupt else 0.8
+
+    def clicker(index: int):
+        barrier.wait()
+        time.sleep(rng.uniform(0, 0.002))
+        action = rng.uniform(0, actions)
+        try:
+            if action < 0.6:
+                launcher.request_launch(game)
+                stats["accepted"] += 1
+            elif action < 0.8:
+                if launcher.launch_game(game):
+                    stats["sync_ok"] += 1
+                stats["accepted"] += 1
+            elif action < 0.9:
+                time.sleep(rng.uniform(0, 0.02))
+                if launcher.cancel_launch():
+                    stats["cancels"] += 1
+            else:
+                time.sleep(rng.uniform(0, 0.03))
+                launcher.end_session()
+        except LaunchBusyError:
+            stats["rejected"] += 1
+
+    workers = [threading.Thread(target=clicker, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Дожидаемся конца запуска, затем завершаем сессию из нескольких потоков сразу
+    if not launcher.launch_state.wait_for([IDLE, RUNNING], timeout=10):
+        raise AssertionError(f"Запуск завис в состоянии {launcher.launch_state.state}")
+    if launcher.launch_state.state == RUNNING:
+        stats["running"] += 1
+        enders = [threading.Thread(target=launcher.end_session) for _ in range(4)]
+        for ender in enders:
+            ender.start()
+        for ender in enders:
+            ender.join()
+    if not launcher.launch_state.wait_for([IDLE], timeout=10):
+        raise AssertionError(f"Сессия не завершилась: {launcher.launch_state.state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Одновременные запуски, отмены и завершения сессии")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=0.01, help="Максимальная задержка этапа, с")
+    parser.add_argument("--interrupt", type=float, default=0.5,
+                        help="Доля раундов с отменами и завершением сессии во время запуска")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    api = StubAPI(rng, args.delay)
+    launcher = GameLauncher(api, StubConfig())
+    priorities = RecordingPriorityBackend()
+    launcher.resource_governor.backend = priorities
+    launcher.launchers.register("steam", make_launcher_class(rng, args.delay))
+    transitions = []
+    launcher.launch_state.subscribe(lambda snapshot: transitions.append(snapshot.state))
+
+    problems = []
+    check_cancel_during_login(rng, problems)
+    if problems:
+        print("НАРУШЕНИЯ: " + "; ".join(problems))
+        return 1
+
+    stats = dict.fromkeys(("accepted", "rejected", "sync_ok", "cancels", "running"), 0)
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        run_round(launcher, rng, args.threads, rng.random() < args.interrupt, stats)
+        plugin = launcher.launchers.get("steam")
+        problems = []
+        if api.max_active > 1:
+            problems.append(f"одновременных аренд: {api.max_active}")
+        if api.active:
+            problems.append(f"незавершенные аренды: {sorted(api.active)}")
+        if plugin.max_active_logins > 1:
+            problems.append(f"одновременных входов: {plugin.max_active_logins}")
+        if plugin.logged_in_as is not None:
+            problems.append("лаунчер не закрыт")
+        if launcher.resource_governor.active:
+            problems.append("приоритеты не возвращены")
+        if launcher.current_session is not None or launcher.launch_state.state != IDLE:
+            problems.append(f"состояние после раунда: {launcher.launch_state.state}")
+        if problems:
+            print("НАРУШЕНИЯ: " + "; ".join(problems))
+            return 1
+    elapsed = time.perf_counter() - started
+
+    plugin = launcher.launchers.get("steam")
+    launch_steps = [state for state in transitions if state in LAUNCH_STATES]
+    print(f"Раундов: {args.rounds} x {args.threads} потоков за {elapsed:.1f} с")
+    print(f"Запусков принято: {stats['accepted']}, отклонено как повторные: {stats['rejected']}, "
+          f"отмен: {stats['cancels']}, дошли до игры: {stats['running']}")
+    print(f"Аренд начато/завершено: {api.started}/{api.ended}, входов в лаунчер: {plugin.logins}, "
+          f"переходов: {len(transitions)} (этапов запуска {len(launch_steps)})")
+    print(f"Игровой режим: изменено приоритетов {priorities.changed}, восстановлено {priorities.restored}")
+    print("Нарушений нет: не больше одной аренды и одного входа одновременно, все аренды завершены")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
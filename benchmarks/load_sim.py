@@ -0,0 +1,293 @@
+"""
+Симуляция нагрузки N рабочих мест клуба на бэкенд
+Каждое место - корутина asyncio, повторяющая поведение клиента: проверка ключа
+запросом активной аренды (main.py, главное окно берет тот же результат) и
+загрузка каталога, начало аренды, опрос кода 2FA, update_status раз в 5 с,
+monitor_game раз в 2 с и два процесса мониторинга с опросом раз в 2 с.
+Запросы выполняет настоящий APIClient (лимиты, объединение, повторы) в пуле
+потоков; по умолчанию - против локальной замены бэкенда.
+
+Время ускоряется в --time-scale раз: все ожидания клиента, лимиты частоты и
+длительность аренды пересчитываются, частота запросов в отчете приведена к
+секундам симуляции.
+
+С --proxy места ходят через кэширующий прокси клуба (club_proxy), и в отчет
+добавляются его счетчики.
+
+Запуск: python benchmarks/load_sim.py --seats 100 --duration 600 --time-scale 20
+        python benchmarks/load_sim.py --seats 500 --session-minutes lognormal:60,0.5 --idle-minutes uniform:1,10
+        python benchmarks/load_sim.py --seats 50 --proxy
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from api_client import APIClient, RetryPolicy
+from api_errors import APIError
+from club_proxy import ClubProxy, create_server
+from standin_backend import BackendState, StandInBackend
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """Разбирает распределение: const:X, uniform:A,B, exp:СРЕДНЕЕ, lognormal:МЕДИАНА,SIGMA, choice:A,B,C"""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'const':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'exp':
+        return lambda rng: rng.expovariate(1 / values[0])
+    if kind == 'lognormal':
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == 'choice':
+        return lambda rng: rng.choice(values)
+    raise ValueError(f"Неизвестное распределение: {spec}")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Задержки и ошибки по эндпоинтам на стороне клиента"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if error:
+                by_type = self.errors.setdefault(endpoint, {})
+                by_type[error] = by_type.get(error, 0) + 1
+
+
+class SimulatedAPIClient(APIClient):
+    """APIClient, который записывает каждый сетевой запрос"""
+
+    def __init__(self, base_url: str, recorder: Recorder, time_scale: float):
+        # Лимиты и задержки повторов в ускоренном времени
+        rate_limits = {endpoint: (rate * time_scale, burst)
+                       for endpoint, (rate, burst) in APIClient.DEFAULT_RATE_LIMITS.items()}
+        retry_policy = RetryPolicy(base_delay=0.5 / time_scale, max_delay=10 / time_scale,
+                                   max_retry_after=30 / time_scale)
+        super().__init__(base_url, rate_limits=rate_limits, retry_policy=retry_policy)
+        self.recorder = recorder
+
+    def _send_request(self, method, endpoint, data=None, params=None, stream=False):
+        # Для потокового ответа (каталог) замеряется время до заголовков
+        name = f"{method} {self._endpoint_group(endpoint)}"
+        started = time.perf_counter()
+        try:
+            result = super()._send_request(method, endpoint, data, params, stream)
+        except APIError as e:
+            self.recorder.record(name, time.perf_counter() - started, type(e).__name__)
+            raise
+        self.recorder.record(name, time.perf_counter() - started)
+        return result
+
+
+class LoadSimulator:
+    """N виртуальных рабочих мест в одном процессе"""
+
+    def __init__(self, base_url: str, seats: int, duration: float, time_scale: float,
+                 session_minutes: Callable, idle_minutes: Callable, ramp: float = 60.0,
+                 process_found: float = 1.0, threads: int = 64, seed: int = 0):
+        self.base_url = base_url
+        self.seats = seats
+        self.duration = duration
+        self.time_scale = time_scale
+        self.session_minutes = session_minutes
+        self.idle_minutes = idle_minutes
+        self.ramp = ramp
+        self.process_found = process_found
+        self.recorder = Recorder()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="seat")
+        self.random = random.Random(seed)
+        self.sessions = 0
+        self.failures = 0
+        self.started = 0.0
+
+    def _client(self, pc_key: str) -> SimulatedAPIClient:
+        client = SimulatedAPIClient(self.base_url, self.recorder, self.time_scale)
+        client.set_key(pc_key)
+        return client
+
+    def _sim_now(self) -> float:
+        return (time.monotonic() - self.started) * self.time_scale
+
+    async def _sleep(self, sim_seconds: float):
+        await asyncio.sleep(max(0.0, sim_seconds) / self.time_scale)
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        except (APIError, ValueError):
+            return None
+
+    async def _every(self, interval: float, func, *args):
+        """Периодический вызов, как call_every планировщика (с разбросом 10%)"""
+        await self._sleep(self.random.uniform(0, interval))
+        while True:
+            await self._call(func, *args)
+            await self._sleep(interval * self.random.uniform(0.9, 1.1))
+
+    async def _seat(self, index: int):
+        rng = random.Random(index)
+        pc_key = f"seat-{index}"
+        main = self._client(pc_key)
+        await self._sleep(rng.uniform(0, self.ramp))
+
+        # Запуск приложения: main.py проверяет ключ запросом аренды без каталога,
+        # главное окно берет аренду из клиента (BOOTSTRAP_MAX_AGE) и загружает каталог
+        await self._call(main.bootstrap, 0.0, False)
+        await self._call(main.bootstrap, 30, False)
+        games = await self._call(main.get_games) or []
+
+        while self._sim_now() < self.duration:
+            await self._sleep(self.idle_minutes(rng) * 60)
+            if self._sim_now() >= self.duration:
+                break
+
+            game_id = rng.choice(games).id if games else 1
+            session = await self._call(main.start_rental, game_id, 1)
+            if session is None:
+                self.failures += 1
+                continue
+
+            # Вход в Steam занимает время до запроса кода
+            await self._sleep(5)
+            code = None
+            for attempt in range(15):
+                response = await self._call(main.get_2fa_code, session.id)
+                if response and response.code:
+                    code = response.code
+                    break
+                await self._sleep(3 + attempt * 0.5)
+            if not code:
+                self.failures += 1
+                await self._call(main.end_rental, session.id)
+                continue
+
+            self.sessions += 1
+            monitors = [self._client(pc_key), self._client(pc_key)]
+            loops = [asyncio.ensure_future(self._every(5, main.get_active_rental))]
+            if rng.random() >= self.process_found:
+                # Процесс игры не найден - monitor_game спрашивает бэкенд
+                loops.append(asyncio.ensure_future(self._every(2, main.get_active_rental)))
+            loops.extend(asyncio.ensure_future(self._every(2, monitor.get_active_rental)) for monitor in monitors)
+
+            await self._sleep(min(self.session_minutes(rng) * 60, self.duration - self._sim_now()))
+            for task in loops:
+                task.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+            await self._call(main.end_rental, session.id)
+
+    async def run(self):
+        self.started = time.monotonic()
+        await asyncio.gather(*(self._seat(i) for i in range(self.seats)))
+        self.executor.shutdown(wait=True)
+
+    def report(self, backend: Optional[StandInBackend] = None, proxy: Optional[ClubProxy] = None):
+        elapsed = time.monotonic() - self.started
+        sim_elapsed = elapsed * self.time_scale
+        print(f"Мест: {self.seats}, симуляция {sim_elapsed:.0f} с за {elapsed:.1f} с реального времени, "
+              f"сессий: {self.sessions}, неудачных запусков: {self.failures}")
+        print(f"{'эндпоинт':32} {'запросов':>9} {'в сек.':>8} {'p50 мс':>8} {'p95 мс':>8} "
+              f"{'p99 мс':>8} {'ошибок':>7}")
+        total = 0
+        for endpoint in sorted(self.recorder.latencies):
+            values = sorted(self.recorder.latencies[endpoint])
+            errors = sum(self.recorder.errors.get(endpoint, {}).values())
+            total += len(values)
+            print(f"{endpoint:32} {len(values):9} {len(values) / sim_elapsed:8.2f} "
+                  f"{percentile(values, 0.5) * 1000:8.1f} {percentile(values, 0.95) * 1000:8.1f} "
+                  f"{percentile(values, 0.99) * 1000:8.1f} {errors / len(values):7.1%}")
+        print(f"{'всего':32} {total:9} {total / sim_elapsed:8.2f}")
+        for endpoint, by_type in sorted(self.recorder.errors.items()):
+            print(f"  ошибки {endpoint}: " + ", ".join(f"{name} {count}" for name, count in sorted(by_type.items())))
+        if backend:
+            served = sum(backend.state.snapshot()["requests"].values())
+            print(f"Бэкенд обработал запросов: {served}")
+            print("  " + ", ".join(f"{endpoint} {count}" for endpoint, count
+                                   in sorted(backend.state.snapshot()["requests"].items())))
+        if proxy:
+            stats = proxy.stats.snapshot()
+            print(f"Прокси: попаданий {stats['hits']}, промахов {stats['misses']}, "
+                  f"hit rate {stats['hit_rate']:.2f}, запросов к бэкенду {stats['upstream_requests']}, "
+                  f"запросов старта {stats['bootstrap_split']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симуляция нагрузки рабочих мест клуба на бэкенд")
+    parser.add_argument("--seats", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=600, help="Длительность в секундах симуляции")
+    parser.add_argument("--time-scale", type=float, default=10, help="Ускорение времени")
+    parser.add_argument("--session-minutes", default="lognormal:60,0.5", help="Распределение длительности сессии")
+    parser.add_argument("--idle-minutes", default="exp:5", help="Распределение паузы между сессиями")
+    parser.add_argument("--ramp", type=float, default=60, help="Разброс включения мест, секунд симуляции")
+    parser.add_argument("--process-found", type=float, default=1.0,
+                        help="Доля сессий, где процесс игры найден (иначе monitor_game опрашивает API)")
+    parser.add_argument("--threads", type=int, default=64, help="Потоков для запросов APIClient")
+    parser.add_argument("--backend", help="Адрес бэкенда (по умолчанию - локальная замена)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Задержка замены бэкенда")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 503 замены бэкенда")
+    parser.add_argument("--proxy", action="store_true", help="Места ходят через кэширующий прокси клуба")
+    parser.add_argument("--verbose", action="store_true", help="Показывать логи APIClient")
+    args = parser.parse_args()
+    if not args.verbose:
+        # Каждая ошибка и повтор пишутся в лог - при сотнях мест это заглушает отчет
+        logging.disable(logging.CRITICAL)
+
+    backend = None
+    base_url = args.backend
+    if not base_url:
+        state = BackendState(latency_ms=args.latency_ms, error_rate=args.error_rate, time_scale=args.time_scale)
+        backend = StandInBackend(state).start()
+        base_url = backend.url
+
+    proxy = server = None
+    if args.proxy:
+        # Время жизни кэша - в ускоренном времени, как и ожидания клиента
+        proxy = ClubProxy(base_url, ttls={path: ttl / args.time_scale for path, ttl in ClubProxy.DEFAULT_TTLS.items()})
+        server = create_server(proxy, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, name="club-proxy", daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    simulator = LoadSimulator(
+        base_url, args.seats, args.duration, args.time_scale,
+        parse_distribution(args.session_minutes), parse_distribution(args.idle_minutes),
+        ramp=args.ramp, process_found=args.process_found, threads=args.threads,
+    )
+    try:
+        asyncio.run(simulator.run())
+    except KeyboardInterrupt:
+        pass
+    simulator.report(backend, proxy)
+    if server:
+        server.shutdown()
+        server.server_close()
+    if backend:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Локальная замена бэкенда passplay.ru для нагрузочных проверок
+Реализует эндпоинты, которые вызывает APIClient, хранит аренды по ключу ПК,
+добавляет задержку и долю ошибок и считает запросы на стороне сервера
+
+Запуск отдельно: python benchmarks/standin_backend.py [--port 8799] [--latency-ms 20] [--error-rate 0.01]
+"""
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, List, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+
+class BackendState:
+    """Состояние и счетчики замены бэкенда"""
+
+    def __init__(self, catalog_size: int = 200, latency_ms: float = 20.0, latency_jitter_ms: float = 10.0,
+                 error_rate: float = 0.0, two_factor_delay: float = 15.0, time_scale: float = 1.0, seed: int = 0,
+                 bootstrap: bool = True, compress: bool = True, bandwidth_kbps: float = 0.0):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        # Скорость отдачи тела ответа, КБ/с (0 - без ограничения)
+        self.bandwidth_kbps = bandwidth_kbps
+        self.error_rate = error_rate
+        # Через сколько секунд после начала аренды "приходит" письмо с кодом
+        self.two_factor_delay = two_factor_delay
+        # Ускорение времени симуляции: длительность аренды и ожидание кода делятся на него
+        self.time_scale = time_scale
+        # Объединенный эндпоинт /club/bootstrap (False - как у старого бэкенда)
+        self.bootstrap = bootstrap
+        # gzip для больших ответов, если клиент его принимает
+        self.compress = compress
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.catalog = [
+            {"id": i, "title": f"Game {i}", "availableAccounts": 1 + i % 5,
+             "steamUrl": f"https://store.steampowered.com/app/{100000 + i}/",
+             "imageUrl": f"https://passplay.ru/covers/{i}.jpg"}
+            for i in range(1, catalog_size + 1)
+        ]
+        self.catalog_body = json.dumps(self.catalog).encode('utf-8')
+        self.catalog_gzip = gzip.compress(self.catalog_body)
+        self.rentals: Dict[str, dict] = {}
+        self._next_session_id = 1
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # Заданные заранее ответы с ошибкой по пути запроса: (статус, заголовки)
+        self.faults: Dict[str, List[Tuple[int, Dict[str, str]]]] = {}
+
+    def inject(self, path: str, status: int, times: int = 1, headers: Optional[Dict[str, str]] = None):
+        """Следующие times запросов к path получат ответ status с заголовками headers"""
+        with self.lock:
+            self.faults.setdefault(path, []).extend([(status, dict(headers or {}))] * times)
+
+    def take_fault(self, path: str) -> Optional[Tuple[int, Dict[str, str]]]:
+        with self.lock:
+            queue = self.faults.get(path)
+            return queue.pop(0) if queue else None
+
+    def count(self, endpoint: str, error: bool = False):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if error:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {"requests": dict(self.requests), "errors": dict(self.errors)}
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: dict) -> Tuple[int, object]:
+        """Возвращает (статус, тело ответа) для запроса"""
+        if path == "/api/games":
+            return 200, self.catalog_body
+        match = re.fullmatch(r"/api/games/(\d+)", path)
+        if match:
+            game_id = int(match.group(1))
+            if 1 <= game_id <= len(self.catalog):
+                return 200, self.catalog[game_id - 1]
+            return 404, {"message": "Игра не найдена"}
+
+        pc_key = query.get("pcKey") or body.get("pcKey")
+        if path.startswith("/api/club/") and not pc_key:
+            return 401, {"message": "Не указан ключ ПК"}
+
+        now = time.monotonic()
+        with self.lock:
+            rental = self.rentals.get(pc_key)
+            if rental and now >= rental["ends_at"]:
+                del self.rentals[pc_key]
+                rental = None
+
+            if path == "/api/club/rental/active" and method == "GET":
+                return 200, self._active_body(rental, now)
+
+            if path == "/api/club/bootstrap" and method == "GET" and self.bootstrap:
+                return 200, {"activeRental": self._active_body(rental, now), "games": self.catalog}
+
+            if path == "/api/club/rental/start" and method == "POST":
+                if rental:
+                    return 400, {"message": "У этого ПК уже есть активная аренда"}
+                hours = body.get("durationHours") or 1
+                game_id = body.get("gameId") or 1
+                session_id = self._next_session_id
+                self._next_session_id += 1
+                self.rentals[pc_key] = {
+                    "id": session_id, "title": f"Game {game_id}", "hours": hours,
+                    "started": now, "ends_at": now + hours * 3600 / self.time_scale,
+                }
+                return 200, {"success": True, "session": {
+                    "id": session_id, "email": f"account{session_id}", "password": "secret"}}
+
+            if path == "/api/club/rental/2fa" and method == "POST":
+                if not rental:
+                    return 404, {"message": "Активная сессия не найдена"}
+                if (now - rental["started"]) * self.time_scale < self.two_factor_delay:
+                    return 200, {"success": True, "code": None, "message": "Код не найден"}
+                return 200, {"success": True, "code": "7KQ2X"}
+
+            if path == "/api/club/rental/end" and method == "POST":
+                self.rentals.pop(pc_key, None)
+                return 200, {"success": True}
+
+        return 404, {"message": "Не найдено"}
+
+
+    def _active_body(self, rental: Optional[dict], now: float) -> dict:
+        if not rental:
+            return {"hasActiveRental": False}
+        remaining = (rental["ends_at"] - now) * self.time_scale / 3600
+        return {"hasActiveRental": True, "rental": {
+            "id": rental["id"], "gameTitle": rental["title"],
+            "remainingHours": round(remaining, 3), "plannedDurationHours": rental["hours"]}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: BackendState = None
+
+    def _process(self, method: str):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+        endpoint = re.sub(r"/\d+(?=/|$)", "/{id}", parts.path)
+
+        state = self.state
+        delay = max(0.0, state.latency_ms + state.random.uniform(-1, 1) * state.latency_jitter_ms) / 1000
+        if delay:
+            time.sleep(delay)
+
+        headers = {}
+        fault = state.take_fault(parts.path)
+        if fault:
+            status, headers = fault
+            payload = {"message": f"Заданная ошибка {status}"}
+        elif state.error_rate and state.random.random() < state.error_rate:
+            status, payload = 503, {"message": "Сервис временно недоступен"}
+        else:
+            status, payload = state.handle(method, parts.path, dict(parse_qsl(parts.query)),
+                                           body if isinstance(body, dict) else {})
+        state.count(f"{method} {endpoint}", error=status >= 500)
+
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        encoding = None
+        if state.compress and len(data) > 1024 and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            data = state.catalog_gzip if payload is state.catalog_body else gzip.compress(data)
+            encoding = "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not state.bandwidth_kbps:
+            self.wfile.write(data)
+            return
+        step = 16 * 1024
+        for offset in range(0, len(data), step):
+            self.wfile.write(data[offset:offset + step])
+            self.wfile.flush()
+            time.sleep(len(data[offset:offset + step]) / 1024 / state.bandwidth_kbps)
+
+    def do_GET(self):
+        self._process("GET")
+
+    def do_POST(self):
+        self._process("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Сотни ПК открывают соединения почти одновременно
+    request_queue_size = 1024
+
+
+class StandInBackend:
+    """HTTP сервер замены бэкенда в фоновом потоке"""
+
+    def __init__(self, state: Optional[BackendState] = None, host: str = "127.0.0.1", port: int = 0):
+        self.state = state or BackendState()
+        handler = type("BoundHandler", (_Handler,), {"state": self.state})
+        self.server = _Server((host, port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StandInBackend':
+        self._thread = threading.Thread(target=self.server.serve_forever, name="standin-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная замена бэкенда passplay.ru")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0.0, help="Скорость отдачи ответа, КБ/с")
+    parser.add_argument("--two-factor-delay", type=float, default=15.0)
+    parser.add_argument("--no-bootstrap", action="store_true", help="Без эндпоинта /club/bootstrap")
+    parser.add_argument("--no-compress", action="store_true", help="Ответы без gzip")
+    args = parser.parse_args()
+
+    state = BackendState(latency_ms=args.latency_ms, error_rate=args.error_rate, bandwidth_kbps=args.bandwidth_kbps,
+                         two_factor_delay=args.two_factor_delay, bootstrap=not args.no_bootstrap, compress=not args.no_compress)
+    backend = StandInBackend(state, args.host, args.port)
+    print(f"Замена бэкенда: {backend.url} (api_base_url для клиента)")
+    try:
+        backend.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(state.snapshot(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Кэш каталога игр на диске
+Последний загруженный каталог сохраняется в JSON, чтобы список можно было
+показать сразу (после игровой сессии или при старте) и обновить из сети в фоне
+"""
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from models import Game, loads, dumps
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """Последний каталог игр в файле"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def save(self, games: List[Game]):
+        tmp_file = self.path.with_suffix('.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                f.write(dumps([game.to_dict() for game in games]))
+            os.replace(tmp_file, self.path)
+        except Exception as e:
+            logger.error("Ошибка при сохранении кэша каталога: %s", e)
+
+    def load(self) -> Optional[List[Game]]:
+        """Каталог из файла или None, если кэша нет или он поврежден"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = loads(f.read())
+            return [Game.from_dict(item) for item in data]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Ошибка при чтении кэша каталога: %s", e)
+            return None
@@ -0,0 +1,362 @@
+"""
+Кэширующий прокси клуба
+Запускается на одной машине в локальной сети клуба, остальные ПК указывают
+его адрес в настройке api_base_url. Каталог игр и состояние аренды отдаются
+из общего кэша, изменения аренды (POST) проксируются на бэкенд без изменений.
+Запрос старта /api/club/bootstrap собирается из тех же двух записей кэша, так
+что старт всех ПК клуба по-прежнему стоит бэкенду одного запроса каталога.
+
+Запуск: python -m club_proxy [--host 0.0.0.0] [--port 8787] [--upstream https://passplay.ru]
+"""
+import logging
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app_logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Заголовки, которые нельзя пересылать между соединениями
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+    'trailers', 'transfer-encoding', 'upgrade', 'content-encoding', 'content-length', 'host',
+}
+
+
+class CacheEntry:
+    """Закэшированный ответ бэкенда"""
+
+    __slots__ = ('status', 'headers', 'body', 'expires_at', 'etag', 'last_modified', 'lock')
+
+    def __init__(self):
+        self.status = 0
+        self.headers: Dict[str, str] = {}
+        self.body = b''
+        self.expires_at = 0.0
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        # Один запрос к бэкенду на ключ, даже если его ждут все ПК клуба
+        self.lock = threading.Lock()
+
+
+class ProxyStats:
+    """Счетчики прокси"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "passthrough": 0,
+            "upstream_requests": 0,
+            "upstream_errors": 0,
+            "stale_served": 0,
+            "bootstrap_split": 0,
+            "evicted": 0,
+        }
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            result = dict(self.counters)
+        cached = result["hits"] + result["misses"] + result["revalidated"]
+        result["hit_rate"] = (result["hits"] + result["revalidated"]) / cached if cached else 0.0
+        return result
+
+
+class ClubProxy:
+    """Логика прокси, не зависящая от HTTP сервера"""
+
+    # Путь -> время жизни кэша в секундах
+    DEFAULT_TTLS = {
+        "/api/games": 300.0,
+        "/api/club/rental/active": 2.0,
+    }
+    # Объединенный запрос старта: аренда ПК и каталог
+    BOOTSTRAP_PATH = "/api/club/bootstrap"
+    # Пределы кэша: каждый поисковый запрос и каждый pcKey - отдельная запись,
+    # поэтому самые давно не запрошенные записи вытесняются
+    MAX_ENTRIES = 1024
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, upstream: str = "https://passplay.ru", ttls: Optional[Dict[str, float]] = None,
+                 pool_size: int = 8, timeout: float = 30, max_entries: int = MAX_ENTRIES,
+                 max_bytes: int = MAX_BYTES):
+        self.upstream = upstream.rstrip('/')
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.timeout = timeout
+        self.stats = ProxyStats()
+
+        # Все ПК используют небольшой пул keep-alive соединений к бэкенду
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Порядок записей - от давно не запрошенных к недавним (LRU)
+        self._cache: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_bytes = 0
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+
+    def _ttl_for(self, path: str) -> Optional[float]:
+        if path in self.ttls:
+            return self.ttls[path]
+        if path.startswith("/api/games/"):
+            return self.ttls.get("/api/games")
+        return None
+
+    def _entry(self, key: Tuple[str, str]) -> CacheEntry:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = CacheEntry()
+                self._cache[key] = entry
+                self._evict_locked()
+            else:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _store(self, key: Tuple[str, str], entry: CacheEntry, status: int, headers: Dict[str, str],
+               body: bytes, expires_at: float):
+        """Сохраняет ответ в запись и учитывает его размер в пределе кэша"""
+        with self._cache_lock:
+            # Запись могли вытеснить или сбросить, пока шел запрос к бэкенду -
+            # тогда ответ отдается клиенту, но в кэш не попадает
+            cached = self._cache.get(key) is entry
+            if cached:
+                self._cache_bytes += len(body) - len(entry.body)
+            entry.status = status
+            entry.headers = headers
+            entry.body = body
+            entry.etag = headers.get('ETag')
+            entry.last_modified = headers.get('Last-Modified')
+            entry.expires_at = expires_at
+            if cached:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        """Вытесняет давно не запрошенные записи сверх пределов (под _cache_lock)"""
+        # Последнюю (только что запрошенную) запись не вытесняем, даже если она одна больше предела
+        while len(self._cache) > 1 and (len(self._cache) > self.max_entries or self._cache_bytes > self.max_bytes):
+            _, entry = self._cache.popitem(last=False)
+            self._cache_bytes -= len(entry.body)
+            self.stats.incr("evicted")
+
+    def cache_size(self) -> Tuple[int, int]:
+        """Возвращает число записей кэша и суммарный размер ответов в байтах"""
+        with self._cache_lock:
+            return len(self._cache), self._cache_bytes
+
+    def invalidate_pc_key(self, pc_key: Optional[str]):
+        """Сбрасывает кэш состояния аренды ПК после изменения аренды"""
+        with self._cache_lock:
+            for key in list(self._cache):
+                path, query = key
+                if path.startswith("/api/club/") and (pc_key is None or ('pcKey', pc_key) in parse_qsl(query)):
+                    self._cache_bytes -= len(self._cache.pop(key).body)
+
+    def handle_get(self, path: str, query: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Обрабатывает GET: из кэша, с ревалидацией или напрямую"""
+        if path == self.BOOTSTRAP_PATH:
+            return self._handle_bootstrap(query, headers)
+        ttl = self._ttl_for(path)
+        if ttl is None:
+            self.stats.incr("passthrough")
+            return self._forward('GET', path, query, headers, None)
+
+        # Параметры сортируем, чтобы одинаковые запросы попадали в один ключ
+        key = (path, "&".join(f"{k}={v}" for k, v in sorted(parse_qsl(query))))
+        entry = self._entry(key)
+
+        if entry.status and time.monotonic() < entry.expires_at:
+            self.stats.incr("hits")
+            return entry.status, entry.headers, entry.body
+
+        with entry.lock:
+            # Пока ждали блокировку, другой поток мог обновить запись
+            if entry.status and time.monotonic() < entry.expires_at:
+                self.stats.incr("hits")
+                return entry.status, entry.headers, entry.body
+
+            conditional = dict(headers)
+            if entry.status == 200:
+                if entry.etag:
+                    conditional['If-None-Match'] = entry.etag
+                if entry.last_modified:
+                    conditional['If-Modified-Since'] = entry.last_modified
+
+            try:
+                status, response_headers, body = self._forward('GET', path, query, conditional, None)
+            except requests.exceptions.RequestException:
+                if entry.status == 200:
+                    # Бэкенд недоступен - отдаем устаревшие данные
+                    self.stats.incr("stale_served")
+                    return entry.status, entry.headers, entry.body
+                raise
+
+            if status == 304 and entry.status == 200:
+                self.stats.incr("revalidated")
+                entry.expires_at = time.monotonic() + ttl
+                return entry.status, entry.headers, entry.body
+
+            self.stats.incr("misses")
+            if status == 200:
+                self._store(key, entry, status, response_headers, body, time.monotonic() + ttl)
+            return status, response_headers, body
+
+    def _handle_bootstrap(self, query: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Ответ /club/bootstrap из кэша аренды и каталога
+
+        Бэкенду уходят (при промахе) обычные запросы аренды и каталога, поэтому
+        прокси работает и с бэкендом без /club/bootstrap. Ошибка аренды
+        (недействительный ключ) возвращается как есть, ошибка каталога - как
+        "games": null, и клиент загрузит каталог отдельно.
+        """
+        self.stats.incr("bootstrap_split")
+        status, response_headers, rental = self.handle_get("/api/club/rental/active", query, headers)
+        if status != 200:
+            return status, response_headers, rental
+        try:
+            games_status, _, games = self.handle_get("/api/games", "", headers)
+        except requests.exceptions.RequestException:
+            games_status, games = 0, b''
+        if games_status != 200:
+            games = b'null'
+        body = b'{"activeRental": ' + rental + b', "games": ' + games + b'}'
+        return 200, {"Content-Type": "application/json; charset=utf-8"}, body
+
+    def handle_post(self, path: str, query: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        """Проксирует изменение аренды без изменений и сбрасывает кэш ПК"""
+        self.stats.incr("passthrough")
+        try:
+            result = self._forward('POST', path, query, headers, body)
+        finally:
+            pc_key = None
+            try:
+                payload = json.loads(body) if body else {}
+                if isinstance(payload, dict):
+                    pc_key = payload.get('pcKey')
+            except ValueError:
+                pass
+            self.invalidate_pc_key(pc_key)
+        return result
+
+    def _forward(self, method: str, path: str, query: str, headers: Dict[str, str],
+                 body: Optional[bytes]) -> Tuple[int, Dict[str, str], bytes]:
+        url = f"{self.upstream}{path}"
+        if query:
+            url += f"?{query}"
+        forward_headers = {k: v for k, v in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+
+        self.stats.incr("upstream_requests")
+        try:
+            response = self.session.request(method, url, headers=forward_headers, data=body, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            self.stats.incr("upstream_errors")
+            logger.error("Ошибка запроса к бэкенду %s %s: %s", method, path, e)
+            raise
+
+        response_headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        return response.status_code, response_headers, response.content
+
+
+class ProxyRequestHandler(BaseHTTPRequestHandler):
+    """HTTP обработчик для ClubProxy"""
+    protocol_version = "HTTP/1.1"
+    proxy: ClubProxy = None
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/proxy/metrics":
+            metrics = self.proxy.stats.snapshot()
+            metrics["cache_entries"], metrics["cache_bytes"] = self.proxy.cache_size()
+            body = json.dumps(metrics).encode('utf-8')
+            self._send(200, {"Content-Type": "application/json"}, body)
+            return
+        try:
+            status, headers, body = self.proxy.handle_get(parts.path, parts.query, dict(self.headers))
+        except requests.exceptions.RequestException as e:
+            self._send_error(e)
+            return
+        self._send(status, headers, body)
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            status, headers, response_body = self.proxy.handle_post(parts.path, parts.query, dict(self.headers), body)
+        except requests.exceptions.RequestException as e:
+            self._send_error(e)
+            return
+        self._send(status, headers, response_body)
+
+    def _send_error(self, error: Exception):
+        body = json.dumps({"message": f"Бэкенд недоступен: {error}"}, ensure_ascii=False).encode('utf-8')
+        self._send(502, {"Content-Type": "application/json"}, body)
+
+    def _send(self, status: int, headers: Dict[str, str], body: bytes):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Журнал каждого запроса от 100 ПК не нужен
+        pass
+
+
+def create_server(proxy: ClubProxy, host: str = "0.0.0.0", port: int = 8787) -> ThreadingHTTPServer:
+    """Создает HTTP сервер прокси (port=0 - свободный порт)"""
+    handler = type("BoundProxyRequestHandler", (ProxyRequestHandler,), {"proxy": proxy})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Кэширующий прокси клуба для API passplay.ru")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--upstream", default="https://passplay.ru")
+    parser.add_argument("--catalog-ttl", type=float, default=ClubProxy.DEFAULT_TTLS["/api/games"])
+    parser.add_argument("--rental-ttl", type=float, default=ClubProxy.DEFAULT_TTLS["/api/club/rental/active"])
+    args = parser.parse_args()
+    setup_logging("club_proxy")
+
+    proxy = ClubProxy(args.upstream, ttls={
+        "/api/games": args.catalog_ttl,
+        "/api/club/rental/active": args.rental_ttl,
+    })
+    server = create_server(proxy, args.host, args.port)
+    logger.info("Прокси клуба запущен на %s:%s -> %s", args.host, server.server_address[1], args.upstream)
+    logger.info("Метрики: http://%s:%s/proxy/metrics", args.host, server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 Модуль для управления конфигурацией приложения
 Обрабатывает сохранение и загрузку настроек, шифрование ключа
 """
+import logging
 import os
 import json
 import base64
@@ -10,18 +11,30 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+logger = logging.getLogger(__name__)
+
+
+def get_config_dir() -> Path:
+    """Каталог конфигурации (AppData/Roaming/RentalDesktop); создается при первом обращении"""
+    config_dir = Path(os.path.expanduser("~")) / "AppData" / "Roaming" / "RentalDesktop"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    return config_dir
+
+
 class Config:
     """Класс для управления конфигурацией приложения"""
     
     def __init__(self):
         # Путь к директории конфигурации (AppData/Roaming/RentalDesktop)
-        self.config_dir = Path(os.path.expanduser("~")) / "AppData" / "Roaming" / "RentalDesktop"
-        self.config_dir.mkdir(parents=True, exist_ok=True)
+        self.config_dir = get_config_dir()
         
         self.config_file = self.config_dir / "config.json"
         self.key_file = self.config_dir / "key.enc"
         self.salt_file = self.config_dir / "salt.dat"
         
+        # Кэши (обложки игр и т.п.) - можно удалить без потери настроек
+        self.cache_dir = self.config_dir / "cache"
+        
         # Настройки по умолчанию
         self.default_settings = {
             "steam_path": "",
@@ -29,7 +42,30 @@ class Config:
             "riot_path": "",
             "battlenet_path": "",
             "vkplay_path": "",
-            "ea_path": ""
+            "ea_path": "",
+            # Адрес API: бэкенд или кэширующий прокси клуба (python -m club_proxy)
+            "api_base_url": "https://passplay.ru",
+            # Журналирование: общий уровень и уровни модулей ({"api_client": "DEBUG"})
+            "log_level": "INFO",
+            "log_levels": {},
+            # Запись запросов API в файл или воспроизведение записи без сети (см. api_transport);
+            # api_replay_latency - множитель записанных задержек (0 - без задержки)
+            "api_record_file": "",
+            "api_replay_file": "",
+            "api_replay_latency": 1.0,
+            # Игровой режим: приоритеты игры и фоновых процессов ("*", ID игры или
+            # подстрока названия -> поля ResourcePolicy, см. resource_governor)
+            "resource_policies": {},
+            # Во время игры сворачиваться в трей и выгружать каталог
+            "game_mode": True,
+            # Прогрев файлов игры в кэше ОС во время входа в лаунчер (скорость, МБ/с; 0 - без ограничения)
+            "prewarm_enabled": True,
+            "prewarm_bandwidth_mb": 100,
+            # Интервал замеров процессов игры для сводки сессии, секунд (0 - отключить)
+            "telemetry_interval": 5,
+            # Выборочное профилирование приложения и мониторов с запуска
+            # (файлы свернутых стеков в profiles/, см. profiler)
+            "profiling": False
         }
         
         self._ensure_salt()
@@ -71,7 +107,7 @@ class Config:
             
             return True
         except Exception as e:
-            print(f"Ошибка при сохранении ключа: {e}")
+            logger.error("Ошибка при сохранении ключа: %s", e)
             return False
     
     def load_key(self) -> str | None:
@@ -88,7 +124,7 @@ class Config:
             
             return decrypted_key.decode()
         except Exception as e:
-            print(f"Ошибка при загрузке ключа: {e}")
+            logger.error("Ошибка при загрузке ключа: %s", e)
             return None
     
     def delete_key(self):
@@ -110,7 +146,7 @@ class Config:
             result.update(settings)
             return result
         except Exception as e:
-            print(f"Ошибка при загрузке настроек: {e}")
+            logger.error("Ошибка при загрузке настроек: %s", e)
             return self.default_settings.copy()
     
     def save_settings(self, settings: dict):
@@ -119,13 +155,17 @@ class Config:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            print(f"Ошибка при сохранении настроек: {e}")
+            logger.error("Ошибка при сохранении настроек: %s", e)
     
     def get_setting(self, key: str, default=None):
         """Получает значение настройки"""
         settings = self.load_settings()
         return settings.get(key, default)
     
+    def get_api_base_url(self) -> str:
+        """Возвращает адрес API (пустое значение - адрес по умолчанию)"""
+        return self.get_setting('api_base_url') or self.default_settings['api_base_url']
+    
     def set_setting(self, key: str, value):
         """Устанавливает значение настройки"""
         settings = self.load_settings()
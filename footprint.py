@@ -0,0 +1,66 @@
+"""
+Память процесса: измерение и возврат неиспользуемой памяти системе
+Используется игровым режимом, чтобы на ПК с 8 ГБ клиент во время игры
+занимал как можно меньше физической памяти
+"""
+import ctypes
+import ctypes.util
+import gc
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+    except OSError:
+        _libc = None
+
+
+def rss_bytes() -> int:
+    """Резидентная память текущего процесса (рабочий набор в Windows)"""
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def trim_memory() -> bool:
+    """Собирает мусор и отдает системе освобожденные страницы
+
+    В Windows рабочий набор сбрасывается (EmptyWorkingSet): страницы уходят в
+    список ожидания и возвращаются при обращении без чтения с диска. В Linux
+    malloc_trim возвращает свободные участки кучи glibc.
+    """
+    gc.collect()
+    try:
+        if sys.platform == 'win32':
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetCurrentProcess()
+            return bool(ctypes.windll.psapi.EmptyWorkingSet(handle))
+        if _libc is not None and hasattr(_libc, 'malloc_trim'):
+            return bool(_libc.malloc_trim(0))
+    except Exception as e:
+        logger.debug("Не удалось сократить рабочий набор: %s", e)
+    return False
+
+
+@dataclass
+class FootprintReport:
+    """Память до и после перехода в игровой режим"""
+    before: int
+    after: Optional[int] = None
+
+    @property
+    def saved(self) -> int:
+        return self.before - (self.after if self.after is not None else self.before)
+
+    def __str__(self) -> str:
+        mb = 1024 * 1024
+        if self.after is None:
+            return f"{self.before / mb:.0f} МБ"
+        return f"{self.before / mb:.0f} -> {self.after / mb:.0f} МБ (освобождено {self.saved / mb:.0f} МБ)"
@@ -2,257 +2,347 @@
 Модуль для запуска игр
 Управляет процессом запуска игры через различные лаунчеры
 """
+import logging
 import os
 import time
 import subprocess
 import psutil
-import pyautogui
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional
 from api_client import APIClient
-from steam_manager import SteamManager
+from api_errors import APIError, ActiveRentalError
+from models import Game, Session
 from config import Config
+from launch_state import LaunchStateMachine, LaunchCancelled, LAUNCH_STATES, LOGGING_IN, LAUNCHING, RUNNING
+from launchers import LauncherRegistry, LauncherPlugin
+from monitor_channel import MonitorHub
+from prewarm import Prewarmer
+from resource_governor import ResourceGovernor, ResourcePolicy, policy_for_game
+from scheduler import get_job_scheduler
+from telemetry import SessionSampler
+
+logger = logging.getLogger(__name__)
 
 class GameLauncher:
     """Класс для запуска игр"""
     
+    # Сколько ждать подключения первого монитора перед запуском второго
+    MONITOR_CONNECT_TIMEOUT = 10.0
+    
     def __init__(self, api_client: APIClient, config: Config):
         self.api_client = api_client
         self.config = config
-        self.current_session: Optional[Dict[str, Any]] = None
-        self.steam_manager: Optional[SteamManager] = None
+        self.current_session: Optional[Session] = None
+        # Этап запуска: не больше одного конвейера запуска и одной сессии
+        self.launch_state = LaunchStateMachine()
+        # Плагины лаунчеров загружаются при первом обращении к платформе
+        self.launchers = LauncherRegistry(config)
+        self.launcher: Optional[LauncherPlugin] = None
         self.game_process: Optional[psutil.Process] = None
         self.monitor_process: Optional[subprocess.Popen] = None
+        # Канал с процессами мониторинга сессии (секреты, статус, остановка)
+        self.monitor_hub: Optional[MonitorHub] = None
+        # Профилировать процессы мониторинга (включается по требованию)
+        self.profile_monitors = False
+        # Приоритеты игры и фоновых процессов на время сессии
+        self.resource_governor = ResourceGovernor()
+        # Прогрев файлов игры на время входа в лаунчер
+        self.prewarmer: Optional[Prewarmer] = None
+        # Замеры процессов игры и сводка последней сессии
+        self.telemetry: Optional[SessionSampler] = None
+        self.last_session_summary: Optional[dict] = None
+    
+    def request_launch(self, game: Game, duration_hours: int = 1) -> int:
+        """Начинает запуск в пуле долгих задач и сразу возвращает номер поколения
+
+        Ход запуска виден в launch_state.
+
+        Raises:
+            LaunchBusyError: Запуск или сессия уже идут
+        """
+        generation = self.launch_state.begin(game.id, game.title)
+        get_job_scheduler().submit(self._launch_pipeline, generation, game, duration_hours, name="launch-game")
+        return generation
+    
+    def launch_game(self, game: Game, duration_hours: int = 1) -> bool:
+        """Запускает игру в текущем потоке
+        
+        Raises:
+            LaunchBusyError: Запуск или сессия уже идут
+        """
+        generation = self.launch_state.begin(game.id, game.title)
+        return self._launch_pipeline(generation, game, duration_hours)
     
-    def launch_game(self, game: Dict[str, Any], duration_hours: int = 1):
-        """Запускает игру"""
+    def cancel_launch(self) -> bool:
+        """Отменяет идущий запуск; аренда завершается, лаунчер закрывается"""
+        return self.launch_state.cancel()
+    
+    def _launch_pipeline(self, generation: int, game: Game, duration_hours: int) -> bool:
+        """Этапы запуска: аренда -> вход в лаунчер -> запуск игры -> running"""
         try:
             # 1. Начинаем аренду через API
-            print(f"Начинаем аренду игры {game['title']}...")
+            logger.info("Начинаем аренду игры %s...", game.title)
             
             try:
-                rental_response = self.api_client.start_rental(game['id'], duration_hours, auto_end_active=True)
-            except Exception as e:
-                # Проверяем, это ли ошибка об активной аренде
-                from api_client import ActiveRentalError
-                error_str = str(e).lower()
-                
-                is_active_rental = (
-                    isinstance(e, ActiveRentalError) or
-                    ("400" in str(e) and ("активная аренда" in error_str or 
-                                         "уже есть активная" in error_str or
-                                         "завершите текущую" in error_str or
-                                         "active rental" in error_str))
-                )
-                
-                if is_active_rental:
-                    print(f"Обнаружена активная аренда: {e}")
-                    print("Автоматически завершаем активную аренду и пробуем снова...")
-                    self._end_active_rental_and_retry(game, duration_hours)
-                    return True
-                else:
-                    # Другая ошибка - пробрасываем дальше
-                    raise e
-            
-            print(f"Ответ start_rental: {rental_response}")
-            
-            if not rental_response.get('success'):
-                raise Exception("Не удалось начать аренду")
+                session = self.api_client.start_rental(game.id, duration_hours, auto_end_active=True)
+            except ActiveRentalError as e:
+                logger.info("Обнаружена активная аренда: %s", e)
+                logger.info("Автоматически завершаем активную аренду и пробуем снова...")
+                session = self._end_active_rental_and_retry(generation, game, duration_hours)
             
-            session = rental_response['session']
+            # Сессию запоминаем до проверки отмены, чтобы прерванный запуск ее завершил
             self.current_session = session
-            print(f"Данные сессии: {session}")
+            logger.info("Данные сессии: %s", session)
             
-            # 2. Получаем информацию об активной аренде для получения platform
-            rental_info = self.api_client.get_active_rental()
-            print(f"Информация об активной аренде: {rental_info}")
-            
-            platform = 'steam'  # По умолчанию
-            if rental_info.get('hasActiveRental') and rental_info.get('rental'):
-                # Platform может быть в данных аккаунта, но обычно это steam для большинства игр
-                # Определяем платформу по наличию steam_url в игре
-                platform = 'steam'  # Пока поддерживаем только Steam
-            
-            # 3. Определяем платформу и запускаем соответствующий лаунчер
-            platform = platform.lower()
-            
-            if platform == 'steam':
-                self._launch_steam_game(session, game)
-            elif platform == 'epic':
-                self._launch_epic_game(session, game)
-            elif platform == 'riot':
-                self._launch_riot_game(session, game)
-            else:
-                raise Exception(f"Неподдерживаемая платформа: {platform}")
+            # 2. Входим и запускаем игру через плагин лаунчера ее платформы
+            self._run_launcher(generation, session, game)
             
+            self.launch_state.advance(generation, RUNNING)
             return True
             
+        except LaunchCancelled as e:
+            logger.info("Запуск %s прерван: %s", game.title, e)
+            self._abort_launch(generation)
+            return False
         except Exception as e:
-            print(f"Ошибка при запуске игры: {e}")
+            logger.error("Ошибка при запуске игры: %s", e)
             # Завершаем сессию при ошибке
-            if self.current_session:
-                try:
-                    self.api_client.end_rental(self.current_session['id'])
-                except:
-                    pass
+            self._abort_launch(generation, str(e))
             return False
     
-    def _end_active_rental_and_retry(self, game: Dict[str, Any], duration_hours: int):
+    def _abort_launch(self, generation: int, error: Optional[str] = None):
+        """Сворачивает прерванный запуск: мониторинг, лаунчер и аренда"""
+        if not self.launch_state.begin_ending(generation):
+            return
+        try:
+            self._cleanup_session()
+        finally:
+            self.launch_state.finish(error)
+    
+    def _end_active_rental_and_retry(self, generation: int, game: Game, duration_hours: int) -> Session:
         """Завершает активную аренду и пытается начать новую"""
         try:
             # Получаем информацию об активной аренде
-            print("Получаем информацию об активной аренде...")
-            rental_info = self.api_client.get_active_rental()
+            logger.info("Получаем информацию об активной аренде...")
+            active_rental = self.api_client.get_active_rental()
             
-            if rental_info.get('hasActiveRental') and rental_info.get('rental'):
-                active_rental = rental_info['rental']
-                session_id = active_rental.get('id')
+            if active_rental:
+                session_id = active_rental.id
                 
                 if session_id:
-                    print(f"Завершаем активную аренду (session_id: {session_id})...")
+                    logger.info("Завершаем активную аренду (session_id: %s)...", session_id)
                     
                     # Завершаем активную аренду
                     try:
                         self.api_client.end_rental(session_id)
-                        print("Активная аренда успешно завершена")
+                        logger.info("Активная аренда успешно завершена")
                     except Exception as e:
-                        print(f"Ошибка при завершении активной аренды: {e}")
+                        logger.error("Ошибка при завершении активной аренды: %s", e)
                         # Пробуем завершить без session_id
                         try:
                             self.api_client.end_rental()
-                            print("Активная аренда завершена (без session_id)")
+                            logger.info("Активная аренда завершена (без session_id)")
                         except Exception as e2:
-                            print(f"Не удалось завершить активную аренду: {e2}")
+                            logger.error("Не удалось завершить активную аренду: %s", e2)
                             raise Exception("Не удалось завершить активную аренду")
                 else:
-                    print("Не удалось определить session_id активной аренды")
+                    logger.error("Не удалось определить session_id активной аренды")
                     # Пробуем завершить без session_id
                     try:
                         self.api_client.end_rental()
-                        print("Активная аренда завершена (без session_id)")
+                        logger.info("Активная аренда завершена (без session_id)")
                     except Exception as e:
-                        print(f"Не удалось завершить активную аренду: {e}")
+                        logger.error("Не удалось завершить активную аренду: %s", e)
                         raise Exception("Не удалось завершить активную аренду")
             else:
-                print("Активная аренда не найдена (возможно, уже завершена)")
+                logger.info("Активная аренда не найдена (возможно, уже завершена)")
             
-            # Небольшая задержка перед повторной попыткой
-            import time
-            time.sleep(1)
+            # Небольшая задержка перед повторной попыткой (прерывается отменой)
+            self.launch_state.wait(generation, 1)
             
             # Пытаемся начать новую аренду
-            print("Повторная попытка начать аренду...")
-            rental_response = self.api_client.start_rental(game['id'], duration_hours, auto_end_active=False)
-            
-            print(f"Ответ start_rental (повторная попытка): {rental_response}")
-            
-            if not rental_response.get('success'):
-                raise Exception("Не удалось начать аренду после завершения предыдущей")
-            
-            session = rental_response['session']
-            self.current_session = session
-            print(f"Данные сессии (повторная попытка): {session}")
-            
-            # Получаем информацию об активной аренде для получения platform
-            rental_info = self.api_client.get_active_rental()
-            print(f"Информация об активной аренде: {rental_info}")
-            
-            platform = 'steam'  # По умолчанию
-            if rental_info.get('hasActiveRental') and rental_info.get('rental'):
-                platform = 'steam'  # Пока поддерживаем только Steam
+            logger.info("Повторная попытка начать аренду...")
+            try:
+                session = self.api_client.start_rental(game.id, duration_hours, auto_end_active=False)
+            except Exception as e:
+                raise Exception(f"Не удалось начать аренду после завершения предыдущей: {e}")
             
-            # Определяем платформу и запускаем соответствующий лаунчер
-            platform = platform.lower()
-            
-            if platform == 'steam':
-                self._launch_steam_game(session, game)
-            elif platform == 'epic':
-                self._launch_epic_game(session, game)
-            elif platform == 'riot':
-                self._launch_riot_game(session, game)
-            else:
-                raise Exception(f"Неподдерживаемая платформа: {platform}")
+            logger.info("Данные сессии (повторная попытка): %s", session)
+            return session
             
+        except LaunchCancelled:
+            raise
         except Exception as e:
-            print(f"Ошибка при завершении активной аренды и повторной попытке: {e}")
+            logger.error("Ошибка при завершении активной аренды и повторной попытке: %s", e)
             raise Exception(f"Не удалось завершить активную аренду и начать новую: {e}")
     
-    def _launch_steam_game(self, session: Dict[str, Any], game: Dict[str, Any]):
-        """Запускает игру через Steam"""
-        steam_path = self.config.get_setting('steam_path')
-        if not steam_path:
-            raise Exception("Путь к Steam не указан в настройках")
+    def _run_launcher(self, generation: int, session: Session, game: Game):
+        """Запускает игру через плагин лаунчера ее платформы"""
+        platform = self.platform_for(game)
+        self.launcher = self.launchers.get(platform)
+        self.launch_state.advance(generation, LOGGING_IN)
+        
+        # Паузы плагина при входе и запуске прерываются отменой
+        self.launcher.wait = lambda seconds: self.launch_state.wait(generation, seconds)
+        try:
+            # Пока идут вход и ожидание кода 2FA, читаем файлы игры в кэш ОС
+            self._start_prewarm(game)
+            try:
+                self.launcher.login(session, lambda: self._fetch_two_factor_code(generation))
+            finally:
+                # Дальше файлы читает сама игра; параллельное чтение только мешало бы ей
+                self._stop_prewarm()
+            self.launch_state.advance(generation, LAUNCHING)
+            self.launcher.launch(game)
+        finally:
+            # Завершение сессии (teardown) отменой не прерывается
+            self.launcher.wait = time.sleep
         
-        self.steam_manager = SteamManager(steam_path)
+        # Находим процесс игры
+        self.game_process = self.launcher.detect_game(game)
+        if not self.game_process:
+            logger.warning("Процесс игры не найден, но игра может быть запущена")
+        self.launch_state.checkpoint(generation)
         
-        # Запускаем Steam
-        self.steam_manager.start_steam()
-        time.sleep(3)
+        # Запускаем процесс мониторинга после запуска игры
+        logger.info("Запускаем процесс мониторинга...")
+        self._start_monitor_process()
         
-        # Шаг 1: Входим в Steam с логином и паролем (без 2FA)
-        print("Входим в Steam...")
-        self.steam_manager.login_to_steam(
-            session['email'],
-            session['password']
+        # Игровой режим: после запуска мониторинга, чтобы понизить и его процессы
+        if self.game_process:
+            self._apply_resource_policy(game)
+            self._start_telemetry()
+    
+    def _apply_resource_policy(self, game: Game):
+        """Игровой режим - по возможности: игра уже запущена, сбой не должен завершать аренду"""
+        try:
+            self.resource_governor.apply(self.game_process, self.resource_policy_for(game))
+        except Exception as e:
+            logger.exception("Не удалось применить игровой режим: %s", e)
+    
+    def _start_telemetry(self):
+        interval = float(self.config.get_setting('telemetry_interval', 5) or 0)
+        if interval <= 0:
+            return
+        try:
+            self.telemetry = SessionSampler(self.game_process, interval=interval)
+            self.telemetry.start()
+        except Exception as e:
+            # Замеры необязательны: игра уже запущена, аренду из-за них не завершаем
+            logger.exception("Не удалось включить телеметрию сессии: %s", e)
+            self.telemetry = None
+    
+    def _stop_telemetry(self):
+        if not self.telemetry:
+            return
+        self.telemetry.stop()
+        summary = self.telemetry.summary()
+        self.telemetry = None
+        self.last_session_summary = summary
+        cpu, rss = summary['cpu'], summary['rss']
+        logger.info(
+            "Телеметрия сессии: %s замеров, CPU p50/p95/max %.0f/%.0f/%.0f%%, память max %.0f МБ, затраты %.3f%%",
+            summary['samples'], cpu['p50'], cpu['p95'], cpu['max'], rss['max'] / 1024 ** 2,
+            summary.get('overhead_pct', 0),
+            extra={"telemetry": summary},
         )
+    
+    def _start_prewarm(self, game: Game):
+        if not self.config.get_setting('prewarm_enabled', True):
+            return
+        install_dir = self.launcher.install_dir(game)
+        if not install_dir:
+            logger.info("Каталог игры не найден, прогрев файлов пропущен")
+            return
+        bandwidth = float(self.config.get_setting('prewarm_bandwidth_mb', 100) or 0) * 1024 * 1024
+        prewarmer = Prewarmer(install_dir=install_dir, bandwidth=bandwidth)
+        self.prewarmer = prewarmer
         
-        # Шаг 2: После нажатия "Войти" Steam запросит код 2FA
-        # Ждем, пока Steam обработает логин/пароль и отправит письмо с кодом
-        print("Ожидание запроса кода 2FA от Steam...")
-        time.sleep(5)  # Даем больше времени на отправку письма после попытки входа
+        def run():
+            logger.info("Прогрев файлов игры из %s", install_dir)
+            logger.info("Прогрев файлов игры: %s", prewarmer.run())
         
-        # Теперь получаем код 2FA
-        print("Получаем код двухфакторной авторизации...")
+        get_job_scheduler().submit(run, name="prewarm")
+    
+    def _stop_prewarm(self):
+        prewarmer, self.prewarmer = self.prewarmer, None
+        if prewarmer:
+            prewarmer.cancel()
+    
+    def resource_policy_for(self, game: Game) -> ResourcePolicy:
+        """Политика ресурсов игры из настроек resource_policies"""
+        return policy_for_game(self.config.get_setting('resource_policies') or {}, game.id, game.title)
+    
+    @staticmethod
+    def platform_for(game: Game) -> str:
+        """Платформа игры; если бэкенд ее не передал - Steam"""
+        return str(game.get_extra('platform') or 'steam').lower()
+    
+    def warm_up(self, game: Game):
+        """Загружает и прогревает плагин лаунчера игры в фоне"""
+        get_job_scheduler().submit(self.launchers.warm_up, self.platform_for(game), name="launcher-warm-up")
+    
+    def _fetch_two_factor_code(self, generation: Optional[int] = None) -> str:
+        """Запрашивает код 2FA для текущей сессии, повторяя, пока письмо не придет
+        
+        Ожидание между попытками прерывается отменой запуска generation
+        """
+        logger.info("Получаем код двухфакторной авторизации...")
         
         max_retries = 15  # Увеличиваем количество попыток
         two_factor_code = None
         last_error = None
+        retry_after = None
         
         for attempt in range(max_retries):
             try:
                 # Бэкенд ожидает sessionId (ID сессии аренды)
                 # Если sessionId не указан, бэкенд сам найдет активную сессию по pcKey
-                session_id = self.current_session.get('id')
+                session_id = self.current_session.id
                 
-                print(f"Запрос 2FA (попытка {attempt + 1}): sessionId={session_id}")
+                logger.info("Запрос 2FA (попытка %s): sessionId=%s", attempt + 1, session_id)
                 
                 # Передаем sessionId, если он есть (опционально - бэкенд может найти сам)
                 response = self.api_client.get_2fa_code(session_id=session_id)
                 
                 # Проверяем ответ
-                if response.get('success'):
-                    code = response.get('code')
-                    if code:
-                        two_factor_code = code
-                        print(f"Получен код 2FA: {two_factor_code}")
+                if response.success:
+                    if response.code:
+                        two_factor_code = response.code
+                        logger.info("Получен код 2FA: %s", two_factor_code)
                         break
                     else:
-                        message = response.get('message', 'Код не найден')
-                        print(f"Попытка {attempt + 1}: {message}")
+                        message = response.message or 'Код не найден'
+                        logger.info("Попытка %s: %s", attempt + 1, message)
                         last_error = message
                 else:
-                    message = response.get('message', 'Неизвестная ошибка')
-                    print(f"Попытка {attempt + 1}: {message}")
+                    message = response.message or 'Неизвестная ошибка'
+                    logger.info("Попытка %s: %s", attempt + 1, message)
                     last_error = message
                     
-            except Exception as e:
+            except APIError as e:
                 error_msg = str(e)
-                print(f"Попытка {attempt + 1}: {error_msg}")
+                logger.warning("Попытка %s: %s", attempt + 1, error_msg)
                 last_error = error_msg
                 
-                # Если это не ошибка "код не найден", продолжаем попытки
-                if "500" in error_msg or "Server Error" in error_msg:
-                    # Серверная ошибка - возможно, письмо еще не пришло
-                    pass
-                elif "404" in error_msg or "403" in error_msg or "401" in error_msg:
-                    # Критическая ошибка - прекращаем попытки
+                # Серверная или сетевая ошибка - возможно, письмо еще не пришло,
+                # продолжаем попытки. Ошибки клиента (ключ, доступ, сессия) повтором не исправить
+                if not e.retryable:
                     raise
+                retry_after = e.retry_after
             
             # Увеличиваем интервал между попытками
             if attempt < max_retries - 1:
                 wait_time = 3 + (attempt * 0.5)  # Постепенно увеличиваем время ожидания
-                print(f"Ожидание {wait_time:.1f} секунд перед следующей попыткой...")
-                time.sleep(wait_time)
+                if retry_after:
+                    # Бэкенд или предохранитель подсказали, когда повторять
+                    wait_time = max(wait_time, retry_after)
+                    retry_after = None
+                logger.info("Ожидание %.1f секунд перед следующей попыткой...", wait_time)
+                if generation is None:
+                    time.sleep(wait_time)
+                else:
+                    self.launch_state.wait(generation, wait_time)
         
         if not two_factor_code:
             error_message = f"Не удалось получить код 2FA после {max_retries} попыток"
@@ -260,98 +350,7 @@ class GameLauncher:
                 error_message += f". Последняя ошибка: {last_error}"
             raise Exception(error_message)
         
-        # Шаг 3: Вводим код 2FA
-        print("Вводим код 2FA...")
-        time.sleep(1)
-        pyautogui.hotkey('ctrl', 'a')  # Очищаем поле ввода
-        time.sleep(0.2)
-        pyautogui.write(two_factor_code, interval=0.1)
-        time.sleep(0.5)
-        pyautogui.press('enter')
-        time.sleep(5)  # Ждем завершения входа
-        
-        time.sleep(5)
-        
-        # Блокируем Steam UI
-        print("Блокируем доступ к Steam UI...")
-        self.steam_manager.block_steam_ui()
-        
-        # Запускаем игру
-        # Для CS2 нужно использовать правильный App ID
-        # Обычно это можно получить из steam_url игры
-        steam_url = game.get('steamUrl', '')
-        app_id = None
-        
-        if steam_url:
-            # Извлекаем App ID из URL
-            import re
-            match = re.search(r'/app/(\d+)', steam_url)
-            if match:
-                app_id = int(match.group(1))
-            else:
-                # Пробуем найти в других форматах URL
-                match = re.search(r'appid[=:](\d+)', steam_url, re.IGNORECASE)
-                if match:
-                    app_id = int(match.group(1))
-        
-        if not app_id:
-            # Для CS2 используем известный App ID (730 для CS:GO/CS2)
-            # Можно добавить маппинг известных игр
-            game_title_lower = game.get('title', '').lower()
-            if 'counter-strike' in game_title_lower or 'cs2' in game_title_lower or 'cs:go' in game_title_lower:
-                app_id = 730
-            else:
-                raise Exception("Не удалось определить App ID игры. Укажите Steam URL в настройках игры.")
-        
-        print(f"Запускаем игру с App ID: {app_id}")
-        self.steam_manager.launch_game(app_id)
-        
-        # Ждем запуска игры
-        time.sleep(10)
-        
-        # Находим процесс игры
-        # Ждем немного больше времени для запуска игры
-        time.sleep(10)
-        
-        game_title = game['title'].lower()
-        self.game_process = None
-        
-        # Пробуем найти по известным именам процессов (более надежно)
-        # Можно расширить список для других игр
-        process_names = []
-        
-        if 'counter-strike' in game_title or 'cs2' in game_title or 'cs:go' in game_title:
-            process_names = ['cs2.exe', 'csgo.exe', 'hl.exe']
-        elif 'dota' in game_title:
-            process_names = ['dota2.exe']
-        elif 'half-life' in game_title:
-            process_names = ['hl.exe', 'hl2.exe']
-        else:
-            # Пробуем найти по названию игры
-            process_names = [f"{game_title.replace(' ', '').replace(':', '').lower()}.exe"]
-        
-        for name in process_names:
-            self.game_process = self.steam_manager.find_game_process(name)
-            if self.game_process:
-                print(f"Найден процесс игры: {name}")
-                break
-        
-        if not self.game_process:
-            print("Предупреждение: процесс игры не найден, но игра может быть запущена")
-        
-        # Запускаем процесс мониторинга после запуска игры
-        print("Запускаем процесс мониторинга...")
-        self._start_monitor_process()
-    
-    def _launch_epic_game(self, session: Dict[str, Any], game: Dict[str, Any]):
-        """Запускает игру через Epic Games"""
-        # TODO: Реализовать запуск через Epic Games
-        raise NotImplementedError("Epic Games лаунчер пока не реализован")
-    
-    def _launch_riot_game(self, session: Dict[str, Any], game: Dict[str, Any]):
-        """Запускает игру через Riot Games"""
-        # TODO: Реализовать запуск через Riot Games
-        raise NotImplementedError("Riot Games лаунчер пока не реализован")
+        return two_factor_code
     
     def monitor_game(self):
         """Мониторит процесс игры и программы"""
@@ -363,22 +362,21 @@ class GameLauncher:
             try:
                 # Проверяем, запущена ли игра
                 if not self.game_process.is_running():
-                    print("Игра была закрыта")
+                    logger.info("Игра была закрыта")
                     self.end_session()
                     return False
                 
                 return True
             except psutil.NoSuchProcess:
-                print("Процесс игры не найден")
+                logger.warning("Процесс игры не найден")
                 self.end_session()
                 return False
         else:
             # Если процесс не был найден, проверяем активную аренду через API
             # Если аренда все еще активна, продолжаем мониторинг
             try:
-                rental_info = self.api_client.get_active_rental()
-                if not rental_info.get('hasActiveRental'):
-                    print("Аренда завершена")
+                if not self.api_client.get_active_rental():
+                    logger.info("Аренда завершена")
                     self.end_session()
                     return False
                 return True
@@ -403,15 +401,22 @@ class GameLauncher:
             monitor_script = script_dir / "process_monitor.py"
             
             if not monitor_script.exists():
-                print(f"Предупреждение: скрипт мониторинга не найден: {monitor_script}")
+                logger.warning("Скрипт мониторинга не найден: %s", monitor_script)
                 return
             
             # Запускаем процесс мониторинга
             pc_key = self.api_client.pc_key
             if not pc_key:
-                print("Предупреждение: ключ ПК не установлен, невозможно запустить мониторинг")
+                logger.warning("Ключ ПК не установлен, невозможно запустить мониторинг")
                 return
             
+            # Ключ ПК передается по каналу, а не в командной строке
+            hub = MonitorHub({"pc_key": pc_key, "session_id": self.current_session.id,
+                              "profile": self.profile_monitors})
+            hub.start()
+            self.monitor_hub = hub
+            creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
+            
             # Сначала запускаем один процесс мониторинга
             # Он будет отслеживать главный процесс и игру
             monitor_pid = main_pid  # Пока используем тот же PID
@@ -421,75 +426,96 @@ class GameLauncher:
                 str(monitor_script),
                 str(main_pid),
                 str(monitor_pid),
-                str(self.current_session['id']),
-                pc_key
+                str(self.current_session.id),
             ]
             
-            print(f"Запуск процесса мониторинга: {args}")
-            self.monitor_process = subprocess.Popen(
-                args,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
-            )
-            
-            print(f"Процесс мониторинга запущен с PID: {self.monitor_process.pid}")
+            logger.info("Запуск процесса мониторинга для сессии %s", self.current_session.id)
+            primary = hub.spawn(args, "primary", creationflags=creationflags)
+            self.monitor_process = primary.process
             
-            # Теперь запускаем второй процесс мониторинга, который будет следить за первым
-            args2 = [
-                sys.executable,
-                str(monitor_script),
-                str(main_pid),
-                str(self.monitor_process.pid),
-                str(self.current_session['id']),
-                pc_key
-            ]
+            logger.info("Процесс мониторинга запущен с PID: %s", self.monitor_process.pid)
             
-            monitor_process2 = subprocess.Popen(
-                args2,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
-            )
+            # Второй процесс мониторинга следит за первым. Настоящий PID первого
+            # (из его hello) второй получит по каналу: PID Popen в venv на Windows
+            # принадлежит промежуточному процессу, и его heartbeat не найти
+            if not hub.wait_connected(self.MONITOR_CONNECT_TIMEOUT):
+                logger.warning("Первый процесс мониторинга не подключился к каналу, "
+                               "второй будет следить только за приложением")
+            monitor_process2 = hub.spawn(args, "watchdog", watch=primary, creationflags=creationflags).process
             
-            print(f"Второй процесс мониторинга запущен с PID: {monitor_process2.pid}")
+            logger.info("Второй процесс мониторинга запущен с PID: %s", monitor_process2.pid)
             
         except Exception as e:
-            print(f"Ошибка при запуске процесса мониторинга: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка при запуске процесса мониторинга: %s", e)
     
-    def end_session(self):
-        """Завершает сессию аренды"""
-        if not self.current_session:
+    def set_monitor_profiling(self, enabled: bool) -> list:
+        """Профилирование процессов мониторинга (и запущенных позже в этой сессии)
+        
+        Returns:
+            Файлы профилей, записанные мониторами при выключении
+        """
+        self.profile_monitors = enabled
+        if not self.monitor_hub:
+            return []
+        replies = self.monitor_hub.broadcast("profile", enabled=enabled)
+        return [reply["file"] for reply in replies.values() if reply and reply.get("file")]
+    
+    def monitor_status(self) -> list:
+        """Состояние процессов мониторинга (запрос по каналу, без файлов на диске)"""
+        return self.monitor_hub.status() if self.monitor_hub else []
+    
+    def _stop_monitors(self):
+        hub, self.monitor_hub = self.monitor_hub, None
+        self.monitor_process = None
+        if not hub:
             return
+        try:
+            logger.info("Останавливаем процессы мониторинга...")
+            hub.stop()
+        except Exception as e:
+            logger.error("Ошибка при остановке процессов мониторинга: %s", e)
+    
+    def end_session(self):
+        """Завершает сессию аренды
         
+        Во время запуска - отменяет его (сессию свернет сам конвейер запуска);
+        повторный вызов во время завершения ничего не делает.
+        """
+        if self.launch_state.state in LAUNCH_STATES:
+            self.cancel_launch()
+            return
+        if not self.launch_state.begin_ending():
+            return
+        try:
+            self._cleanup_session()
+        finally:
+            self.launch_state.finish()
+    
+    def _cleanup_session(self):
+        """Останавливает все, что запущено для сессии, и завершает аренду"""
         try:
-            # Останавливаем процесс мониторинга
-            if self.monitor_process:
-                try:
-                    print("Останавливаем процесс мониторинга...")
-                    self.monitor_process.terminate()
-                    self.monitor_process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    print("Принудительное завершение процесса мониторинга...")
-                    self.monitor_process.kill()
-                except Exception as e:
-                    print(f"Ошибка при остановке процесса мониторинга: {e}")
-                finally:
-                    self.monitor_process = None
+            # Сводка замеров - пока процессы игры еще не закрыты лаунчером
+            self._stop_telemetry()
             
-            # Закрываем Steam
-            if self.steam_manager:
-                print("Закрываем Steam...")
-                self.steam_manager.close_steam()
+            # Возвращаем приоритеты до остановки мониторинга и лаунчера
+            self.resource_governor.restore()
+            
+            # Останавливаем процессы мониторинга
+            self._stop_monitors()
+            
+            # Выходим из аккаунта и закрываем лаунчер
+            if self.launcher:
+                self.launcher.teardown()
             
             # Завершаем сессию через API
-            print("Завершаем сессию аренды...")
-            self.api_client.end_rental(self.current_session['id'])
+            if self.current_session:
+                logger.info("Завершаем сессию аренды...")
+                self.api_client.end_rental(self.current_session.id)
             
+        except Exception as e:
+            logger.exception("Ошибка при завершении сессии: %s", e)
+        finally:
             self.current_session = None
-            self.steam_manager = None
+            self.launcher = None
             self.game_process = None
-            
-        except Exception as e:
-            print(f"Ошибка при завершении сессии: {e}")
-            import traceback
-            traceback.print_exc()
 
@@ -0,0 +1,154 @@
+"""
+Дисковый кэш изображений (обложек игр)
+Содержимое хранится по хэшу (content-addressed), индекс URL -> хэш ведется
+в журнале с дозаписью; при превышении лимита удаляются самые старые файлы
+"""
+import logging
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict
+
+
+logger = logging.getLogger(__name__)
+
+class DiskImageCache:
+    """Content-addressed кэш на диске с вытеснением по суммарному размеру"""
+
+    INDEX_NAME = "index.log"
+
+    def __init__(self, directory: Path, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.directory / self.INDEX_NAME
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        # digest -> [размер, время последнего доступа]
+        self._objects: Dict[str, list] = {}
+        self._total_bytes = 0
+        self._load()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _load(self):
+        """Загружает индекс и размеры объектов"""
+        for path in self.objects_dir.glob("*/*"):
+            if path.suffix:
+                # Недописанный временный файл
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._objects[path.name] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+        lines = 0
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        lines += 1
+                        key, sep, digest = line.rstrip('\n').rpartition('\t')
+                        if sep and digest in self._objects:
+                            self._index[key] = digest
+            except Exception as e:
+                logger.error("Ошибка при чтении индекса кэша изображений: %s", e)
+
+        # Журнал разросся из-за перезаписей и вытеснений - переписываем его
+        if lines > 2 * len(self._index) + 100:
+            self._compact_index()
+
+    def _compact_index(self):
+        tmp_file = self.index_file.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for key, digest in self._index.items():
+                    f.write(f"{key}\t{digest}\n")
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            logger.error("Ошибка при сжатии индекса кэша изображений: %s", e)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Возвращает данные по ключу (обычно URL) или None"""
+        with self._lock:
+            digest = self._index.get(key)
+            if not digest or digest not in self._objects:
+                return None
+            self._objects[digest][1] = time.time()
+
+        path = self._object_path(digest)
+        try:
+            data = path.read_bytes()
+            # Время изменения служит временем доступа для вытеснения после перезапуска
+            os.utime(path, None)
+            return data
+        except OSError:
+            with self._lock:
+                self._index.pop(key, None)
+            return None
+
+    def put(self, key: str, data: bytes) -> str:
+        """Сохраняет данные и возвращает их хэш"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        with self._lock:
+            exists = digest in self._objects
+
+        if not exists:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            if digest not in self._objects:
+                self._objects[digest] = [len(data), time.time()]
+                self._total_bytes += len(data)
+            else:
+                self._objects[digest][1] = time.time()
+            if self._index.get(key) != digest:
+                self._index[key] = digest
+                try:
+                    with open(self.index_file, 'a', encoding='utf-8') as f:
+                        f.write(f"{key}\t{digest}\n")
+                except OSError as e:
+                    logger.error("Ошибка при записи индекса кэша изображений: %s", e)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+        return digest
+
+    def _evict(self):
+        """Удаляет самые давно использованные объекты до 90% лимита"""
+        target = int(self.max_bytes * 0.9)
+        victims = sorted(self._objects.items(), key=lambda item: item[1][1])
+        removed = set()
+        for digest, (size, _) in victims:
+            if self._total_bytes <= target:
+                break
+            try:
+                self._object_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            del self._objects[digest]
+            self._total_bytes -= size
+            removed.add(digest)
+
+        if removed:
+            self._index = {key: digest for key, digest in self._index.items() if digest not in removed}
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
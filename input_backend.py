@@ -0,0 +1,300 @@
+"""
+Ввод текста и клавиш в окна лаунчеров
+Вместо посимвольного pyautogui.write с паузами вся последовательность
+(очистка поля, текст, Tab, Enter) отправляется одним вызовом SendInput,
+только если целевое окно действительно в фокусе. Для тестов на Linux есть
+записывающий фейковый бэкенд
+"""
+import ctypes
+import logging
+import sys
+import time
+from typing import Optional, List, Tuple, Sequence, Dict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import win32gui
+    import win32con
+except ImportError:
+    win32gui = None
+    win32con = None
+
+# Действие последовательности: ('text', 'строка'), ('key', 'tab'), ('hotkey', ('ctrl', 'a'))
+Action = Tuple[str, object]
+
+
+class InputTargetError(Exception):
+    """Целевое окно не в фокусе или текст попал не туда"""
+    pass
+
+
+def fields_sequence(values: Sequence[str]) -> List[Action]:
+    """Последовательность заполнения полей формы по порядку (через Tab)"""
+    actions: List[Action] = []
+    for index, value in enumerate(values):
+        if index:
+            actions.append(('key', 'tab'))
+        actions.append(('hotkey', ('ctrl', 'a')))
+        actions.append(('text', value))
+    return actions
+
+
+class InputBackend:
+    """Интерфейс бэкенда ввода"""
+
+    name = "base"
+
+    def focus(self, hwnd: int) -> bool:
+        """Переводит фокус на окно; True - окно в фокусе"""
+        raise NotImplementedError
+
+    def is_focused(self, hwnd: int) -> bool:
+        raise NotImplementedError
+
+    def send(self, actions: Sequence[Action]):
+        """Отправляет последовательность действий"""
+        raise NotImplementedError
+
+    def read_text(self, hwnd: int) -> Optional[str]:
+        """Текст поля ввода окна; None - прочитать нельзя (например, окна CEF)"""
+        return None
+
+    def enter(self, hwnd: Optional[int], actions: Sequence[Action], submit: bool = True):
+        """Вводит последовательность в окно с проверкой и подтверждает Enter
+
+        Enter отправляется только после проверки, что окно осталось в фокусе
+        и (если поле читается) в нем оказался последний введенный текст.
+
+        Raises:
+            InputTargetError: окно не получило фокус, фокус ушел во время
+                ввода или текст в поле не совпал с введенным
+        """
+        if hwnd is not None and not self.focus(hwnd):
+            raise InputTargetError(f"Окно {hwnd} не получило фокус")
+
+        start = time.perf_counter()
+        self.send(actions)
+
+        if hwnd is not None:
+            if not self.is_focused(hwnd):
+                raise InputTargetError(f"Фокус ушел из окна {hwnd} во время ввода")
+            typed = [value for kind, value in actions if kind == 'text']
+            if typed:
+                actual = self.read_text(hwnd)
+                if actual is not None and actual != typed[-1]:
+                    raise InputTargetError(f"Текст в окне {hwnd} не совпадает с введенным")
+
+        if submit:
+            self.send([('key', 'enter')])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.debug("Ввод (%s): %s действий за %.1f мс", self.name, len(actions), elapsed_ms)
+
+
+class PyAutoGuiBackend(InputBackend):
+    """Прежний способ: pyautogui в то окно, что сейчас в фокусе"""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def focus(self, hwnd: int) -> bool:
+        if win32gui is None:
+            return True
+        try:
+            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            win32gui.SetForegroundWindow(hwnd)
+        except Exception:
+            pass
+        return self.is_focused(hwnd)
+
+    def is_focused(self, hwnd: int) -> bool:
+        if win32gui is None:
+            # Без pywin32 проверить фокус нельзя
+            return True
+        return win32gui.GetForegroundWindow() == hwnd
+
+    def send(self, actions: Sequence[Action]):
+        for kind, value in actions:
+            if kind == 'text':
+                self.pyautogui.write(value)
+            elif kind == 'key':
+                self.pyautogui.press(value)
+            elif kind == 'hotkey':
+                self.pyautogui.hotkey(*value)
+
+
+class Win32SendInputBackend(InputBackend):
+    """Пакетный ввод: вся последовательность одним вызовом SendInput
+
+    События одного вызова SendInput не перемешиваются с вводом пользователя
+    и других программ, поэтому смена фокуса не может разорвать строку.
+    Текст передается Unicode-событиями (KEYEVENTF_UNICODE) без раскладки.
+    """
+
+    name = "sendinput"
+
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_KEYUP = 0x0002
+    KEYEVENTF_UNICODE = 0x0004
+
+    VIRTUAL_KEYS: Dict[str, int] = {
+        'tab': 0x09, 'enter': 0x0D, 'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12,
+        'esc': 0x1B, 'backspace': 0x08, 'delete': 0x2E,
+    }
+
+    def __init__(self):
+        if sys.platform != 'win32' or win32gui is None:
+            raise RuntimeError("SendInput доступен только на Windows с pywin32")
+        from ctypes import wintypes
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class _INPUTUNION(ctypes.Union):
+            _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("union", _INPUTUNION)]
+
+        self._KEYBDINPUT = KEYBDINPUT
+        self._INPUT = INPUT
+        self._user32 = ctypes.WinDLL('user32', use_last_error=True)
+
+    def _key_event(self, vk: int = 0, scan: int = 0, flags: int = 0):
+        event = self._INPUT()
+        event.type = self.INPUT_KEYBOARD
+        event.union.ki = self._KEYBDINPUT(vk, scan, flags, 0, 0)
+        return event
+
+    def _vk(self, key: str) -> int:
+        key = key.lower()
+        if key in self.VIRTUAL_KEYS:
+            return self.VIRTUAL_KEYS[key]
+        if len(key) == 1 and key.isalnum():
+            return ord(key.upper())
+        raise ValueError(f"Неизвестная клавиша: {key}")
+
+    def _events(self, actions: Sequence[Action]) -> list:
+        events = []
+        for kind, value in actions:
+            if kind == 'text':
+                # Символы вне BMP передаются суррогатными парами UTF-16
+                data = value.encode('utf-16-le')
+                for i in range(0, len(data), 2):
+                    unit = int.from_bytes(data[i:i + 2], 'little')
+                    events.append(self._key_event(scan=unit, flags=self.KEYEVENTF_UNICODE))
+                    events.append(self._key_event(scan=unit, flags=self.KEYEVENTF_UNICODE | self.KEYEVENTF_KEYUP))
+            elif kind == 'key':
+                vk = self._vk(value)
+                events.append(self._key_event(vk=vk))
+                events.append(self._key_event(vk=vk, flags=self.KEYEVENTF_KEYUP))
+            elif kind == 'hotkey':
+                codes = [self._vk(key) for key in value]
+                events.extend(self._key_event(vk=vk) for vk in codes)
+                events.extend(self._key_event(vk=vk, flags=self.KEYEVENTF_KEYUP) for vk in reversed(codes))
+        return events
+
+    def focus(self, hwnd: int) -> bool:
+        try:
+            if win32gui.IsIconic(hwnd):
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            win32gui.SetForegroundWindow(hwnd)
+        except Exception as e:
+            logger.debug("SetForegroundWindow(%s) не удался: %s", hwnd, e)
+        return self.is_focused(hwnd)
+
+    def is_focused(self, hwnd: int) -> bool:
+        return win32gui.GetForegroundWindow() == hwnd
+
+    def send(self, actions: Sequence[Action]):
+        events = self._events(actions)
+        if not events:
+            return
+        array = (self._INPUT * len(events))(*events)
+        sent = self._user32.SendInput(len(events), array, ctypes.sizeof(self._INPUT))
+        if sent != len(events):
+            raise InputTargetError(f"SendInput отправил {sent} из {len(events)} событий "
+                                   f"(ошибка {ctypes.get_last_error()})")
+
+    def read_text(self, hwnd: int) -> Optional[str]:
+        # Текст читается только у обычных полей ввода; у окон CEF его нет
+        try:
+            class_name = win32gui.GetClassName(hwnd)
+            if 'edit' not in class_name.lower():
+                return None
+            return win32gui.GetWindowText(hwnd)
+        except Exception:
+            return None
+
+
+class RecordingInputBackend(InputBackend):
+    """Фейковый бэкенд для тестов: записывает ввод и моделирует форму
+
+    Окна и поля задаются словарем {hwnd: число_полей}. Tab переходит к
+    следующему полю, Enter фиксирует содержимое формы в submissions.
+    """
+
+    name = "recording"
+
+    def __init__(self, windows: Optional[Dict[int, int]] = None):
+        self.windows = dict(windows or {})
+        self.foreground: Optional[int] = None
+        self.events: List[Action] = []
+        self.fields: Dict[int, List[str]] = {hwnd: [''] * count for hwnd, count in self.windows.items()}
+        self.cursor: Dict[int, int] = {hwnd: 0 for hwnd in self.windows}
+        self.submissions: List[Tuple[int, List[str]]] = []
+        # Окно, которое "перехватит" фокус после указанного числа действий
+        self.steal_focus_after: Optional[Tuple[int, int]] = None
+
+    def focus(self, hwnd: int) -> bool:
+        if hwnd in self.windows:
+            self.foreground = hwnd
+        return self.foreground == hwnd
+
+    def is_focused(self, hwnd: int) -> bool:
+        return self.foreground == hwnd
+
+    def send(self, actions: Sequence[Action]):
+        for index, (kind, value) in enumerate(actions):
+            if self.steal_focus_after and index == self.steal_focus_after[0]:
+                self.foreground = self.steal_focus_after[1]
+            self.events.append((kind, value))
+            hwnd = self.foreground
+            if hwnd not in self.fields:
+                continue
+            fields = self.fields[hwnd]
+            position = self.cursor[hwnd]
+            if kind == 'text':
+                fields[position] += value
+            elif kind == 'hotkey' and tuple(value) == ('ctrl', 'a'):
+                # Выделенный текст заменяется следующим вводом
+                fields[position] = ''
+            elif kind == 'key' and value == 'tab':
+                self.cursor[hwnd] = (position + 1) % len(fields)
+            elif kind == 'key' and value == 'enter':
+                self.submissions.append((hwnd, list(fields)))
+
+    def read_text(self, hwnd: int) -> Optional[str]:
+        if hwnd not in self.fields:
+            return None
+        return self.fields[hwnd][self.cursor[hwnd]]
+
+
+def create_input_backend(name: Optional[str] = None) -> InputBackend:
+    """Создает бэкенд ввода: пакетный SendInput, если доступен, иначе pyautogui"""
+    if name in (None, 'sendinput'):
+        try:
+            return Win32SendInputBackend()
+        except Exception as e:
+            if name == 'sendinput':
+                raise
+            logger.info("Пакетный ввод недоступен (%s), используется pyautogui", e)
+    return PyAutoGuiBackend()
@@ -0,0 +1,103 @@
+"""
+Потоковый разбор JSON массива
+Ответ каталога - массив объектов. Вместо декодирования всего тела элементы
+разбираются по мере поступления байтов: в памяти держится только
+недочитанный хвост, а не весь ответ и его полная копия в виде списка словарей.
+Каждый элемент декодируется C-сканером json (raw_decode).
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator, List
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+class JSONArrayParser:
+    """Инкрементальный разбор массива верхнего уровня
+
+    feed() принимает очередную порцию байтов и возвращает элементы,
+    которые в ней закончились; close() проверяет, что массив закрыт.
+
+    Raises:
+        ValueError: Ответ не массив или JSON поврежден
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ""
+        self._pos = 0
+        # "start" - ждем "[", "value" - элемент, "separator" - "," или "]", "done"
+        self._expect = "start"
+        self.count = 0
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b"", final=True)
+        self._pos = 0
+        items = self._parse(final=True)
+        if self._expect != "done":
+            raise ValueError("Ответ оборвался: массив не закрыт")
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _parse(self, final: bool) -> List[Any]:
+        items = []
+        while self._skip_whitespace():
+            char = self._buffer[self._pos]
+            if self._expect == "start":
+                if char != "[":
+                    raise ValueError(f"Ожидался JSON массив, получено {char!r}")
+                self._pos += 1
+                self._expect = "value"
+            elif self._expect == "separator":
+                if char == ",":
+                    self._expect = "value"
+                elif char == "]":
+                    self._expect = "done"
+                else:
+                    raise ValueError(f"Ожидались ',' или ']' после {self.count}-го элемента")
+                self._pos += 1
+            elif self._expect == "value":
+                if char == "]" and not self.count:
+                    self._pos += 1
+                    self._expect = "done"
+                    continue
+                try:
+                    item, end = self._decoder.raw_decode(self._buffer, self._pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise ValueError(f"Поврежден {self.count + 1}-й элемент массива")
+                    # Элемент еще не пришел целиком
+                    break
+                # Число в конце порции может продолжиться в следующей ("1.5" -> "1.5e3")
+                if (not final and isinstance(item, (int, float)) and not isinstance(item, bool)
+                        and (end == len(self._buffer) or self._buffer[end] not in _DELIMITERS)):
+                    break
+                items.append(item)
+                self.count += 1
+                self._pos = end
+                self._expect = "separator"
+            else:
+                raise ValueError("Данные после конца массива")
+        return items
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Элементы массива по мере поступления порций байтов"""
+    parser = JSONArrayParser()
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed(chunk)
+    yield from parser.close()
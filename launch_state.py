@@ -0,0 +1,223 @@
+"""
+Состояние запуска игры
+Запуск проходит этапы idle -> renting -> logging-in -> launching -> running ->
+ending -> idle. Начать запуск можно только из idle и только один раз: второй
+клик или повторный запрос агента получают LaunchBusyError, а не вторую аренду.
+Запуск можно отменить до running; конвейер проверяет отмену между этапами и
+в ожиданиях.
+
+Подписчики получают снимок состояния при каждом переходе в потоке, который
+его выполнил (интерфейс передает его в главный поток сигналом Qt).
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Optional, Callable, List, Dict, FrozenSet, Iterable
+
+logger = logging.getLogger(__name__)
+
+IDLE = "idle"
+RENTING = "renting"
+LOGGING_IN = "logging-in"
+LAUNCHING = "launching"
+RUNNING = "running"
+ENDING = "ending"
+
+# Этапы запуска, которые можно отменить
+LAUNCH_STATES: FrozenSet[str] = frozenset((RENTING, LOGGING_IN, LAUNCHING))
+
+TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    IDLE: frozenset((RENTING,)),
+    RENTING: frozenset((LOGGING_IN, ENDING)),
+    LOGGING_IN: frozenset((LAUNCHING, ENDING)),
+    LAUNCHING: frozenset((RUNNING, ENDING)),
+    RUNNING: frozenset((ENDING,)),
+    ENDING: frozenset((IDLE,)),
+}
+
+
+class LaunchBusyError(Exception):
+    """Запуск или сессия уже идут"""
+
+
+class LaunchCancelled(Exception):
+    """Запуск отменен"""
+
+
+@dataclass(frozen=True)
+class LaunchSnapshot:
+    """Состояние запуска на момент перехода"""
+    state: str
+    generation: int
+    game_id: Optional[int] = None
+    game_title: Optional[str] = None
+    error: Optional[str] = None
+    cancelled: bool = False
+    changed_at: float = 0.0
+    # Порядковый номер перехода: подписчики пропускают устаревшие снимки
+    sequence: int = 0
+
+    @property
+    def busy(self) -> bool:
+        return self.state != IDLE
+
+
+class LaunchStateMachine:
+    """Потокобезопасное состояние запуска с единственным конвейером
+
+    Каждый запуск получает номер поколения (begin); переходы конвейера
+    проверяют, что номер актуален и запуск не отменен.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._snapshot = LaunchSnapshot(IDLE, 0, changed_at=time.monotonic())
+        self._cancel = threading.Event()
+        self._listeners: List[Callable[[LaunchSnapshot], None]] = []
+        self._sequence = 0
+        # Уведомления идут вне основной блокировки, но по одному и по порядку
+        self._notify_lock = threading.Lock()
+        self._delivered = 0
+
+    @property
+    def snapshot(self) -> LaunchSnapshot:
+        return self._snapshot
+
+    @property
+    def state(self) -> str:
+        return self._snapshot.state
+
+    @property
+    def busy(self) -> bool:
+        """Идет запуск, сессия или ее завершение"""
+        return self._snapshot.busy
+
+    def subscribe(self, callback: Callable[[LaunchSnapshot], None]):
+        """Подписка на переходы"""
+        with self._cond:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[LaunchSnapshot], None]):
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def begin(self, game_id: Optional[int] = None, game_title: Optional[str] = None) -> int:
+        """Начинает запуск (idle -> renting) и возвращает номер поколения
+
+        Raises:
+            LaunchBusyError: Запуск или сессия уже идут
+        """
+        with self._cond:
+            current = self._snapshot
+            if current.state != IDLE:
+                raise LaunchBusyError(f"Уже выполняется: {current.state} ({current.game_title})")
+            self._cancel.clear()
+            generation = current.generation + 1
+            snapshot = self._set(LaunchSnapshot(RENTING, generation, game_id, game_title,
+                                                changed_at=time.monotonic()))
+        self._notify(snapshot)
+        return generation
+
+    def advance(self, generation: int, state: str):
+        """Переход конвейера к следующему этапу
+
+        Raises:
+            LaunchCancelled: Запуск отменен или поколение устарело
+        """
+        with self._cond:
+            self._check(generation)
+            snapshot = self._transition(state)
+        self._notify(snapshot)
+
+    def checkpoint(self, generation: int):
+        """Проверка отмены между шагами одного этапа"""
+        with self._cond:
+            self._check(generation)
+
+    def wait(self, generation: int, seconds: float):
+        """Пауза конвейера, прерываемая отменой"""
+        if self._cancel.wait(seconds):
+            raise LaunchCancelled("Запуск отменен")
+        self.checkpoint(generation)
+
+    def cancel(self) -> bool:
+        """Запрашивает отмену запуска; False - отменять нечего (не идет запуск)"""
+        with self._cond:
+            if self._snapshot.state not in LAUNCH_STATES:
+                return False
+            self._cancel.set()
+        logger.info("Запрошена отмена запуска (%s)", self._snapshot.state)
+        return True
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def begin_ending(self, generation: Optional[int] = None) -> bool:
+        """Переход к завершению сессии (из running или прерванного запуска)
+
+        Returns:
+            False, если завершение уже идет, запуска нет или поколение устарело
+        """
+        with self._cond:
+            current = self._snapshot
+            if generation is not None and generation != current.generation:
+                return False
+            if ENDING not in TRANSITIONS[current.state]:
+                return False
+            snapshot = self._transition(ENDING)
+        self._notify(snapshot)
+        return True
+
+    def finish(self, error: Optional[str] = None):
+        """Завершение сессии или прерванного запуска (ending -> idle)"""
+        with self._cond:
+            current = self._snapshot
+            if current.state == IDLE:
+                return
+            snapshot = self._set(LaunchSnapshot(IDLE, current.generation, current.game_id, current.game_title,
+                                                error=error, cancelled=self._cancel.is_set(),
+                                                changed_at=time.monotonic()))
+            self._cancel.clear()
+        self._notify(snapshot)
+
+    def wait_for(self, states: Iterable[str], timeout: Optional[float] = None) -> bool:
+        """Ждет одного из состояний"""
+        states = frozenset(states)
+        with self._cond:
+            return self._cond.wait_for(lambda: self._snapshot.state in states, timeout)
+
+    def _check(self, generation: int):
+        if generation != self._snapshot.generation or self._snapshot.state not in LAUNCH_STATES:
+            raise LaunchCancelled("Запуск больше не актуален")
+        if self._cancel.is_set():
+            raise LaunchCancelled("Запуск отменен")
+
+    def _transition(self, state: str) -> LaunchSnapshot:
+        current = self._snapshot
+        if state not in TRANSITIONS[current.state]:
+            raise RuntimeError(f"Недопустимый переход {current.state} -> {state}")
+        return self._set(LaunchSnapshot(state, current.generation, current.game_id, current.game_title,
+                                        cancelled=self._cancel.is_set(), changed_at=time.monotonic()))
+
+    def _set(self, snapshot: LaunchSnapshot) -> LaunchSnapshot:
+        self._sequence += 1
+        snapshot = replace(snapshot, sequence=self._sequence)
+        self._snapshot = snapshot
+        self._cond.notify_all()
+        return snapshot
+
+    def _notify(self, snapshot: LaunchSnapshot):
+        with self._notify_lock:
+            if snapshot.sequence <= self._delivered:
+                return
+            self._delivered = snapshot.sequence
+            with self._cond:
+                listeners = list(self._listeners)
+            for callback in listeners:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.error("Ошибка подписчика состояния запуска: %s", e)
@@ -0,0 +1,412 @@
+"""
+Автоматический поиск установленных лаунчеров
+Проверяет подсказки реестра, конфигурационные файлы лаунчеров и известные
+каталоги установки параллельно в пуле потоков. Результаты кэшируются в JSON и
+проверяются по mtime исполняемого файла, поэтому повторный поиск не обходит
+диски. Корни поиска и чтение реестра вынесены в окружение, поиск проверяется
+на фейковом дереве каталогов (DiscoveryEnvironment.for_tree)
+"""
+import ctypes
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+# Чтение значения реестра: (раздел, ключ, значение) -> строка или None
+RegistryReader = Callable[[str, str, str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class LauncherSpec:
+    """Где искать лаунчер
+
+    locations - каталоги относительно корней окружения: ("program_files_x86", "Steam");
+    registry - значения реестра с путем к exe или каталогу установки;
+    config_hints - JSON файлы лаунчера с путем: (корень, файл, ключ);
+    manifest - файл со списком библиотек игр относительно каталога установки
+    """
+    name: str
+    settings_key: str
+    executables: Tuple[str, ...]
+    locations: Tuple[Tuple[str, str], ...] = ()
+    registry: Tuple[Tuple[str, str, str], ...] = ()
+    config_hints: Tuple[Tuple[str, str, str], ...] = ()
+    manifest: Optional[str] = None
+
+
+LAUNCHER_SPECS: Tuple[LauncherSpec, ...] = (
+    LauncherSpec(
+        "steam", "steam_path", ("steam.exe",),
+        locations=(("program_files_x86", "Steam"), ("program_files", "Steam"),
+                   ("drives", "Steam"), ("drives", "Games/Steam"), ("drives", "Program Files (x86)/Steam")),
+        registry=(("HKEY_CURRENT_USER", r"Software\Valve\Steam", "SteamExe"),
+                  ("HKEY_LOCAL_MACHINE", r"SOFTWARE\WOW6432Node\Valve\Steam", "InstallPath"),
+                  ("HKEY_LOCAL_MACHINE", r"SOFTWARE\Valve\Steam", "InstallPath")),
+        manifest="steamapps/libraryfolders.vdf",
+    ),
+    LauncherSpec(
+        "epic", "epic_path", ("EpicGamesLauncher.exe",),
+        locations=(("program_files_x86", "Epic Games/Launcher/Portal/Binaries/Win64"),
+                   ("program_files_x86", "Epic Games/Launcher/Portal/Binaries/Win32"),
+                   ("program_files", "Epic Games/Launcher/Portal/Binaries/Win64"),
+                   ("drives", "Epic Games/Launcher/Portal/Binaries/Win64")),
+        registry=(("HKEY_CLASSES_ROOT", r"com.epicgames.launcher\DefaultIcon", ""),),
+    ),
+    LauncherSpec(
+        "riot", "riot_path", ("RiotClientServices.exe",),
+        locations=(("drives", "Riot Games/Riot Client"), ("program_files", "Riot Games/Riot Client")),
+        config_hints=(("program_data", "Riot Games/RiotClientInstalls.json", "rc_default"),),
+    ),
+    LauncherSpec(
+        "battlenet", "battlenet_path", ("Battle.net.exe", "Battle.net Launcher.exe"),
+        locations=(("program_files_x86", "Battle.net"), ("program_files", "Battle.net"), ("drives", "Battle.net")),
+        registry=(("HKEY_LOCAL_MACHINE",
+                   r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall\Battle.net",
+                   "InstallLocation"),),
+    ),
+    LauncherSpec(
+        "vkplay", "vkplay_path", ("VKPlay.exe", "GameCenter.exe"),
+        locations=(("local_app_data", "GameCenter"), ("program_files_x86", "VK Play"),
+                   ("program_files", "VK Play"), ("drives", "VK Play")),
+        registry=(("HKEY_CURRENT_USER", r"Software\Classes\vkplay\DefaultIcon", ""),),
+    ),
+    LauncherSpec(
+        "ea", "ea_path", ("EADesktop.exe",),
+        locations=(("program_files", "Electronic Arts/EA Desktop/EA Desktop"),
+                   ("program_files_x86", "Electronic Arts/EA Desktop/EA Desktop")),
+        registry=(("HKEY_LOCAL_MACHINE", r"SOFTWARE\Electronic Arts\EA Desktop", "DesktopAppPath"),
+                  ("HKEY_LOCAL_MACHINE", r"SOFTWARE\Electronic Arts\EA Desktop", "InstallLocation")),
+    ),
+)
+
+
+def _read_windows_registry(hive: str, key: str, value: str) -> Optional[str]:
+    if not winreg:
+        return None
+    try:
+        with winreg.OpenKey(getattr(winreg, hive), key) as handle:
+            data, _ = winreg.QueryValueEx(handle, value)
+        return str(data) if data else None
+    except OSError:
+        return None
+
+
+def _fixed_drives() -> List[str]:
+    """Корни локальных дисков (сетевые и съемные диски не обходятся)"""
+    if sys.platform != 'win32':
+        return []
+    drives = []
+    try:
+        mask = ctypes.windll.kernel32.GetLogicalDrives()
+        for index in range(26):
+            if mask & (1 << index):
+                root = f"{chr(ord('A') + index)}:\\"
+                # DRIVE_FIXED
+                if ctypes.windll.kernel32.GetDriveTypeW(root) == 3:
+                    drives.append(root)
+    except Exception as e:
+        logger.error("Ошибка при получении списка дисков: %s", e)
+        drives = ["C:\\"]
+    return drives
+
+
+class DiscoveryEnvironment:
+    """Корни поиска и доступ к реестру
+
+    Args:
+        roots: Имя корня (program_files, program_files_x86, program_data,
+            local_app_data, drives) -> каталоги
+        registry: Чтение реестра (по умолчанию - winreg, на других ОС - ничего)
+    """
+
+    def __init__(self, roots: Dict[str, List[str]], registry: Optional[RegistryReader] = None):
+        self.roots = roots
+        self.registry = registry or _read_windows_registry
+
+    @classmethod
+    def from_system(cls) -> 'DiscoveryEnvironment':
+        def env(name: str) -> List[str]:
+            value = os.environ.get(name)
+            return [value] if value else []
+        return cls({
+            "program_files": env("ProgramW6432") or env("ProgramFiles"),
+            "program_files_x86": env("ProgramFiles(x86)"),
+            "program_data": env("ProgramData"),
+            "local_app_data": env("LOCALAPPDATA"),
+            "drives": _fixed_drives(),
+        })
+
+    @classmethod
+    def for_tree(cls, root, registry: Optional[Dict[Tuple[str, str, str], str]] = None,
+                 drives: Iterable[str] = ("C", "D")) -> 'DiscoveryEnvironment':
+        """Окружение на дереве каталогов: root/C/Program Files, root/D/... и реестр из словаря"""
+        root = Path(root)
+        system = root / "C"
+        values = dict(registry or {})
+        return cls({
+            "program_files": [str(system / "Program Files")],
+            "program_files_x86": [str(system / "Program Files (x86)")],
+            "program_data": [str(system / "ProgramData")],
+            "local_app_data": [str(system / "Users" / "club" / "AppData" / "Local")],
+            "drives": [str(root / drive) for drive in drives],
+        }, registry=lambda hive, key, value: values.get((hive, key, value)))
+
+
+@dataclass(frozen=True)
+class DiscoveryResult:
+    """Найденный лаунчер"""
+    name: str
+    path: str
+    # Откуда взят путь: registry, config, location
+    source: str
+    # Каталоги библиотек игр из манифеста лаунчера
+    libraries: Tuple[str, ...] = field(default=())
+
+
+def parse_steam_libraries(text: str) -> List[str]:
+    """Пути библиотек из steamapps/libraryfolders.vdf"""
+    return [path.replace('\\\\', '\\') for path in re.findall(r'"path"\s+"([^"]+)"', text)]
+
+
+class LauncherDiscovery:
+    """Поиск лаунчеров с кэшем
+
+    Найденный путь берется из кэша, пока у исполняемого файла не изменились
+    mtime и размер; "не найден" хранится negative_ttl секунд. Устаревшие
+    записи перепроверяются только для своих лаунчеров.
+
+    Args:
+        cache_file: JSON файл кэша (None - только в памяти)
+        environment: Корни поиска и реестр (по умолчанию - текущая система)
+        max_workers: Потоков для проверки путей
+        negative_ttl: Сколько секунд не искать заново ненайденный лаунчер
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None, environment: Optional[DiscoveryEnvironment] = None,
+                 specs: Iterable[LauncherSpec] = LAUNCHER_SPECS, max_workers: int = 8,
+                 negative_ttl: float = 24 * 3600):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.environment = environment or DiscoveryEnvironment.from_system()
+        self.specs: Dict[str, LauncherSpec] = {spec.name: spec for spec in specs}
+        self.max_workers = max_workers
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._cache: Dict[str, dict] = self._load()
+        self.stats = {"scans": 0, "probes": 0, "cache_hits": 0}
+
+    # Кэш
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.cache_file or not self.cache_file.exists():
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.error("Ошибка при загрузке кэша поиска лаунчеров: %s", e)
+            return {}
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error("Ошибка при сохранении кэша поиска лаунчеров: %s", e)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[List[int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _from_cache(self, name: str, now: float):
+        """Результат из кэша; ... (Ellipsis) - записи нет или она устарела"""
+        entry = self._cache.get(name)
+        if not entry:
+            return ...
+        if entry.get("path") is None:
+            return None if now - entry.get("checked", 0) < self.negative_ttl else ...
+        if self._signature(entry["path"]) != entry.get("signature"):
+            return ...
+        libraries = entry.get("libraries") or []
+        manifest = entry.get("manifest")
+        if manifest and self._signature(manifest) != entry.get("manifest_signature"):
+            # Лаунчер на месте, изменился только список библиотек
+            libraries = self._read_libraries(self.specs[name], entry["path"])
+            entry["libraries"] = libraries
+            entry["manifest_signature"] = self._signature(manifest)
+        return DiscoveryResult(name, entry["path"], entry.get("source", "cache"), tuple(libraries))
+
+    def _store(self, name: str, result: Optional[DiscoveryResult], now: float):
+        if result is None:
+            self._cache[name] = {"path": None, "checked": now}
+            return
+        entry = {"path": result.path, "signature": self._signature(result.path), "source": result.source,
+                 "libraries": list(result.libraries), "checked": now}
+        spec = self.specs[name]
+        if spec.manifest:
+            manifest = os.path.join(os.path.dirname(result.path), spec.manifest)
+            entry["manifest"] = manifest
+            entry["manifest_signature"] = self._signature(manifest)
+        self._cache[name] = entry
+
+    # Поиск
+
+    def _executable_in(self, spec: LauncherSpec, path: Optional[str]) -> Optional[str]:
+        """Путь к exe лаунчера по пути к файлу или каталогу установки"""
+        if not path:
+            return None
+        self.stats["probes"] += 1
+        path = path.strip().strip('"').split(',')[0].strip('"')
+        names = {name.lower() for name in spec.executables}
+        if os.path.basename(path).lower() in names and os.path.isfile(path):
+            return os.path.normpath(path)
+        if os.path.isdir(path):
+            for name in spec.executables:
+                candidate = os.path.join(path, name)
+                if os.path.isfile(candidate):
+                    return os.path.normpath(candidate)
+        # Значение указывает на другой файл в каталоге установки (иконку, деинсталлятор)
+        directory = os.path.dirname(path)
+        if directory and directory != path and os.path.isfile(path):
+            return self._executable_in(spec, directory)
+        return None
+
+    def _sources(self, spec: LauncherSpec) -> List[Tuple[str, Callable[[], Optional[str]]]]:
+        """Источники пути по убыванию надежности"""
+        sources = []
+        for hive, key, value in spec.registry:
+            sources.append(("registry", lambda h=hive, k=key, v=value: self._executable_in(
+                spec, self.environment.registry(h, k, v))))
+        for root_name, relative, key in spec.config_hints:
+            for root in self.environment.roots.get(root_name, []):
+                sources.append(("config", lambda p=os.path.join(root, relative), k=key: self._executable_in(
+                    spec, self._read_config_hint(p, k))))
+        for root_name, relative in spec.locations:
+            for root in self.environment.roots.get(root_name, []):
+                sources.append(("location", lambda p=os.path.join(root, relative): self._executable_in(spec, p)))
+        return sources
+
+    @staticmethod
+    def _read_config_hint(path: str, key: str) -> Optional[str]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f).get(key)
+            return value if isinstance(value, str) else None
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _read_libraries(self, spec: LauncherSpec, executable: str) -> List[str]:
+        if not spec.manifest:
+            return []
+        manifest = os.path.join(os.path.dirname(executable), spec.manifest)
+        try:
+            with open(manifest, 'r', encoding='utf-8', errors='replace') as f:
+                return parse_steam_libraries(f.read())
+        except OSError:
+            return []
+
+    def scan(self, names: Optional[Iterable[str]] = None) -> Dict[str, Optional[DiscoveryResult]]:
+        """Ищет лаунчеры без кэша; все источники всех лаунчеров проверяются параллельно"""
+        names = [name for name in (names or self.specs) if name in self.specs]
+        self.stats["scans"] += 1
+        started = time.perf_counter()
+        jobs = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="discovery") as pool:
+            for name in names:
+                for priority, (source, probe) in enumerate(self._sources(self.specs[name])):
+                    jobs.append((name, priority, source, pool.submit(probe)))
+
+        found: Dict[str, Tuple[int, str, str]] = {}
+        for name, priority, source, future in jobs:
+            try:
+                path = future.result()
+            except Exception as e:
+                logger.debug("Ошибка проверки пути лаунчера %s: %s", name, e)
+                continue
+            if path and (name not in found or priority < found[name][0]):
+                found[name] = (priority, source, path)
+
+        results: Dict[str, Optional[DiscoveryResult]] = {}
+        for name in names:
+            if name in found:
+                _, source, path = found[name]
+                libraries = tuple(self._read_libraries(self.specs[name], path))
+                results[name] = DiscoveryResult(name, path, source, libraries)
+            else:
+                results[name] = None
+        logger.info("Поиск лаунчеров: %s путей за %.2f с, найдено: %s", len(jobs), time.perf_counter() - started,
+                    ', '.join(sorted(found)) or 'ничего')
+        return results
+
+    def discover(self, names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Optional[DiscoveryResult]]:
+        """Найденные лаунчеры (имя -> результат или None); из кэша, если он актуален"""
+        names = [name for name in (names or self.specs) if name in self.specs]
+        now = time.time()
+        with self._lock:
+            results: Dict[str, Optional[DiscoveryResult]] = {}
+            stale = []
+            for name in names:
+                cached = ... if force else self._from_cache(name, now)
+                if cached is ...:
+                    stale.append(name)
+                else:
+                    self.stats["cache_hits"] += 1
+                    results[name] = cached
+            if stale:
+                scanned = self.scan(stale)
+                for name, result in scanned.items():
+                    self._store(name, result, now)
+                results.update(scanned)
+            self._save()
+            return results
+
+    def find(self, name: str) -> Optional[str]:
+        """Путь к exe лаунчера или None"""
+        result = self.discover([name]).get(name)
+        return result.path if result else None
+
+    def check_settings(self, config) -> Dict[str, str]:
+        """Проверяет пути лаунчеров в настройках и заполняет пустые или неверные найденными
+
+        Returns:
+            Измененные настройки: ключ -> новый путь
+        """
+        invalid = {}
+        for spec in self.specs.values():
+            path = config.get_setting(spec.settings_key)
+            if not path or not os.path.isfile(path):
+                if path:
+                    logger.warning("Путь %s недействителен: %s", spec.settings_key, path)
+                invalid[spec.name] = spec.settings_key
+        if not invalid:
+            return {}
+
+        changes = {}
+        for name, result in self.discover(invalid).items():
+            if result:
+                changes[invalid[name]] = result.path
+                config.set_setting(invalid[name], result.path)
+                logger.info("Путь %s найден автоматически: %s", invalid[name], result.path)
+        return changes
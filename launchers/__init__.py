@@ -0,0 +1,8 @@
+"""
+Плагины лаунчеров (Steam, Epic, Riot и др.)
+Модуль плагина импортируется только при выборе игры его платформы
+"""
+from launchers.base import LauncherPlugin, TwoFactorProvider
+from launchers.registry import LauncherRegistry, UnknownLauncherError
+
+__all__ = ['LauncherPlugin', 'TwoFactorProvider', 'LauncherRegistry', 'UnknownLauncherError']
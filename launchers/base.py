@@ -0,0 +1,64 @@
+"""
+Интерфейс плагина лаунчера
+"""
+import os
+import time
+from typing import Optional, Callable
+
+from models import Game, Session
+
+# Возвращает код 2FA для текущей сессии (запрашивает его у бэкенда)
+TwoFactorProvider = Callable[[], str]
+
+
+class LauncherPlugin:
+    """Базовый класс плагина лаунчера
+
+    Порядок вызовов при запуске игры: discover -> login -> launch ->
+    detect_game, при завершении сессии - teardown. warm_up вызывается
+    заранее в фоне (при выборе игры) и не должен бросать исключения наружу.
+    """
+
+    # Имя платформы (совпадает с ключом в реестре)
+    name = "base"
+    # Название для пользователя
+    title = "Лаунчер"
+    # Ключ пути к лаунчеру в настройках
+    settings_key: Optional[str] = None
+
+    def __init__(self, config):
+        self.config = config
+        # Пауза плагина; на время входа и запуска GameLauncher подменяет ее
+        # паузой, которую прерывает отмена запуска (исключение LaunchCancelled)
+        self.wait: Callable[[float], None] = time.sleep
+
+    def discover(self) -> Optional[str]:
+        """Путь к установленному лаунчеру или None"""
+        if not self.settings_key:
+            return None
+        path = self.config.get_setting(self.settings_key)
+        return path if path and os.path.exists(path) else None
+
+    def warm_up(self):
+        """Подготовка в фоне: импорт зависимостей, чтение статистики и т.п."""
+        pass
+
+    def login(self, session: Session, two_factor: TwoFactorProvider):
+        """Входит в аккаунт аренды"""
+        raise NotImplementedError(f"{self.title}: вход не реализован")
+
+    def launch(self, game: Game):
+        """Запускает игру"""
+        raise NotImplementedError(f"{self.title}: запуск игр не реализован")
+
+    def install_dir(self, game: Game) -> Optional[str]:
+        """Каталог установленной игры (для прогрева файлов) или None"""
+        return None
+
+    def detect_game(self, game: Game):
+        """Процесс запущенной игры (psutil.Process) или None"""
+        return None
+
+    def teardown(self):
+        """Выходит из аккаунта и закрывает лаунчер; повторный вызов безопасен"""
+        pass
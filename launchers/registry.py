@@ -0,0 +1,133 @@
+"""
+Реестр плагинов лаунчеров
+Встроенные плагины и плагины из entry points группы "rental_desktop.launchers"
+хранятся как строки "модуль:Класс" и импортируются при первом обращении
+"""
+import importlib
+import logging
+import threading
+from typing import Dict, List, Union, Type
+
+from launchers.base import LauncherPlugin
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "rental_desktop.launchers"
+
+BUILTIN_LAUNCHERS: Dict[str, str] = {
+    "steam": "launchers.steam:SteamLauncher",
+    "epic": "launchers.unimplemented:EpicLauncher",
+    "riot": "launchers.unimplemented:RiotLauncher",
+}
+
+
+class UnknownLauncherError(Exception):
+    """Для платформы нет плагина"""
+    pass
+
+
+def _entry_points() -> Dict[str, object]:
+    """Entry points плагинов (API importlib.metadata различается по версиям Python)"""
+    try:
+        from importlib import metadata
+    except ImportError:
+        return {}
+    try:
+        points = metadata.entry_points()
+        if hasattr(points, 'select'):
+            selected = points.select(group=ENTRY_POINT_GROUP)
+        else:
+            selected = points.get(ENTRY_POINT_GROUP, ())
+        return {point.name: point for point in selected}
+    except Exception as e:
+        logger.error("Ошибка при чтении entry points лаунчеров: %s", e)
+        return {}
+
+
+class LauncherRegistry:
+    """Реестр плагинов: имя платформы -> класс, экземпляр на платформу"""
+
+    def __init__(self, config, load_entry_points: bool = True):
+        self.config = config
+        self._specs: Dict[str, Union[str, object, Type[LauncherPlugin]]] = dict(BUILTIN_LAUNCHERS)
+        self._entry_points_loaded = not load_entry_points
+        self._instances: Dict[str, LauncherPlugin] = {}
+        self._warmed_up: Dict[str, bool] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, plugin: Union[str, Type[LauncherPlugin]]):
+        """Регистрирует плагин: класс или строка "модуль:Класс" """
+        with self._lock:
+            self._specs[name.lower()] = plugin
+            self._instances.pop(name.lower(), None)
+
+    def _load_entry_points(self):
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        for name, point in _entry_points().items():
+            # Встроенные и зарегистрированные вручную плагины не перекрываются
+            self._specs.setdefault(name.lower(), point)
+
+    def names(self) -> List[str]:
+        """Имена всех доступных платформ"""
+        with self._lock:
+            self._load_entry_points()
+            return sorted(self._specs)
+
+    def _resolve(self, name: str) -> Type[LauncherPlugin]:
+        spec = self._specs.get(name)
+        if spec is None:
+            self._load_entry_points()
+            spec = self._specs.get(name)
+        if spec is None:
+            raise UnknownLauncherError(f"Неподдерживаемая платформа: {name}")
+
+        if isinstance(spec, str):
+            module_name, _, class_name = spec.partition(':')
+            plugin_class = getattr(importlib.import_module(module_name), class_name)
+        elif isinstance(spec, type):
+            plugin_class = spec
+        else:
+            # EntryPoint: load() импортирует модуль плагина
+            plugin_class = spec.load()
+
+        if not (isinstance(plugin_class, type) and issubclass(plugin_class, LauncherPlugin)):
+            raise UnknownLauncherError(f"Плагин {name} не является LauncherPlugin")
+        self._specs[name] = plugin_class
+        return plugin_class
+
+    def get(self, name: str) -> LauncherPlugin:
+        """Экземпляр плагина платформы (модуль импортируется при первом вызове)"""
+        name = name.lower()
+        with self._lock:
+            plugin = self._instances.get(name)
+            if plugin is None:
+                plugin = self._resolve(name)(self.config)
+                self._instances[name] = plugin
+                logger.info("Загружен плагин лаунчера: %s", name)
+            return plugin
+
+    def loaded(self) -> List[str]:
+        """Платформы, плагины которых уже загружены"""
+        with self._lock:
+            return sorted(self._instances)
+
+    def warm_up(self, name: str):
+        """Загружает плагин и выполняет его прогрев (один раз на платформу)"""
+        name = name.lower()
+        with self._lock:
+            if self._warmed_up.get(name):
+                return
+            self._warmed_up[name] = True
+        try:
+            self.get(name).warm_up()
+        except UnknownLauncherError:
+            pass
+        except Exception:
+            logger.exception("Ошибка прогрева лаунчера %s", name)
+
+    def reset_warm_up(self, name: str):
+        """Разрешает повторный прогрев (например, после teardown)"""
+        with self._lock:
+            self._warmed_up.pop(name.lower(), None)
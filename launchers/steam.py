@@ -0,0 +1,153 @@
+"""
+Плагин Steam
+"""
+import logging
+import os
+import re
+from typing import Optional, Callable
+
+from launchers.base import LauncherPlugin, TwoFactorProvider
+from models import Game, Session
+from prewarm import find_steam_install_dir
+from steam_login import LoginStrategySelector
+from steam_manager import SteamManager
+
+logger = logging.getLogger(__name__)
+
+# Известные App ID и имена процессов игр (по подстроке названия)
+KNOWN_APP_IDS = {
+    'counter-strike': 730,
+    'cs2': 730,
+    'cs:go': 730,
+}
+
+KNOWN_PROCESS_NAMES = (
+    (('counter-strike', 'cs2', 'cs:go'), ['cs2.exe', 'csgo.exe', 'hl.exe']),
+    (('dota',), ['dota2.exe']),
+    (('half-life',), ['hl.exe', 'hl2.exe']),
+)
+
+
+class SteamLauncher(LauncherPlugin):
+    """Вход в Steam, блокировка его UI и запуск игры по App ID"""
+
+    name = "steam"
+    title = "Steam"
+    settings_key = "steam_path"
+
+    def __init__(self, config, steam_manager_factory: Optional[Callable[[str], SteamManager]] = None):
+        super().__init__(config)
+        self.steam_manager_factory = steam_manager_factory or self._create_steam_manager
+        self.steam_manager: Optional[SteamManager] = None
+
+    def _create_steam_manager(self, steam_path: str) -> SteamManager:
+        return SteamManager(
+            steam_path, login_selector=LoginStrategySelector(self.config.config_dir / "steam_login_stats.json")
+        )
+
+    def _manager(self) -> SteamManager:
+        steam_path = self.config.get_setting('steam_path')
+        if not steam_path:
+            raise Exception("Путь к Steam не указан в настройках")
+        if self.steam_manager is None or self.steam_manager.steam_path != steam_path:
+            self.steam_manager = self.steam_manager_factory(steam_path)
+            # Ожидания SteamManager идут через текущую паузу плагина
+            self.steam_manager.wait_hook = lambda seconds: self.wait(seconds)
+        return self.steam_manager
+
+    def warm_up(self):
+        # Создание SteamManager загружает pywin32, бэкенд ввода и статистику входа
+        if self.config.get_setting('steam_path'):
+            self._manager()
+
+    def login(self, session: Session, two_factor: TwoFactorProvider):
+        steam_manager = self._manager()
+
+        # Шаг 1: Входим в Steam с логином и паролем (без 2FA)
+        logger.info("Входим в Steam...")
+        steam_manager.login_to_steam(session.email, session.password)
+
+        # Шаг 2: После нажатия "Войти" Steam запросит код 2FA
+        # Ждем, пока Steam обработает логин/пароль и отправит письмо с кодом
+        logger.info("Ожидание запроса кода 2FA от Steam...")
+        self.wait(5)  # Даем больше времени на отправку письма после попытки входа
+
+        two_factor_code = two_factor()
+
+        # Шаг 3: Вводим код 2FA
+        logger.info("Вводим код 2FA...")
+        steam_manager.enter_two_factor_code(two_factor_code)
+        # Ждем завершения входа; результат учитывается в статистике стратегии
+        if not steam_manager.finish_login(timeout=10):
+            logger.warning("Steam не подтвердил вход после ввода кода 2FA")
+
+    @staticmethod
+    def resolve_app_id(game: Game) -> int:
+        """App ID игры из steam_url или по известным названиям"""
+        steam_url = game.steam_url
+        if steam_url:
+            match = re.search(r'/app/(\d+)', steam_url)
+            if not match:
+                # Пробуем найти в других форматах URL
+                match = re.search(r'appid[=:](\d+)', steam_url, re.IGNORECASE)
+            if match:
+                return int(match.group(1))
+
+        game_title_lower = game.title.lower()
+        for part, app_id in KNOWN_APP_IDS.items():
+            if part in game_title_lower:
+                return app_id
+        raise Exception("Не удалось определить App ID игры. Укажите Steam URL в настройках игры.")
+
+    def launch(self, game: Game):
+        steam_manager = self._manager()
+
+        # Блокируем Steam UI
+        logger.info("Блокируем доступ к Steam UI...")
+        steam_manager.block_steam_ui()
+
+        app_id = self.resolve_app_id(game)
+        logger.info("Запускаем игру с App ID: %s", app_id)
+        steam_manager.launch_game(app_id)
+
+        # Ждем запуска игры
+        self.wait(20)
+
+    def install_dir(self, game: Game) -> Optional[str]:
+        steam_path = self.config.get_setting('steam_path')
+        if not steam_path:
+            return None
+        try:
+            app_id = self.resolve_app_id(game)
+        except Exception:
+            return None
+        install_dir = find_steam_install_dir(os.path.dirname(steam_path), app_id)
+        return str(install_dir) if install_dir else None
+
+    def detect_game(self, game: Game):
+        if self.steam_manager is None:
+            return None
+        game_title = game.title.lower()
+
+        # Пробуем найти по известным именам процессов (более надежно)
+        process_names = None
+        for parts, names in KNOWN_PROCESS_NAMES:
+            if any(part in game_title for part in parts):
+                process_names = names
+                break
+        if process_names is None:
+            # Пробуем найти по названию игры
+            process_names = [f"{game_title.replace(' ', '').replace(':', '')}.exe"]
+
+        for name in process_names:
+            process = self.steam_manager.find_game_process(name)
+            if process:
+                logger.info("Найден процесс игры: %s", name)
+                return process
+        return None
+
+    def teardown(self):
+        if self.steam_manager:
+            logger.info("Закрываем Steam...")
+            self.steam_manager.close_steam()
+            self.steam_manager = None
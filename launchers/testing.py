@@ -0,0 +1,209 @@
+"""
+Набор для проверки плагинов лаунчеров без реальных лаунчеров
+FakeLauncher моделирует лаунчер с задержками и сбоями, run_lifecycle прогоняет
+любой плагин по полному циклу и проверяет соблюдение контракта LauncherPlugin
+"""
+import contextlib
+import time
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Callable
+
+from launchers.base import LauncherPlugin, TwoFactorProvider
+from models import Game, Session
+
+
+class FakeLauncher(LauncherPlugin):
+    """Фейковый лаунчер: записывает вызовы и имитирует задержки и сбои
+
+    Args:
+        delays: Задержка этапа в секундах, например {"login": 0.1}
+        failures: Этапы, которые завершаются исключением
+    """
+
+    name = "fake"
+    title = "Фейковый лаунчер"
+
+    def __init__(self, config=None, delays: Optional[Dict[str, float]] = None,
+                 failures: Optional[List[str]] = None, path: Optional[str] = "C:/Fake/launcher.exe"):
+        super().__init__(config)
+        self.delays = delays or {}
+        self.failures = set(failures or ())
+        self.path = path
+        self.calls: List[str] = []
+        self.logged_in_as: Optional[str] = None
+        self.two_factor_code: Optional[str] = None
+        self.running_game: Optional[int] = None
+
+    def _step(self, name: str):
+        self.calls.append(name)
+        if self.delays.get(name):
+            # Как у настоящих плагинов: пауза через self.wait, ее прерывает отмена
+            self.wait(self.delays[name])
+        if name in self.failures:
+            raise Exception(f"{self.title}: сбой на этапе {name}")
+
+    def discover(self) -> Optional[str]:
+        self._step("discover")
+        return self.path
+
+    def warm_up(self):
+        self._step("warm_up")
+
+    def login(self, session: Session, two_factor: TwoFactorProvider):
+        self._step("login")
+        self.two_factor_code = two_factor()
+        self.logged_in_as = session.email
+
+    def launch(self, game: Game):
+        self._step("launch")
+        self.running_game = game.id
+
+    def detect_game(self, game: Game):
+        self._step("detect_game")
+        return FakeProcess(game.id) if self.running_game == game.id else None
+
+    def teardown(self):
+        self._step("teardown")
+        self.logged_in_as = None
+        self.running_game = None
+
+
+_CPUTimes = namedtuple("pcputimes", "user system")
+_MemoryInfo = namedtuple("pmem", "rss vms")
+_IOCounters = namedtuple("pio", "read_bytes write_bytes")
+
+
+class FakeProcess:
+    """Процесс игры с интерфейсом psutil.Process, нужным GameLauncher
+
+    Кроме проверки процесса поддерживает то, что используют игровой режим
+    (приоритеты, привязка к ядрам) и телеметрия сессии (время CPU, память,
+    ввод-вывод); изменения приоритетов только запоминаются.
+    """
+
+    def __init__(self, game_id: int):
+        self.pid = 100000 + game_id
+        self.running = True
+        self.started_at = time.time()
+        self.priority = 0
+        self.io_priority = (2, 4)
+        self.affinity: List[int] = [0]
+
+    def is_running(self) -> bool:
+        return self.running
+
+    def name(self) -> str:
+        return f"game{self.pid}.exe"
+
+    def create_time(self) -> float:
+        return self.started_at
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def children(self, recursive: bool = False) -> list:
+        return []
+
+    def nice(self, value: Optional[int] = None):
+        if value is None:
+            return self.priority
+        self.priority = value
+
+    def ionice(self, ioclass=None, value=None):
+        if ioclass is None:
+            return self.io_priority
+        self.io_priority = (ioclass, value)
+
+    def cpu_affinity(self, cpus: Optional[List[int]] = None):
+        if cpus is None:
+            return list(self.affinity)
+        self.affinity = list(cpus)
+
+    def cpu_times(self):
+        # Игра "занимает" половину ядра с момента запуска
+        elapsed = time.time() - self.started_at
+        return _CPUTimes(elapsed * 0.4, elapsed * 0.1)
+
+    def memory_info(self):
+        return _MemoryInfo(512 * 1024 ** 2, 1024 ** 3)
+
+    def num_threads(self) -> int:
+        return 24
+
+    def io_counters(self):
+        elapsed = time.time() - self.started_at
+        return _IOCounters(int(elapsed * 4 * 1024 ** 2), int(elapsed * 64 * 1024))
+
+
+@dataclass
+class LifecycleReport:
+    """Результат прогона плагина по циклу"""
+    plugin: str
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    problems: List[str] = field(default_factory=list)
+    two_factor_requests: int = 0
+    process: object = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.problems
+
+
+def fake_session() -> Session:
+    return Session(id=1, email="club_account", password="p@ss w0rd")
+
+
+def fake_game(game_id: int = 730, title: str = "Counter-Strike 2") -> Game:
+    return Game(id=game_id, title=title, available_accounts=1,
+                steam_url=f"https://store.steampowered.com/app/{game_id}/")
+
+
+def run_lifecycle(plugin: LauncherPlugin, game: Optional[Game] = None, session: Optional[Session] = None,
+                  two_factor: Optional[Callable[[], str]] = None) -> LifecycleReport:
+    """Прогоняет плагин по циклу discover -> warm_up -> login -> launch -> detect_game -> teardown
+
+    Проверяет контракт: discover возвращает строку или None, warm_up не
+    бросает исключений, код 2FA запрашивается не более одного раза за вход,
+    teardown можно вызвать повторно.
+    """
+    game = game or fake_game()
+    session = session or fake_session()
+    report = LifecycleReport(plugin=plugin.name)
+
+    def provider() -> str:
+        report.two_factor_requests += 1
+        return two_factor() if two_factor else "7KQ2X"
+
+    def step(name: str, func):
+        started = time.perf_counter()
+        try:
+            return func()
+        except Exception as e:
+            report.errors[name] = f"{type(e).__name__}: {e}"
+            return None
+        finally:
+            report.timings[name] = time.perf_counter() - started
+
+    path = step("discover", plugin.discover)
+    if path is not None and not isinstance(path, str):
+        report.problems.append("discover должен возвращать путь (str) или None")
+
+    step("warm_up", plugin.warm_up)
+    if "warm_up" in report.errors:
+        report.problems.append("warm_up не должен бросать исключения")
+
+    step("login", lambda: plugin.login(session, provider))
+    if report.two_factor_requests > 1:
+        report.problems.append("код 2FA запрошен больше одного раза")
+
+    if "login" not in report.errors:
+        step("launch", lambda: plugin.launch(game))
+        report.process = step("detect_game", lambda: plugin.detect_game(game))
+
+    step("teardown", plugin.teardown)
+    step("teardown_again", plugin.teardown)
+    if "teardown_again" in report.errors and "teardown" not in report.errors:
+        report.problems.append("повторный teardown должен быть безопасен")
+    return report
@@ -0,0 +1,18 @@
+"""
+Лаунчеры, для которых запуск игр пока не реализован
+"""
+from launchers.base import LauncherPlugin
+
+
+class EpicLauncher(LauncherPlugin):
+    """Epic Games"""
+    name = "epic"
+    title = "Epic Games лаунчер"
+    settings_key = "epic_path"
+
+
+class RiotLauncher(LauncherPlugin):
+    """Riot Games"""
+    name = "riot"
+    title = "Riot Games лаунчер"
+    settings_key = "riot_path"
@@ -1,21 +1,27 @@
 """
 Главный файл приложения Rental Games Desktop
 """
+import logging
 import sys
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtCore import Qt
 from config import Config
 from api_client import APIClient
+from api_errors import APIError
+from app_logging import setup_logging
 from ui.key_input_dialog import KeyInputDialog
 from ui.main_window import MainWindow
 
+logger = logging.getLogger(__name__)
+
 def main():
     """Главная функция приложения"""
     app = QApplication(sys.argv)
     app.setApplicationName("Rental Games Desktop")
     
     config = Config()
-    api_client = APIClient()
+    setup_logging("main", config.get_setting('log_level', 'INFO'), config.get_setting('log_levels'))
+    api_client = APIClient.from_config(config)
     
     # Проверяем наличие ключа
     pc_key = config.load_key()
@@ -40,10 +46,20 @@ def main():
     else:
         # Проверяем валидность ключа через API
         api_client.set_key(pc_key)
+        key_valid = True
         try:
-            # Пробуем получить активную аренду для проверки ключа
-            api_client.get_active_rental()
-        except Exception as e:
+            # Ключ проверяет запрос активной аренды, без каталога: он может
+            # загружаться долго, а окно покажет его потоком по страницам.
+            # Главное окно возьмет аренду из клиента без повторного запроса
+            api_client.bootstrap(games=False)
+        except APIError as e:
+            if e.retryable:
+                # Бэкенд недоступен - это не повод удалять сохраненный ключ
+                logger.warning("Не удалось проверить ключ: %s", e)
+            else:
+                key_valid = False
+        
+        if not key_valid:
             # Если ключ невалидный, запрашиваем новый
             QMessageBox.warning(
                 None,
@@ -68,7 +84,7 @@ def main():
                 sys.exit(0)
     
     # Создаем и показываем главное окно
-    window = MainWindow()
+    window = MainWindow(config, api_client)
     window.show()
     
     sys.exit(app.exec_())
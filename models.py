@@ -0,0 +1,176 @@
+"""
+Типизированные модели ответов API
+Ответы декодируются один раз в APIClient; редко используемые поля хранятся
+в компактном сериализованном виде и декодируются при первом обращении
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data) -> Any:
+    """Декодирует JSON (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> bytes:
+    """Кодирует JSON в компактные байты (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _pack_extra(data: Dict[str, Any], known: Tuple[str, ...]) -> Optional[bytes]:
+    """Упаковывает поля ответа, не вынесенные в атрибуты модели
+
+    Хранятся байты, а не словарь: у каталога на десятки тысяч игр словари
+    с описаниями удваивают удерживаемую память.
+    """
+    if len(data) <= len(known):
+        # Быстрый путь: лишних полей нет (самый частый случай для каталога)
+        if all(key in known for key in data):
+            return None
+    extra = {key: value for key, value in data.items() if key not in known}
+    if not extra:
+        return None
+    # orjson возвращает буфер с запасом емкости; копия занимает ровно len() байт
+    return bytes(memoryview(dumps(extra)))
+
+
+class _ExtraMixin:
+    """Доступ к редко используемым полям исходного ответа"""
+
+    __slots__ = ()
+
+    def _decoded_extra(self) -> Dict[str, Any]:
+        """Дополнительные поля; декодируются один раз и запоминаются в модели
+
+        Декодированный словарь остается только у моделей, к полям которых
+        обращались (игра при запуске), а не у всего каталога.
+        """
+        if not self._extra:
+            return {}
+        decoded = self._extra_decoded
+        if decoded is None:
+            decoded = loads(self._extra)
+            object.__setattr__(self, '_extra_decoded', decoded)
+        return decoded
+
+    def extra(self) -> Dict[str, Any]:
+        """Возвращает все дополнительные поля (новый словарь)"""
+        return dict(self._decoded_extra())
+
+    def get_extra(self, key: str, default=None):
+        """Возвращает дополнительное поле ответа по его имени в API"""
+        return self._decoded_extra().get(key, default)
+
+
+@dataclass(frozen=True, slots=True)
+class Game(_ExtraMixin):
+    """Игра из каталога"""
+    id: int
+    title: str
+    available_accounts: int = 0
+    steam_url: str = ''
+    image_url: str = ''
+    _extra: Optional[bytes] = field(default=None, repr=False, compare=False)
+    _extra_decoded: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+
+    _FIELDS = ('id', 'title', 'availableAccounts', 'steamUrl', 'imageUrl')
+
+    @property
+    def is_available(self) -> bool:
+        return self.available_accounts > 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Game':
+        return cls(
+            id=data['id'],
+            title=data.get('title') or '',
+            available_accounts=data.get('availableAccounts') or 0,
+            steam_url=data.get('steamUrl') or '',
+            image_url=data.get('imageUrl') or '',
+            _extra=_pack_extra(data, cls._FIELDS),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Игра в формате ответа API (обратно к from_dict)"""
+        data = self.extra()
+        data.update(id=self.id, title=self.title, availableAccounts=self.available_accounts,
+                    steamUrl=self.steam_url, imageUrl=self.image_url)
+        return data
+
+
+@dataclass(frozen=True, slots=True)
+class Session(_ExtraMixin):
+    """Сессия аренды с данными аккаунта"""
+    id: int
+    email: str = field(repr=False)
+    password: str = field(repr=False)
+    _extra: Optional[bytes] = field(default=None, repr=False, compare=False)
+    _extra_decoded: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+
+    _FIELDS = ('id', 'email', 'password')
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Session':
+        return cls(
+            id=data['id'],
+            email=data.get('email') or '',
+            password=data.get('password') or '',
+            _extra=_pack_extra(data, cls._FIELDS),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Rental(_ExtraMixin):
+    """Активная аренда ПК"""
+    id: Optional[int]
+    game_title: str = 'Неизвестная игра'
+    remaining_hours: float = 0.0
+    planned_duration_hours: float = 1.0
+    _extra: Optional[bytes] = field(default=None, repr=False, compare=False)
+    _extra_decoded: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+
+    _FIELDS = ('id', 'gameTitle', 'remainingHours', 'plannedDurationHours')
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Rental':
+        return cls(
+            id=data.get('id'),
+            game_title=data.get('gameTitle') or 'Неизвестная игра',
+            remaining_hours=data.get('remainingHours') or 0.0,
+            planned_duration_hours=data.get('plannedDurationHours', 1) or 0.0,
+            _extra=_pack_extra(data, cls._FIELDS),
+        )
+
+    @classmethod
+    def from_active_response(cls, data: Dict[str, Any]) -> Optional['Rental']:
+        """Разбирает ответ /club/rental/active; None - активной аренды нет"""
+        if data.get('hasActiveRental') and data.get('rental'):
+            return cls.from_dict(data['rental'])
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class TwoFactorResponse:
+    """Ответ на запрос кода 2FA"""
+    success: bool
+    code: Optional[str] = None
+    message: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TwoFactorResponse':
+        code = data.get('code')
+        return cls(
+            success=bool(data.get('success')),
+            code=str(code) if code else None,
+            message=data.get('message'),
+        )
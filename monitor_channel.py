@@ -0,0 +1,350 @@
+"""
+Локальный канал между приложением и процессами мониторинга
+Приложение открывает канал (Unix сокет на Linux, именованный канал на Windows)
+на время сессии. Адрес и одноразовый ключ доступа передаются монитору через
+stdin, а ключ ПК - уже по каналу после проверки ключа доступа, поэтому секреты
+не попадают в командную строку, видимую всем процессам.
+
+Сообщения - JSON в кадрах multiprocessing.connection (send_bytes/recv_bytes),
+как в канале управления агента. Монитор -> приложение: hello; приложение ->
+монитор: status, stop, session_ended. Ответ на запрос содержит тот же id.
+В welcome, кроме секретов сессии, может прийти watch_pid - настоящий PID
+монитора, за которым нужно следить.
+"""
+import json
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Optional, Dict, Any, Callable, List
+
+from config import get_config_dir
+
+logger = logging.getLogger(__name__)
+
+PIPE_PREFIX = r'\\.\pipe\RentalDesktopMonitor'
+
+# Сколько ждать ответа монитора и его выхода после stop
+REQUEST_TIMEOUT = 2.0
+STOP_TIMEOUT = 1.0
+
+
+def _family(address: str) -> str:
+    return 'AF_PIPE' if address.startswith('\\\\') else 'AF_UNIX'
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def session_address() -> str:
+    """Уникальный адрес канала для сессии"""
+    suffix = f"{os.getpid()}-{secrets.token_hex(4)}"
+    if sys.platform == 'win32':
+        return f"{PIPE_PREFIX}-{suffix}"
+    return str(get_config_dir() / f"monitor-{suffix}.sock")
+
+
+class ChannelError(Exception):
+    """Монитор не ответил или канал закрыт"""
+
+
+@dataclass
+class MonitorLink:
+    """Процесс мониторинга и его подключение к каналу"""
+    process: subprocess.Popen
+    role: str
+    token: str
+    conn: Optional[Connection] = None
+    connected_at: Optional[float] = None
+    # PID из hello: настоящий процесс монитора (у Popen в venv на Windows - промежуточный)
+    reported_pid: Optional[int] = None
+    # Монитор, за которым следит этот (его настоящий PID передается в welcome)
+    watch: Optional["MonitorLink"] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    _next_id: int = 0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def request(self, op: str, timeout: float = REQUEST_TIMEOUT, **params) -> Dict[str, Any]:
+        """Запрос монитору и его ответ (запросы по одному на подключение)"""
+        with self.lock:
+            if self.conn is None:
+                raise ChannelError(f"Монитор {self.pid} не подключен")
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                self.conn.send_bytes(_encode({"op": op, "id": request_id, **params}))
+                while True:
+                    if not self.conn.poll(timeout):
+                        raise ChannelError(f"Монитор {self.pid} не ответил на {op} за {timeout} с")
+                    reply = json.loads(self.conn.recv_bytes())
+                    if reply.get("id") == request_id:
+                        return reply
+            except (EOFError, OSError) as e:
+                self.close()
+                raise ChannelError(f"Канал монитора {self.pid} закрыт: {e}")
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
+
+
+class MonitorHub:
+    """Сторона приложения: принимает подключения мониторов сессии
+
+    Args:
+        session_secrets: Что получает монитор после проверки ключа доступа
+            (ключ ПК, ID сессии)
+        address: Адрес канала (по умолчанию - уникальный для сессии)
+    """
+
+    def __init__(self, session_secrets: Dict[str, Any], address: Optional[str] = None):
+        self.session_secrets = session_secrets
+        self.address = address or session_address()
+        self.authkey = secrets.token_hex(32).encode('ascii')
+        self.links: List[MonitorLink] = []
+        self._by_token: Dict[str, MonitorLink] = {}
+        self._listener: Optional[Listener] = None
+        self._closed = threading.Event()
+        self._changed = threading.Condition()
+
+    def start(self):
+        family = _family(self.address)
+        if family == 'AF_UNIX' and os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family=family, authkey=self.authkey)
+        if family == 'AF_UNIX':
+            os.chmod(self.address, 0o600)
+        threading.Thread(target=self._accept_loop, name="monitor-accept", daemon=True).start()
+
+    def handoff(self, token: str) -> bytes:
+        """Строка для stdin монитора: адрес канала, ключ доступа и метка монитора"""
+        return _encode({"address": self.address, "authkey": self.authkey.decode('ascii'), "token": token}) + b"\n"
+
+    def spawn(self, args: List[str], role: str, watch: Optional[MonitorLink] = None,
+              **popen_kwargs) -> MonitorLink:
+        """Запускает монитор и передает ему адрес и ключ через stdin
+
+        Монитор представляется меткой, а не PID: в виртуальном окружении на
+        Windows python.exe - промежуточный процесс со своим PID. По той же
+        причине PID монитора, за которым следит этот (watch), передается в
+        welcome из его hello, а не из Popen.
+        """
+        token = secrets.token_hex(8)
+        process = subprocess.Popen(args, stdin=subprocess.PIPE, **popen_kwargs)
+        link = MonitorLink(process, role, token, watch=watch)
+        with self._changed:
+            self.links.append(link)
+            self._by_token[token] = link
+        try:
+            process.stdin.write(self.handoff(token))
+            process.stdin.close()
+        except OSError as e:
+            logger.warning("Не удалось передать параметры канала монитору %s: %s", process.pid, e)
+        return link
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed.is_set():
+                    return
+                logger.warning("Ошибка подключения монитора", exc_info=True)
+                continue
+            except Exception as e:
+                logger.warning("Отклонено подключение к каналу мониторов: %s", e)
+                continue
+            try:
+                self._welcome(conn)
+            except Exception as e:
+                logger.warning("Ошибка приветствия монитора: %s", e)
+                conn.close()
+
+    def _welcome(self, conn: Connection):
+        if not conn.poll(REQUEST_TIMEOUT):
+            raise ChannelError("монитор не представился")
+        hello = json.loads(conn.recv_bytes())
+        pid = hello.get("pid")
+        with self._changed:
+            link = self._by_token.get(hello.get("token"))
+            if hello.get("op") != "hello" or link is None or link.conn is not None:
+                raise ChannelError(f"неизвестный монитор (PID {pid})")
+            welcome = {"op": "welcome", **self.session_secrets}
+            if link.watch is not None and link.watch.reported_pid:
+                welcome["watch_pid"] = link.watch.reported_pid
+            conn.send_bytes(_encode(welcome))
+            link.reported_pid = pid
+            link.conn = conn
+            link.connected_at = time.monotonic()
+            self._changed.notify_all()
+        logger.info("Монитор %s (PID %s) подключился к каналу", link.role, pid)
+
+    def wait_connected(self, timeout: float) -> bool:
+        """Ждет подключения всех запущенных мониторов"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while not all(link.conn for link in self.links):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Состояние мониторов: ответ по каналу или хотя бы признак жизни процесса"""
+        result = []
+        for link in list(self.links):
+            entry: Dict[str, Any] = {"pid": link.pid, "role": link.role,
+                                     "alive": link.process.poll() is None, "connected": link.conn is not None}
+            if link.conn is not None:
+                try:
+                    reply = link.request("status")
+                    reply.pop("id", None)
+                    reply.pop("op", None)
+                    entry.update(reply)
+                except ChannelError as e:
+                    entry["error"] = str(e)
+                    entry["connected"] = False
+            result.append(entry)
+        return result
+
+    def broadcast(self, op: str, **params) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Сообщение всем подключенным мониторам; ответы по PID (None - нет ответа)
+
+        Мониторы обходятся от последнего запущенного к первому: наблюдающий
+        монитор должен узнать о конце сессии раньше, чем исчезнет тот, за
+        кем он следит.
+        """
+        replies: Dict[int, Optional[Dict[str, Any]]] = {}
+        for link in reversed(self.links):
+            try:
+                replies[link.pid] = link.request(op, **params)
+            except ChannelError as e:
+                logger.debug(str(e))
+                replies[link.pid] = None
+        return replies
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        """Останавливает мониторы (session_ended) и закрывает канал
+
+        Мониторы завершаются сами после ответа; не ответившие или не вышедшие
+        за timeout завершаются принудительно.
+        """
+        started = time.monotonic()
+        self.broadcast("session_ended")
+        for link in list(self.links):
+            link.close()
+            remaining = max(0.0, timeout - (time.monotonic() - started))
+            try:
+                link.process.wait(timeout=remaining)
+            except subprocess.TimeoutExpired:
+                logger.info("Принудительное завершение монитора %s", link.pid)
+                link.process.kill()
+                try:
+                    link.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    logger.warning("Монитор %s не завершился", link.pid)
+        self.close()
+        logger.info("Мониторы остановлены за %.0f мс", (time.monotonic() - started) * 1000)
+
+    def close(self):
+        self._closed.set()
+        if self._listener:
+            self._listener.close()
+            self._listener = None
+        if _family(self.address) == 'AF_UNIX' and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class MonitorChannel:
+    """Сторона монитора: подключение к каналу приложения
+
+    Args:
+        address: Адрес канала
+        authkey: Ключ доступа
+        token: Метка монитора, выданная приложением
+    """
+
+    def __init__(self, address: str, authkey: bytes, token: str = ""):
+        self.address = address
+        self.authkey = authkey
+        self.token = token
+        self.conn: Optional[Connection] = None
+        self.secrets: Dict[str, Any] = {}
+
+    @classmethod
+    def from_stdin(cls, stream=None) -> Optional["MonitorChannel"]:
+        """Канал по строке, переданной приложением в stdin (None - не передана)"""
+        stream = stream or sys.stdin
+        try:
+            line = stream.readline() if stream else ""
+            if not line:
+                return None
+            handoff = json.loads(line)
+            return cls(handoff["address"], handoff["authkey"].encode('ascii'), handoff.get("token", ""))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Некорректные параметры канала: %s", e)
+            return None
+
+    def connect(self, timeout: float = REQUEST_TIMEOUT) -> Dict[str, Any]:
+        """Подключается, представляется и получает секреты сессии"""
+        self.conn = Client(self.address, family=_family(self.address), authkey=self.authkey)
+        self.conn.send_bytes(_encode({"op": "hello", "pid": os.getpid(), "token": self.token}))
+        if not self.conn.poll(timeout):
+            raise ChannelError("Приложение не ответило на hello")
+        welcome = json.loads(self.conn.recv_bytes())
+        if welcome.pop("op", None) != "welcome":
+            raise ChannelError("Некорректный ответ на hello")
+        self.secrets = welcome
+        return welcome
+
+    def serve(self, handler: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+              on_closed: Optional[Callable[[], None]] = None) -> threading.Thread:
+        """Обрабатывает запросы приложения в отдельном потоке
+
+        handler(op, message) возвращает поля ответа; on_closed вызывается, если
+        канал закрылся (приложение завершилось или остановило мониторы).
+        """
+        def loop():
+            while True:
+                try:
+                    message = json.loads(self.conn.recv_bytes())
+                except (EOFError, OSError, ValueError):
+                    break
+                op = message.get("op", "")
+                try:
+                    reply = handler(op, message)
+                except Exception as e:
+                    logger.exception("Ошибка обработки %s: %s", op, e)
+                    reply = {"error": str(e)}
+                try:
+                    self.conn.send_bytes(_encode({"op": op, "id": message.get("id"), **(reply or {})}))
+                except OSError:
+                    break
+            if on_closed:
+                on_closed()
+
+        thread = threading.Thread(target=loop, name="monitor-channel", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
@@ -0,0 +1,187 @@
+"""
+Прогрев файлов игры в кэше страниц ОС
+Пока идет вход в лаунчер и ожидание кода 2FA, исполняемые файлы и самые
+большие файлы ресурсов игры последовательно читаются с ограничением скорости.
+Первая минута игры на HDD и SATA SSD после этого читает данные из памяти.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+import psutil
+
+from launcher_discovery import parse_steam_libraries
+
+logger = logging.getLogger(__name__)
+
+# Файлы, которые игра читает первыми: исполняемые файлы и библиотеки
+EXECUTABLE_SUFFIXES = ('.exe', '.dll', '.so', '.bin')
+CHUNK_SIZE = 1024 * 1024
+
+
+def steam_library_dirs(steam_root) -> List[Path]:
+    """Библиотеки Steam: каталог установки и пути из steamapps/libraryfolders.vdf"""
+    steam_root = Path(steam_root)
+    libraries = [steam_root]
+    try:
+        text = (steam_root / "steamapps" / "libraryfolders.vdf").read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return libraries
+    for path in parse_steam_libraries(text):
+        library = Path(path)
+        if library not in libraries:
+            libraries.append(library)
+    return libraries
+
+
+def find_steam_install_dir(steam_root, app_id: int) -> Optional[Path]:
+    """Каталог игры по appmanifest_<app_id>.acf в библиотеках Steam"""
+    for library in steam_library_dirs(steam_root):
+        manifest = library / "steamapps" / f"appmanifest_{app_id}.acf"
+        try:
+            text = manifest.read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            continue
+        match = re.search(r'"installdir"\s+"([^"]+)"', text, re.IGNORECASE)
+        if match:
+            install_dir = library / "steamapps" / "common" / match.group(1)
+            if install_dir.is_dir():
+                return install_dir
+    return None
+
+
+def select_files(install_dir, budget_bytes: int, max_files: int = 200) -> List[Tuple[str, int]]:
+    """Файлы для прогрева: сначала исполняемые, затем самые большие, в пределах бюджета
+
+    Returns:
+        [(путь, размер)] в порядке чтения
+    """
+    executables: List[Tuple[str, int]] = []
+    assets: List[Tuple[str, int]] = []
+    stack = [str(install_dir)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            size = entry.stat(follow_symlinks=False).st_size
+                            if size:
+                                target = executables if entry.name.lower().endswith(EXECUTABLE_SUFFIXES) else assets
+                                target.append((entry.path, size))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+    selected = []
+    total = 0
+    for group in (executables, assets):
+        for path, size in sorted(group, key=lambda item: item[1], reverse=True):
+            if len(selected) >= max_files:
+                return selected
+            if total + size > budget_bytes:
+                continue
+            selected.append((path, size))
+            total += size
+    return selected
+
+
+def default_budget(fraction: float = 0.25, limit: int = 2 * 1024 ** 3) -> int:
+    """Бюджет прогрева: доля свободной памяти, но не больше limit
+    (прогрев не должен вытеснять из памяти саму игру и систему)"""
+    return int(min(limit, psutil.virtual_memory().available * fraction))
+
+
+@dataclass
+class PrewarmReport:
+    """Итог прогрева"""
+    files: int = 0
+    bytes: int = 0
+    planned_bytes: int = 0
+    seconds: float = 0.0
+    cancelled: bool = False
+
+    def __str__(self) -> str:
+        mb = 1024 * 1024
+        rate = self.bytes / mb / self.seconds if self.seconds else 0
+        state = ", прерван" if self.cancelled else ""
+        return (f"{self.files} файлов, {self.bytes / mb:.0f} из {self.planned_bytes / mb:.0f} МБ "
+                f"за {self.seconds:.1f} с ({rate:.0f} МБ/с{state})")
+
+
+class Prewarmer:
+    """Последовательное чтение файлов с ограничением скорости
+
+    Args:
+        files: [(путь, размер)] в порядке чтения (select_files); None - выбрать
+            в начале run из install_dir, чтобы обход каталога тоже шел в фоне
+        bandwidth: Ограничение скорости чтения, байт в секунду (0 - без ограничения)
+        install_dir: Каталог игры (если files не заданы)
+        budget_bytes: Бюджет выбора файлов (по умолчанию - default_budget)
+    """
+
+    def __init__(self, files: Optional[List[Tuple[str, int]]] = None, bandwidth: float = 100 * 1024 * 1024,
+                 chunk_size: int = CHUNK_SIZE, install_dir=None, budget_bytes: Optional[int] = None):
+        self.files = files
+        self.bandwidth = bandwidth
+        self.chunk_size = chunk_size
+        self.install_dir = install_dir
+        self.budget_bytes = budget_bytes
+        self._cancel = threading.Event()
+        self.report = PrewarmReport(planned_bytes=sum(size for _, size in files or ()))
+
+    def cancel(self):
+        """Останавливает прогрев после текущего блока"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def run(self) -> PrewarmReport:
+        started = time.monotonic()
+        if self.files is None:
+            budget = default_budget() if self.budget_bytes is None else self.budget_bytes
+            self.files = select_files(self.install_dir, budget)
+            self.report.planned_bytes = sum(size for _, size in self.files)
+        # График скорости - от начала чтения: иначе время обхода каталога
+        # большой игры ушло бы в "запас", и первые байты читались бы без ограничения
+        io_started = time.monotonic()
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        for path, _ in self.files:
+            if self._cancel.is_set():
+                break
+            try:
+                self._warm_file(path, view, io_started)
+            except OSError as e:
+                logger.debug("Прогрев %s: %s", path, e)
+                continue
+            self.report.files += 1
+        self.report.seconds = time.monotonic() - started
+        self.report.cancelled = self._cancel.is_set()
+        return self.report
+
+    def _warm_file(self, path: str, view: memoryview, started: float):
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                # Ядро читает с упреждением крупнее блоков
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while not self._cancel.is_set():
+                count = f.readinto(view)
+                if not count:
+                    break
+                self.report.bytes += count
+                if self.bandwidth:
+                    # Опережаем график - ждем (ожидание прерывается отменой)
+                    ahead = self.report.bytes / self.bandwidth - (time.monotonic() - started)
+                    if ahead > 0:
+                        self._cancel.wait(ahead)
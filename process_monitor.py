@@ -2,10 +2,12 @@
 Модуль для двухпроцессного мониторинга
 Оба процесса следят друг за другом и за игрой
 """
+import logging
 import os
 import sys
 import time
 import json
+import threading
 import psutil
 import subprocess
 from pathlib import Path
@@ -14,6 +16,8 @@ import sys
 from pathlib import Path
 
 # Добавляем путь к модулям в sys.path
+logger = logging.getLogger("process_monitor")
+
 script_dir = Path(__file__).parent
 if str(script_dir) not in sys.path:
     sys.path.insert(0, str(script_dir))
@@ -22,6 +26,10 @@ try:
     from api_client import APIClient
     from config import Config
     from steam_manager import SteamManager
+    from scheduler import Scheduler
+    from app_logging import setup_logging
+    from monitor_channel import MonitorChannel
+    from profiler import SamplingProfiler, timed, hot_path_stats
 except ImportError:
     # Если импорт не удался, пробуем из текущей директории
     import importlib.util
@@ -37,25 +45,60 @@ except ImportError:
     steam_manager_module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(steam_manager_module)
     
+    spec = importlib.util.spec_from_file_location("scheduler", script_dir / "scheduler.py")
+    scheduler_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(scheduler_module)
+    
+    spec = importlib.util.spec_from_file_location("app_logging", script_dir / "app_logging.py")
+    app_logging_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_logging_module)
+    
+    spec = importlib.util.spec_from_file_location("monitor_channel", script_dir / "monitor_channel.py")
+    monitor_channel_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(monitor_channel_module)
+    
+    spec = importlib.util.spec_from_file_location("profiler", script_dir / "profiler.py")
+    profiler_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(profiler_module)
+    
     APIClient = api_client_module.APIClient
     Config = config_module.Config
     SteamManager = steam_manager_module.SteamManager
+    Scheduler = scheduler_module.Scheduler
+    setup_logging = app_logging_module.setup_logging
+    MonitorChannel = monitor_channel_module.MonitorChannel
+    SamplingProfiler = profiler_module.SamplingProfiler
+    timed = profiler_module.timed
+    hot_path_stats = profiler_module.hot_path_stats
 
 class ProcessMonitor:
     """Класс для мониторинга процессов"""
     
-    def __init__(self, main_pid: int, monitor_pid: int, session_id: int, pc_key: str):
+    def __init__(self, main_pid: int, monitor_pid: int, session_id: int, pc_key: str, profile: bool = False):
         self.main_pid = main_pid
         self.monitor_pid = monitor_pid
         self.session_id = session_id
         self.pc_key = pc_key
         self.config = Config()
-        self.api_client = APIClient()
+        self.api_client = APIClient.from_config(self.config)
         self.api_client.set_key(pc_key)
         self.running = True
+        self.scheduler = Scheduler(max_workers=2, name="monitor")
+        self._stop_event = threading.Event()
+        self.started_at = time.time()
+        # Для запроса status по каналу
+        self.checks = 0
+        self.last_check: Optional[float] = None
+        self.rental_active: Optional[bool] = None
+        self.last_error: Optional[str] = None
+        # Профилирование по требованию приложения (команда profile)
+        self.profiler: Optional[SamplingProfiler] = None
+        if profile:
+            self.set_profiling(True)
         
-        # Файл для обмена информацией между процессами
-        self.heartbeat_file = Path(os.path.expanduser("~")) / "AppData" / "Roaming" / "RentalDesktop" / "heartbeat.json"
+        # Heartbeat у каждого монитора свой: в общий файл оба процесса писали
+        # свой PID, и парный монитор видел чужую запись как пропавший heartbeat
+        self.heartbeat_file = self._heartbeat_path(os.getpid())
         self.heartbeat_file.parent.mkdir(parents=True, exist_ok=True)
         
         # PID файлы для идентификации процессов
@@ -76,11 +119,16 @@ class ProcessMonitor:
         with open(self.pid_file, 'w') as f:
             json.dump(info, f)
     
-    def _load_heartbeat(self) -> Optional[dict]:
-        """Загружает heartbeat файл"""
+    @staticmethod
+    def _heartbeat_path(pid: int) -> Path:
+        return Path(os.path.expanduser("~")) / "AppData" / "Roaming" / "RentalDesktop" / f"heartbeat_{pid}.json"
+    
+    def _load_heartbeat(self, pid: int) -> Optional[dict]:
+        """Загружает heartbeat файл процесса"""
         try:
-            if self.heartbeat_file.exists():
-                with open(self.heartbeat_file, 'r') as f:
+            heartbeat_file = self._heartbeat_path(pid)
+            if heartbeat_file.exists():
+                with open(heartbeat_file, 'r') as f:
                     return json.load(f)
         except:
             pass
@@ -97,7 +145,7 @@ class ProcessMonitor:
             with open(self.heartbeat_file, 'w') as f:
                 json.dump(heartbeat, f)
         except Exception as e:
-            print(f"Ошибка обновления heartbeat: {e}")
+            logger.error("Ошибка обновления heartbeat: %s", e, extra={"sample": True})
     
     def is_process_running(self, pid: int) -> bool:
         """Проверяет, запущен ли процесс"""
@@ -114,7 +162,7 @@ class ProcessMonitor:
     
     def check_heartbeat(self, pid: int) -> bool:
         """Проверяет heartbeat другого процесса"""
-        heartbeat = self._load_heartbeat()
+        heartbeat = self._load_heartbeat(pid)
         if not heartbeat:
             return False
         
@@ -130,62 +178,124 @@ class ProcessMonitor:
         return True
     
     def monitor_loop(self):
-        """Основной цикл мониторинга"""
-        last_heartbeat_check = time.time()
-        
-        while self.running:
-            try:
-                # Обновляем свой heartbeat
-                self._update_heartbeat()
-                
-                # Проверяем процессы каждые 2 секунды
-                current_time = time.time()
-                if current_time - last_heartbeat_check >= 2:
-                    last_heartbeat_check = current_time
-                    
-                    # Проверяем главный процесс
-                    if not self.is_process_running(self.main_pid):
-                        print(f"Главный процесс {self.main_pid} не найден!")
-                        self.cleanup_and_exit()
-                        break
-                    
-                    # Проверяем мониторинг процесс (если не мы)
-                    if self.monitor_pid != os.getpid():
-                        if not self.is_process_running(self.monitor_pid):
-                            print(f"Процесс мониторинга {self.monitor_pid} не найден!")
-                            self.cleanup_and_exit()
-                            break
-                        
-                        # Проверяем heartbeat мониторинг процесса
-                        if not self.check_heartbeat(self.monitor_pid):
-                            print(f"Heartbeat процесса мониторинга {self.monitor_pid} не обновляется!")
-                            self.cleanup_and_exit()
-                            break
-                    
-                    # Проверяем активную аренду
-                    try:
-                        rental_info = self.api_client.get_active_rental()
-                        if not rental_info.get('hasActiveRental'):
-                            print("Аренда завершена!")
-                            self.cleanup_and_exit()
-                            break
-                    except Exception as e:
-                        print(f"Ошибка при проверке аренды: {e}")
-                        # Продолжаем мониторинг даже при ошибке API
-                
-                time.sleep(1)
-                
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                print(f"Ошибка в цикле мониторинга: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(2)
+        """Основной цикл мониторинга
+
+        Периодические проверки выполняет планировщик, а главный поток просто
+        ждет сигнала остановки, не просыпаясь каждую секунду.
+        """
+        self._update_heartbeat()
+        # Heartbeat считается свежим 10 секунд, обновления раз в 2 секунды достаточно
+        heartbeat_task = self.scheduler.call_every(2, self._update_heartbeat, jitter=0,
+                                                   name="monitor-heartbeat")
+        check_task = self.scheduler.call_every(2, self._check_processes, jitter=0.1,
+                                               name="monitor-check")
+        try:
+            self._stop_event.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.scheduler.cancel(heartbeat_task)
+            self.scheduler.cancel(check_task)
+            self.scheduler.shutdown()
+
+    @timed("monitor.check")
+    def _check_processes(self):
+        """Проверяет главный процесс, парный монитор и активную аренду"""
+        if not self.running:
+            return
+
+        # Проверяем главный процесс
+        if not self.is_process_running(self.main_pid):
+            logger.warning("Главный процесс %s не найден!", self.main_pid)
+            self.cleanup_and_exit()
+            return
+
+        # Проверяем парный монитор (у первого монитора пара - само приложение,
+        # его жизнь уже проверена выше и видна по каналу)
+        if self.monitor_pid not in (os.getpid(), self.main_pid):
+            if not self.is_process_running(self.monitor_pid):
+                logger.warning("Процесс мониторинга %s не найден!", self.monitor_pid)
+                self.cleanup_and_exit()
+                return
+
+            # Проверяем heartbeat мониторинг процесса
+            if not self.check_heartbeat(self.monitor_pid):
+                logger.warning("Heartbeat процесса мониторинга %s не обновляется!", self.monitor_pid)
+                self.cleanup_and_exit()
+                return
+
+        # Проверяем активную аренду
+        try:
+            self.rental_active = bool(self.api_client.get_active_rental())
+            self.last_error = None
+            if not self.rental_active:
+                logger.info("Аренда завершена!")
+                self.cleanup_and_exit()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Ошибка при проверке аренды: %s", e, extra={"sample": True})
+            # Продолжаем мониторинг даже при ошибке API
+        finally:
+            self.checks += 1
+            self.last_check = time.time()
+
+    def handle_command(self, op: str, message: dict) -> dict:
+        """Запрос приложения по каналу мониторов"""
+        if op == "status":
+            return {
+                "pid": os.getpid(),
+                "running": self.running,
+                "session_id": self.session_id,
+                "uptime": round(time.time() - self.started_at, 1),
+                "checks": self.checks,
+                "last_check_age": round(time.time() - self.last_check, 1) if self.last_check else None,
+                "rental_active": self.rental_active,
+                "last_error": self.last_error,
+                "profiling": bool(self.profiler and self.profiler.running),
+                "hot_paths": hot_path_stats(),
+            }
+        if op == "profile":
+            path = self.set_profiling(bool(message.get("enabled")))
+            return {"profiling": bool(self.profiler and self.profiler.running),
+                    "file": str(path) if path else None}
+        if op in ("stop", "session_ended"):
+            # Аренду завершает и лаунчер закрывает само приложение
+            logger.info("Остановка по каналу (%s)", op)
+            self.stop()
+            return {"stopped": True}
+        return {"error": f"Неизвестная команда: {op}"}
+
+    def set_profiling(self, enabled: bool) -> Optional[Path]:
+        """Включает или выключает профилировщик; при выключении - путь к файлу профиля"""
+        if enabled:
+            if self.profiler is None or not self.profiler.running:
+                self.profiler = SamplingProfiler(self.config.config_dir / "profiles", "monitor")
+                self.profiler.start()
+            return None
+        profiler, self.profiler = self.profiler, None
+        return profiler.stop() if profiler else None
     
+    def on_channel_closed(self):
+        """Канал закрылся без stop: приложение, вероятно, упало - проверяем сразу"""
+        if self.running:
+            logger.warning("Канал с приложением закрыт, внеочередная проверка")
+            self.scheduler.submit(self._check_processes, name="monitor-check-now")
+
+    def stop(self):
+        """Штатная остановка без завершения аренды"""
+        self.running = False
+        self.set_profiling(False)
+        try:
+            for path in (self.pid_file, self.heartbeat_file):
+                if path.exists():
+                    path.unlink()
+        except Exception as e:
+            logger.error("Ошибка при удалении файлов: %s", e)
+        self._stop_event.set()
+
     def cleanup_and_exit(self):
         """Очищает ресурсы и завершает аренду"""
-        print("Очистка ресурсов и завершение аренды...")
+        logger.info("Очистка ресурсов и завершение аренды...")
         try:
             # Закрываем Steam процессы
             try:
@@ -194,49 +304,71 @@ class ProcessMonitor:
                     steam_manager = SteamManager(steam_path)
                     steam_manager.close_steam()
             except Exception as e:
-                print(f"Ошибка при закрытии Steam: {e}")
+                logger.error("Ошибка при закрытии Steam: %s", e)
             
             # Завершаем аренду через API
             try:
-                print(f"Завершение аренды через API: session_id={self.session_id}")
+                logger.info("Завершение аренды через API: session_id=%s", self.session_id)
                 result = self.api_client.end_rental(self.session_id)
-                print(f"Результат завершения аренды: {result}")
+                logger.info("Результат завершения аренды: %s", result)
             except Exception as e:
-                print(f"Ошибка при завершении аренды через API: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Ошибка при завершении аренды через API: %s", e)
             
         except Exception as e:
-            print(f"Ошибка при очистке: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка при очистке: %s", e)
         finally:
             # Удаляем файлы
             try:
-                if self.pid_file.exists():
-                    self.pid_file.unlink()
-                # Не удаляем heartbeat_file - он может использоваться другим процессом
+                # Файл heartbeat свой у каждого монитора; парный монитор
+                # сначала проверяет сам процесс, поэтому файл можно удалить
+                for path in (self.pid_file, self.heartbeat_file):
+                    if path.exists():
+                        path.unlink()
             except Exception as e:
-                print(f"Ошибка при удалении файлов: {e}")
+                logger.error("Ошибка при удалении файлов: %s", e)
             
             self.running = False
-            print("Процесс мониторинга завершен")
-            sys.exit(0)
+            self.set_profiling(False)
+            logger.info("Процесс мониторинга завершен")
+            # Главный поток ждет этого события и завершает процесс
+            self._stop_event.set()
+
+def start_monitor_process(main_pid: int, monitor_pid: int, session_id: int):
+    """Запускает процесс мониторинга
 
-def start_monitor_process(main_pid: int, monitor_pid: int, session_id: int, pc_key: str):
-    """Запускает процесс мониторинга"""
-    monitor = ProcessMonitor(main_pid, monitor_pid, session_id, pc_key)
+    Адрес канала и ключ доступа приходят через stdin, ключ ПК - по каналу
+    """
+    config = Config()
+    # У каждого процесса мониторинга свой файл: ротация общего файла из двух
+    # процессов на Windows не работает
+    setup_logging(f"monitor-{os.getpid()}", config.get_setting('log_level', 'INFO'),
+                  config.get_setting('log_levels'))
+    channel = MonitorChannel.from_stdin()
+    if channel is None:
+        logger.error("Параметры канала не переданы, мониторинг невозможен")
+        sys.exit(1)
+    try:
+        secrets = channel.connect()
+    except Exception as e:
+        logger.error("Не удалось подключиться к приложению: %s", e)
+        sys.exit(1)
+    # Настоящий PID парного монитора приходит по каналу: PID из командной строки
+    # (Popen) в venv на Windows принадлежит промежуточному процессу
+    monitor_pid = secrets.get("watch_pid") or monitor_pid
+    monitor = ProcessMonitor(main_pid, monitor_pid, session_id, secrets["pc_key"], secrets.get("profile", False))
+    channel.serve(monitor.handle_command, on_closed=monitor.on_channel_closed)
     monitor.monitor_loop()
+    channel.close()
+    sys.exit(0)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 5:
-        print("Usage: python process_monitor.py <main_pid> <monitor_pid> <session_id> <pc_key>")
+    if len(sys.argv) < 4:
+        print("Usage: python process_monitor.py <main_pid> <monitor_pid> <session_id>  (параметры канала - в stdin)")
         sys.exit(1)
     
     main_pid = int(sys.argv[1])
     monitor_pid = int(sys.argv[2])
     session_id = int(sys.argv[3])
-    pc_key = sys.argv[4]
     
-    start_monitor_process(main_pid, monitor_pid, session_id, pc_key)
+    start_monitor_process(main_pid, monitor_pid, session_id)
 
@@ -0,0 +1,287 @@
+"""
+Профилирование по требованию и таймеры горячих путей
+Таймеры (запросы API, обход процессов, перечисление окон) работают всегда:
+один замер perf_counter и счетчики под блокировкой. Выборочный
+профилировщик включается только на время разбора медленного ПК: фоновый
+поток раз в interval снимает стеки всех потоков процесса и при остановке
+пишет файл свернутых стеков (collapsed/folded) для flamegraph.pl или
+speedscope: "поток;функция (файл:строка);... число_выборок".
+"""
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Callable, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005
+# Сколько последних файлов профиля хранить
+KEEP_PROFILES = 20
+
+
+class HotPathTimers:
+    """Число вызовов, суммарное и максимальное время по имени участка"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # имя -> [вызовов, сумма, максимум]
+        self._stats: Dict[str, List[float]] = {}
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            entry = self._stats.get(name)
+            if entry is None:
+                self._stats[name] = [1, seconds, seconds]
+                return
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = [(name, list(entry)) for name, entry in self._stats.items()]
+        return {
+            name: {"count": int(count), "total_ms": round(total * 1000, 1),
+                   "avg_ms": round(total * 1000 / count, 2), "max_ms": round(maximum * 1000, 1)}
+            for name, (count, total, maximum) in sorted(items)
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_timers = HotPathTimers()
+
+
+def hot_path_stats() -> Dict[str, Dict[str, float]]:
+    """Счетчики горячих путей процесса"""
+    return _timers.snapshot()
+
+
+class timed:
+    """Замер участка: with timed("api GET /games"): ... или @timed("windows.enumerate")"""
+
+    __slots__ = ("name", "_started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _timers.record(self.name, time.perf_counter() - self._started)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _timers.record(name, time.perf_counter() - started)
+        return wrapper
+
+
+class SamplingProfiler:
+    """Выборочный профилировщик всех потоков процесса
+
+    Args:
+        output_dir: Каталог файлов профиля
+        label: Префикс имени файла (app, agent, monitor-primary)
+        interval: Период выборки, секунд
+    """
+
+    def __init__(self, output_dir: Path, label: str, interval: float = DEFAULT_INTERVAL):
+        self.output_dir = Path(output_dir)
+        self.label = label
+        self.interval = interval
+        self._stacks: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        # Время, потраченное на выборки (накладные расходы)
+        self.sampling_time = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._stacks.clear()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.started_at = time.monotonic()
+        self.stopped_at = None
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info("Профилирование включено (%s, раз в %.0f мс)", self.label, self.interval * 1000)
+
+    def stop(self) -> Optional[Path]:
+        """Останавливает выборку и пишет файл; None - профиль пуст или не записан"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return None
+        self._stop.set()
+        thread.join(timeout=2)
+        self.stopped_at = time.monotonic()
+        return self._write()
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = (self.stopped_at or time.monotonic()) - self.started_at if self.started_at else 0.0
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "seconds": round(elapsed, 1),
+            "overhead_pct": round(self.sampling_time / elapsed * 100, 2) if elapsed else 0.0,
+        }
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            self._sample(own)
+            self.sampling_time += time.perf_counter() - started
+
+    def _sample(self, own: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self._stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            label = label.replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _write(self) -> Optional[Path]:
+        status = self.status()
+        if not self._stacks:
+            return None
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = self.output_dir / f"{self.label}-{os.getpid()}-{stamp}.folded"
+        lines = [f"{';'.join(stack)} {count}\n" for stack, count in self._stacks.most_common()]
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+            os.replace(tmp_file, path)
+        except OSError as e:
+            logger.error("Не удалось записать профиль %s: %s", path, e)
+            return None
+        self._remove_old()
+        logger.info("Профиль записан: %s (%s выборок за %s с, накладные расходы %s%%)", path, status['samples'],
+                    status['seconds'], status['overhead_pct'])
+        return path
+
+    def _remove_old(self):
+        try:
+            files = sorted(self.output_dir.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+            for old in files[KEEP_PROFILES:]:
+                old.unlink()
+        except OSError as e:
+            logger.debug("Не удалось удалить старые профили: %s", e)
+
+
+class ProfilerControl:
+    """Включение и выключение профилирования приложения и процессов мониторинга
+
+    Переключения выполняются по одному под блокировкой. Горячая клавиша
+    запоминает нужное состояние (request) сразу, а поток пула применяет его
+    (apply): при быстрых нажатиях побеждает последнее, а не последний поток.
+
+    Args:
+        output_dir: Каталог файлов профиля
+        label: Префикс файлов профиля этого процесса
+        monitors: Включает или выключает профилирование мониторов и
+            возвращает записанные ими файлы (GameLauncher.set_monitor_profiling)
+    """
+
+    def __init__(self, output_dir: Path, label: str,
+                 monitors: Optional[Callable[[bool], List[str]]] = None):
+        self.output_dir = Path(output_dir)
+        self.label = label
+        self.monitors = monitors
+        self.profiler: Optional[SamplingProfiler] = None
+        self.wanted = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.profiler is not None and self.profiler.running
+
+    def start(self, interval: float = DEFAULT_INTERVAL, monitors: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            self.wanted = True
+            self._start(interval, monitors)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Останавливает профилирование; файлы профиля приложения и мониторов"""
+        with self._lock:
+            self.wanted = False
+            return self._stop()
+
+    def request(self, enabled: bool):
+        """Запоминает нужное состояние; само переключение - в apply()"""
+        self.wanted = enabled
+
+    def apply(self) -> Optional[Dict[str, Any]]:
+        """Приводит профилирование к запрошенному состоянию; None - менять нечего"""
+        with self._lock:
+            if self.wanted and not self.running:
+                self._start(DEFAULT_INTERVAL, True)
+            elif not self.wanted and self.running:
+                return self._stop()
+            else:
+                return None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        profiler = self.profiler
+        status = profiler.status() if profiler else {"running": False}
+        status["output_dir"] = str(self.output_dir)
+        return status
+
+    def _start(self, interval: float, monitors: bool):
+        if not self.running:
+            self.profiler = SamplingProfiler(self.output_dir, self.label, interval)
+            self.profiler.start()
+        if monitors and self.monitors:
+            self.monitors(True)
+
+    def _stop(self) -> Dict[str, Any]:
+        profiler, self.profiler = self.profiler, None
+        path = profiler.stop() if profiler else None
+        files = [str(path)] if path else []
+        if self.monitors:
+            files.extend(self.monitors(False))
+        return {"running": False, "files": files}
@@ -0,0 +1,348 @@
+"""
+Распределение ресурсов на время игровой сессии
+Повышает приоритет процессора и ввода-вывода процесса игры, понижает
+приоритет нашего приложения, процессов мониторинга и вспомогательных процессов
+Steam и переносит их на ядра, которые не отданы игре. При завершении сессии
+исходные приоритеты и привязка к ядрам восстанавливаются.
+
+Политики задаются в настройках "resource_policies": ключ - ID игры, подстрока
+названия или "*" (для всех игр), значение - поля ResourcePolicy:
+    {"*": {"game_priority": "high"}, "730": {"reserve_cores": 2}, "dota": {"enabled": false}}
+"""
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Optional, Dict, List, Tuple, Iterable, Any
+
+import psutil
+
+from profiler import timed
+from scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LEVELS = ("idle", "below_normal", "normal", "above_normal", "high")
+IO_LEVELS = ("low", "normal", "high")
+
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    """Политика ресурсов игровой сессии
+
+    reserve_cores - сколько последних ядер отдать фоновым процессам (0 - не
+    менять привязку); pin_game - убрать эти ядра у игры.
+    """
+    enabled: bool = True
+    game_priority: str = "high"
+    game_io: str = "high"
+    background_priority: str = "below_normal"
+    background_io: str = "low"
+    reserve_cores: int = 1
+    pin_game: bool = True
+    background_processes: Tuple[str, ...] = ("steamwebhelper.exe", "steam.exe", "steamservice.exe",
+                                             "steamwebhelper", "steam")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base: Optional['ResourcePolicy'] = None) -> 'ResourcePolicy':
+        """Политика из настроек; неизвестные поля и неверные значения пропускаются"""
+        policy = base or cls()
+        known = {f.name for f in fields(cls)}
+        values = {}
+        for key, value in (data or {}).items():
+            if key not in known:
+                logger.warning("Неизвестное поле политики ресурсов: %s", key)
+                continue
+            if key == "background_processes":
+                value = tuple(value)
+            if key in ("game_priority", "background_priority") and value not in PRIORITY_LEVELS:
+                logger.warning("Неверный приоритет %s=%s", key, value)
+                continue
+            if key in ("game_io", "background_io") and value not in IO_LEVELS:
+                logger.warning("Неверный приоритет ввода-вывода %s=%s", key, value)
+                continue
+            values[key] = value
+        return replace(policy, **values)
+
+
+def policy_for_game(settings: Dict[str, Dict[str, Any]], game_id: Optional[int], title: str) -> ResourcePolicy:
+    """Политика игры: "*" дополняется записью по подстроке названия, затем по ID"""
+    settings = settings or {}
+    policy = ResourcePolicy.from_dict(settings.get("*", {}))
+    title = (title or "").lower()
+    for key, values in settings.items():
+        if key != "*" and not key.isdigit() and key.lower() in title:
+            policy = ResourcePolicy.from_dict(values, policy)
+    if game_id is not None and str(game_id) in settings:
+        policy = ResourcePolicy.from_dict(settings[str(game_id)], policy)
+    return policy
+
+
+class PriorityBackend:
+    """Чтение и изменение приоритетов процесса на конкретной ОС"""
+
+    def snapshot(self, process: psutil.Process) -> Dict[str, Any]:
+        """Текущие приоритет, приоритет ввода-вывода и привязка к ядрам"""
+        state = {}
+        for key, getter in (("nice", process.nice), ("ionice", process.ionice),
+                            ("affinity", getattr(process, 'cpu_affinity', None))):
+            if getter is None:
+                continue
+            try:
+                value = getter()
+                # ionice на Linux возвращает namedtuple (класс, значение)
+                state[key] = tuple(value) if key == "ionice" and isinstance(value, tuple) else value
+            except (psutil.AccessDenied, psutil.NoSuchProcess, OSError, NotImplementedError):
+                pass
+        return state
+
+    def restore(self, process: psutil.Process, state: Dict[str, Any]):
+        if "nice" in state:
+            self._call(process.nice, state["nice"])
+        if "ionice" in state:
+            value = state["ionice"]
+            if isinstance(value, tuple):
+                self._call(process.ionice, *value)
+            else:
+                self._call(process.ionice, value)
+        if "affinity" in state:
+            self._call(process.cpu_affinity, state["affinity"])
+
+    def set_priority(self, process: psutil.Process, level: str) -> bool:
+        raise NotImplementedError
+
+    def set_io_priority(self, process: psutil.Process, level: str) -> bool:
+        raise NotImplementedError
+
+    def set_affinity(self, process: psutil.Process, cpus: List[int]) -> bool:
+        if not hasattr(process, 'cpu_affinity'):
+            return False
+        return self._call(process.cpu_affinity, cpus)
+
+    @staticmethod
+    def _call(func, *args) -> bool:
+        try:
+            func(*args)
+            return True
+        except (psutil.AccessDenied, psutil.NoSuchProcess, OSError, ValueError) as e:
+            logger.debug("Не удалось изменить параметры процесса: %s", e)
+            return False
+
+
+class WindowsPriorityBackend(PriorityBackend):
+    """Классы приоритета и приоритет ввода-вывода Windows"""
+
+    PRIORITY = {
+        "idle": "IDLE_PRIORITY_CLASS",
+        "below_normal": "BELOW_NORMAL_PRIORITY_CLASS",
+        "normal": "NORMAL_PRIORITY_CLASS",
+        "above_normal": "ABOVE_NORMAL_PRIORITY_CLASS",
+        "high": "HIGH_PRIORITY_CLASS",
+    }
+    IO = {"low": "IOPRIO_LOW", "normal": "IOPRIO_NORMAL", "high": "IOPRIO_HIGH"}
+
+    def set_priority(self, process, level):
+        return self._call(process.nice, getattr(psutil, self.PRIORITY[level]))
+
+    def set_io_priority(self, process, level):
+        return self._call(process.ionice, getattr(psutil, self.IO[level]))
+
+
+class LinuxPriorityBackend(PriorityBackend):
+    """nice, ionice и sched_setaffinity (через psutil)
+
+    Повышение приоритета (отрицательный nice) требует CAP_SYS_NICE; без него
+    игра остается с прежним приоритетом, а фоновые процессы все равно понижаются
+    (но и вернуть им исходный nice при восстановлении без этих прав нельзя).
+    """
+
+    NICE = {"idle": 19, "below_normal": 10, "normal": 0, "above_normal": -5, "high": -10}
+
+    def set_priority(self, process, level):
+        return self._call(process.nice, self.NICE[level])
+
+    def set_io_priority(self, process, level):
+        if level == "low":
+            return self._call(process.ionice, psutil.IOPRIO_CLASS_IDLE)
+        # Класс best-effort: 0 - наивысший уровень, 4 - по умолчанию
+        return self._call(process.ionice, psutil.IOPRIO_CLASS_BE, 0 if level == "high" else 4)
+
+
+def create_priority_backend() -> Optional[PriorityBackend]:
+    if sys.platform == 'win32':
+        return WindowsPriorityBackend()
+    if sys.platform.startswith('linux'):
+        return LinuxPriorityBackend()
+    return None
+
+
+class ResourceGovernor:
+    """Приоритеты процессов на время сессии
+
+    apply запоминает исходное состояние каждого измененного процесса и
+    периодически подхватывает новые фоновые процессы (steamwebhelper
+    перезапускается во время игры); restore возвращает все как было.
+
+    Args:
+        backend: Работа с приоритетами ОС (по умолчанию - для текущей ОС)
+        refresh_interval: Как часто искать новые фоновые процессы, секунд
+        cpu_count: Число логических ядер (по умолчанию - из psutil)
+    """
+
+    def __init__(self, backend: Optional[PriorityBackend] = None, refresh_interval: float = 30.0,
+                 cpu_count: Optional[int] = None):
+        self.backend = backend or create_priority_backend()
+        self.refresh_interval = refresh_interval
+        self.cpu_count = cpu_count or psutil.cpu_count() or 1
+        self._lock = threading.Lock()
+        # PID -> (время создания процесса, исходное состояние)
+        self._saved: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self._game: Optional[psutil.Process] = None
+        self._policy: Optional[ResourcePolicy] = None
+        self._extra_pids: Tuple[int, ...] = ()
+        self._task = None
+        self.stats = {"game": 0, "background": 0, "failed": 0, "restored": 0}
+
+    @property
+    def active(self) -> bool:
+        return self._game is not None
+
+    def _split_cores(self, policy: ResourcePolicy) -> Tuple[Optional[List[int]], Optional[List[int]]]:
+        """(ядра игры, ядра фоновых процессов); None - привязку не менять"""
+        reserve = policy.reserve_cores
+        # На двух ядрах отдавать одно фоновым процессам дороже, чем делить оба
+        if reserve <= 0 or self.cpu_count - reserve < 2:
+            return None, None
+        cores = list(range(self.cpu_count))
+        game_cores = cores[:-reserve] if policy.pin_game else None
+        return game_cores, cores[-reserve:]
+
+    def _remember(self, process: psutil.Process) -> bool:
+        """Сохраняет исходное состояние; False - процесс уже под управлением"""
+        try:
+            key = process.create_time()
+        except (psutil.Error, AttributeError):
+            return False
+        saved = self._saved.get(process.pid)
+        if saved and saved[0] == key:
+            return False
+        self._saved[process.pid] = (key, self.backend.snapshot(process))
+        return True
+
+    def _game_tree(self) -> set:
+        pids = {self._game.pid}
+        try:
+            pids.update(child.pid for child in self._game.children(recursive=True))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        return pids
+
+    def _background_processes(self, policy: ResourcePolicy) -> List[psutil.Process]:
+        """Наше приложение с дочерними процессами (мониторинг) и фоновые процессы лаунчера"""
+        excluded = self._game_tree()
+        found: Dict[int, psutil.Process] = {}
+        try:
+            own = psutil.Process(os.getpid())
+            found[own.pid] = own
+            for child in own.children(recursive=True):
+                found[child.pid] = child
+        except psutil.Error:
+            pass
+        for pid in self._extra_pids:
+            try:
+                found[pid] = psutil.Process(pid)
+            except psutil.Error:
+                pass
+
+        names = {name.lower() for name in policy.background_processes}
+        if names:
+            with timed("process_scan.background"):
+                for process in psutil.process_iter(['name']):
+                    name = (process.info.get('name') or '').lower()
+                    if name in names:
+                        found[process.pid] = process
+        return [process for pid, process in found.items() if pid not in excluded]
+
+    def _apply_background(self, policy: ResourcePolicy, background_cores: Optional[List[int]]):
+        for process in self._background_processes(policy):
+            if not self._remember(process):
+                continue
+            ok = self.backend.set_priority(process, policy.background_priority)
+            ok = self.backend.set_io_priority(process, policy.background_io) and ok
+            if background_cores:
+                ok = self.backend.set_affinity(process, background_cores) and ok
+            self.stats["background" if ok else "failed"] += 1
+
+    def apply(self, game_process: psutil.Process, policy: Optional[ResourcePolicy] = None,
+              extra_pids: Iterable[int] = ()):
+        """Включает игровой режим для процесса игры"""
+        policy = policy or ResourcePolicy()
+        if not policy.enabled or self.backend is None:
+            return
+        with self._lock:
+            # Повторный apply без restore: прежняя периодическая задача больше не нужна
+            self._cancel_refresh_locked()
+            if self._game is not None:
+                self._restore_locked()
+            self._game = game_process
+            self._policy = policy
+            self._extra_pids = tuple(extra_pids)
+            game_cores, background_cores = self._split_cores(policy)
+
+            if self._remember(game_process):
+                ok = self.backend.set_priority(game_process, policy.game_priority)
+                ok = self.backend.set_io_priority(game_process, policy.game_io) and ok
+                if game_cores:
+                    ok = self.backend.set_affinity(game_process, game_cores) and ok
+                self.stats["game" if ok else "failed"] += 1
+                if not ok:
+                    logger.warning("Не удалось полностью повысить приоритет игры (нужны права администратора?)")
+
+            self._apply_background(policy, background_cores)
+            logger.info("Игровой режим: игра PID %s, ядра игры %s, фоновых процессов %s, ядра фоновых %s",
+                        game_process.pid, game_cores or 'все', self.stats['background'], background_cores or 'все')
+
+            if self.refresh_interval:
+                self._task = get_scheduler().call_every(self.refresh_interval, self._refresh,
+                                                        name="resource-governor")
+
+    def _refresh(self):
+        """Подхватывает фоновые процессы, запущенные после apply"""
+        with self._lock:
+            if self._game is None:
+                return
+            try:
+                if not self._game.is_running():
+                    return
+            except psutil.Error:
+                return
+            self._apply_background(self._policy, self._split_cores(self._policy)[1])
+
+    def restore(self):
+        """Возвращает исходные приоритеты и привязку к ядрам"""
+        with self._lock:
+            self._cancel_refresh_locked()
+            self._restore_locked()
+
+    def _cancel_refresh_locked(self):
+        if self._task is not None:
+            get_scheduler().cancel(self._task)
+            self._task = None
+
+    def _restore_locked(self):
+        for pid, (create_time, state) in self._saved.items():
+            try:
+                process = psutil.Process(pid)
+                # PID мог достаться новому процессу
+                if process.create_time() != create_time:
+                    continue
+            except psutil.Error:
+                continue
+            self.backend.restore(process, state)
+            self.stats["restored"] += 1
+        if self._saved:
+            logger.info("Игровой режим выключен, восстановлено процессов: %s", self.stats['restored'])
+        self._saved.clear()
+        self._game = None
+        self._policy = None
@@ -0,0 +1,244 @@
+"""
+Единый планировщик задач
+Заменяет разрозненные циклы со sleep, таймеры и отдельные потоки:
+одна куча дедлайнов, один поток-диспетчер и общий пул воркеров.
+Долгие разовые задачи (запуск игры, прогрев, загрузка каталога) идут
+в отдельный пул get_job_scheduler(), чтобы не занимать воркеры
+периодических проверок
+"""
+import logging
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from typing import Optional, Callable, Dict, List, Any
+
+
+logger = logging.getLogger(__name__)
+
+class ScheduledTask:
+    """Дескриптор запланированной задачи (разовой или периодической)"""
+
+    __slots__ = ('name', 'func', 'args', 'interval', 'jitter', 'deadline',
+                 'cancelled', 'running', 'runs')
+
+    def __init__(self, name: str, func: Callable, args: tuple, deadline: float,
+                 interval: Optional[float] = None, jitter: float = 0.0):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.interval = interval
+        self.jitter = jitter
+        self.deadline = deadline
+        self.cancelled = False
+        self.running = False
+        self.runs = 0
+
+    @property
+    def periodic(self) -> bool:
+        return self.interval is not None
+
+    def cancel(self):
+        """Отменяет задачу; уже выполняющийся запуск доработает до конца"""
+        self.cancelled = True
+
+
+class Scheduler:
+    """Планировщик на основе кучи дедлайнов
+
+    Поток-диспетчер спит до ближайшего дедлайна (а не просыпается по таймеру),
+    поэтому в простое приложение не тратит процессор. Сами задачи выполняются
+    в общем пуле потоков, чтобы долгий сетевой запрос не задерживал остальные.
+    """
+
+    def __init__(self, max_workers: int = 4, name: str = "scheduler"):
+        self.name = name
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        # Воркеры - daemon-потоки, как и прежние потоки запуска: незавершенный
+        # запуск игры не должен задерживать выход из приложения
+        self._queue: "queue.Queue[Optional[ScheduledTask]]" = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"{name}-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        self._stopped = False
+        # Статистика опоздания по имени задачи: [запуски, максимум, сумма]
+        self._lateness: Dict[str, List[float]] = {}
+        self._thread = threading.Thread(target=self._run, name=f"{name}-dispatch", daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay: float, func: Callable, *args, name: Optional[str] = None) -> ScheduledTask:
+        """Выполняет функцию однократно через delay секунд"""
+        task = ScheduledTask(name or getattr(func, '__name__', 'task'), func, args,
+                             time.monotonic() + max(0.0, delay))
+        self._push(task)
+        return task
+
+    def call_at(self, deadline: float, func: Callable, *args, name: Optional[str] = None) -> ScheduledTask:
+        """Выполняет функцию однократно в момент deadline (по time.monotonic())"""
+        task = ScheduledTask(name or getattr(func, '__name__', 'task'), func, args, deadline)
+        self._push(task)
+        return task
+
+    def call_every(self, interval: float, func: Callable, *args, jitter: float = 0.1,
+                   initial_delay: Optional[float] = None, name: Optional[str] = None) -> ScheduledTask:
+        """Выполняет функцию периодически
+
+        Args:
+            interval: Период в секундах
+            jitter: Доля периода для случайного разброса (0.1 = ±10%),
+                чтобы запросы с разных ПК клуба не совпадали по времени
+            initial_delay: Задержка первого запуска (по умолчанию - один период)
+        """
+        task = ScheduledTask(name or getattr(func, '__name__', 'task'), func, args, 0.0,
+                             interval=interval, jitter=jitter)
+        first = interval if initial_delay is None else initial_delay
+        task.deadline = time.monotonic() + self._jittered(task, first)
+        self._push(task)
+        return task
+
+    def submit(self, func: Callable, *args, name: Optional[str] = None) -> ScheduledTask:
+        """Выполняет функцию в пуле как можно скорее (замена отдельным потокам)"""
+        return self.call_later(0, func, *args, name=name)
+
+    def cancel(self, task: Optional[ScheduledTask]):
+        """Отменяет задачу"""
+        if task is None:
+            return
+        task.cancel()
+        with self._cond:
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает статистику опоздания задач (в миллисекундах)"""
+        with self._cond:
+            items = [(name, list(values)) for name, values in self._lateness.items()]
+        return {
+            name: {
+                "runs": int(runs),
+                "max_lateness_ms": max_lateness * 1000,
+                "avg_lateness_ms": total / runs * 1000 if runs else 0.0,
+            }
+            for name, (runs, max_lateness, total) in items
+        }
+
+    def shutdown(self, wait: bool = False, timeout: Optional[float] = None):
+        """Останавливает диспетчер и пул воркеров"""
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify()
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self._workers:
+                if worker is not threading.current_thread():
+                    worker.join(timeout)
+
+    def _jittered(self, task: ScheduledTask, delay: float) -> float:
+        if task.jitter <= 0:
+            return delay
+        spread = delay * task.jitter
+        return max(0.0, delay + random.uniform(-spread, spread))
+
+    def _push(self, task: ScheduledTask):
+        with self._cond:
+            if self._stopped:
+                task.cancelled = True
+                return
+            heapq.heappush(self._heap, (task.deadline, next(self._counter), task))
+            # Будим диспетчер, только если новая задача стала ближайшей
+            if self._heap[0][2] is task:
+                self._cond.notify()
+
+    def _run(self):
+        """Цикл диспетчера: спит до ближайшего дедлайна"""
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    # Выбрасываем отмененные задачи с вершины кучи
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, task = heapq.heappop(self._heap)
+
+                lateness = max(0.0, time.monotonic() - task.deadline)
+                record = self._lateness.setdefault(task.name, [0, 0.0, 0.0])
+                record[0] += 1
+                record[1] = max(record[1], lateness)
+                record[2] += lateness
+
+            self._queue.put(task)
+
+    def _worker(self):
+        """Цикл воркера пула"""
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            self._execute(task)
+
+    def _execute(self, task: ScheduledTask):
+        """Выполняет задачу в воркере и перепланирует периодическую"""
+        if task.cancelled:
+            return
+        task.running = True
+        try:
+            task.func(*task.args)
+        except Exception as e:
+            logger.exception("Ошибка в задаче планировщика '%s': %s", task.name, e)
+        finally:
+            task.running = False
+            task.runs += 1
+
+        # Следующий запуск считаем от конца текущего, чтобы медленная задача
+        # не накапливала очередь из пропущенных запусков
+        if task.periodic and not task.cancelled:
+            task.deadline = time.monotonic() + self._jittered(task, task.interval)
+            self._push(task)
+
+
+# Воркеры пула долгих задач: запуск игры, прогрев, проверка аренды, загрузка
+# каталога и поиск лаунчеров могут выполняться одновременно
+JOB_WORKERS = 8
+
+_default_scheduler: Optional[Scheduler] = None
+_job_scheduler: Optional[Scheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Возвращает общий планировщик процесса"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = Scheduler()
+        return _default_scheduler
+
+
+def get_job_scheduler() -> Scheduler:
+    """Возвращает пул долгих разовых задач процесса
+
+    Задачи, которые блокируются на минуты (сетевые повторы, ожидание лаунчера,
+    дросселированное чтение), выполняются здесь, а общий планировщик остается
+    для коротких периодических проверок
+    """
+    global _job_scheduler
+    with _default_lock:
+        if _job_scheduler is None:
+            _job_scheduler = Scheduler(max_workers=JOB_WORKERS, name="jobs")
+        return _job_scheduler
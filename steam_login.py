@@ -0,0 +1,180 @@
+"""
+Стратегии входа в Steam
+Быстрый путь передает логин и пароль Steam параметрами запуска (-login),
+и клиент сразу показывает запрос кода 2FA. Прежний путь с вводом в окно
+остается запасным. Порядок стратегий выбирается для каждого аккаунта по
+измеренной доле успешных входов
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Sequence
+
+from input_backend import fields_sequence
+
+logger = logging.getLogger(__name__)
+
+
+class LoginStrategy:
+    """Интерфейс стратегии входа
+
+    После успешного login() Steam должен ожидать код 2FA. Все ожидания идут
+    через manager._wait, чтобы стенд с фейковым Steam мог подменить часы.
+    """
+
+    name = "base"
+
+    def login(self, manager, username: str, password: str):
+        raise NotImplementedError
+
+
+class GuiLoginStrategy(LoginStrategy):
+    """Перезапуск Steam и ввод логина и пароля в окно входа"""
+
+    name = "gui"
+
+    def __init__(self, window_timeout: float = 10):
+        self.window_timeout = window_timeout
+
+    def login(self, manager, username: str, password: str):
+        # Форма входа уже открыта (клиент не принял -login) - вводим в нее без перезапуска
+        steam_window = manager._find_steam_window()
+        if steam_window and manager.steam_prompt(steam_window) == "login":
+            manager._enter_into_steam(fields_sequence([username, password]), steam_window)
+            return
+
+        # Если Steam уже залогинен, выходим
+        if manager.is_steam_running():
+            manager.logout_from_steam()
+            manager._wait(3)
+
+        manager.spawn_steam()
+        manager._wait(5)  # Ждем запуска Steam
+
+        steam_window = manager.wait_for_steam_window(self.window_timeout)
+        if not steam_window:
+            raise Exception("Не удалось найти окно Steam")
+
+        manager._enter_into_steam(fields_sequence([username, password]), steam_window)
+
+
+class CommandLineLoginStrategy(LoginStrategy):
+    """Запуск Steam с учетными данными в параметрах (-login user pass)
+
+    Запущенный клиент параметры не примет, поэтому Steam закрывается.
+    Пароль виден в списке процессов, пока Steam запущен; без кода 2FA
+    его недостаточно для входа. Если клиент -login игнорирует и остается
+    на форме входа, login() бросает исключение, и вход в той же попытке
+    продолжает следующая стратегия (код 2FA не попадет в форму входа).
+    """
+
+    name = "command_line"
+
+    def __init__(self, window_timeout: float = 20, prompt_timeout: float = 5):
+        self.window_timeout = window_timeout
+        self.prompt_timeout = prompt_timeout
+
+    def login(self, manager, username: str, password: str):
+        if manager.is_steam_running():
+            manager.close_steam()
+
+        manager.spawn_steam(['-login', username, password])
+
+        # Окно появляется, когда клиент дошел до запроса кода
+        steam_window = manager.wait_for_steam_window(self.window_timeout)
+        if not steam_window:
+            raise Exception("Steam не показал окно после запуска с -login")
+
+        # Форма входа может мелькнуть, пока клиент проверяет логин и пароль
+        deadline = manager._now() + self.prompt_timeout
+        while manager.steam_prompt(steam_window) == "login":
+            if manager._now() >= deadline:
+                raise Exception("Steam остался на форме входа: параметр -login не принят")
+            manager._wait(1)
+            steam_window = manager._find_steam_window() or steam_window
+
+
+class LoginStrategySelector:
+    """Выбор стратегии входа по доле успешных входов аккаунта
+
+    Доля считается со сглаживанием (успехи + 1) / (попытки + 2), при
+    равенстве побеждает стратегия, указанная раньше. Каждый explore_every-й
+    вход аккаунта первой пробуется наименее опробованная стратегия, чтобы
+    быстрый путь проверялся снова после неудач. Статистика хранится в JSON,
+    аккаунты - в виде хэша логина.
+    """
+
+    def __init__(self, stats_file: Optional[Path] = None,
+                 strategies: Optional[Sequence[LoginStrategy]] = None, explore_every: int = 20):
+        self.stats_file = Path(stats_file) if stats_file else None
+        self.strategies: List[LoginStrategy] = list(strategies or (CommandLineLoginStrategy(), GuiLoginStrategy()))
+        self.explore_every = explore_every
+        self._lock = threading.Lock()
+        # хэш аккаунта -> стратегия -> {"success": n, "attempts": n, "seconds": сумма}
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        if not self.stats_file or not self.stats_file.exists():
+            return {}
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.error("Ошибка при загрузке статистики входа в Steam: %s", e)
+            return {}
+
+    def _save(self):
+        if not self.stats_file:
+            return
+        tmp_file = self.stats_file.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._stats, f)
+            os.replace(tmp_file, self.stats_file)
+        except Exception as e:
+            logger.error("Ошибка при сохранении статистики входа в Steam: %s", e)
+
+    @staticmethod
+    def _account_key(username: str) -> str:
+        return hashlib.sha256(username.lower().encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _success_rate(entry: Dict[str, float]) -> float:
+        return (entry.get("success", 0) + 1) / (entry.get("attempts", 0) + 2)
+
+    def order(self, username: str) -> List[LoginStrategy]:
+        """Стратегии в порядке попыток для аккаунта"""
+        with self._lock:
+            account = self._stats.get(self._account_key(username), {})
+            total = sum(entry.get("attempts", 0) for entry in account.values())
+            positions = {strategy.name: index for index, strategy in enumerate(self.strategies)}
+
+            if self.explore_every and total and total % self.explore_every == 0:
+                def key(strategy):
+                    return (account.get(strategy.name, {}).get("attempts", 0), positions[strategy.name])
+            else:
+                def key(strategy):
+                    return (-self._success_rate(account.get(strategy.name, {})), positions[strategy.name])
+
+            return sorted(self.strategies, key=key)
+
+    def record(self, username: str, strategy_name: str, success: bool, seconds: float):
+        """Учитывает результат входа"""
+        with self._lock:
+            account = self._stats.setdefault(self._account_key(username), {})
+            entry = account.setdefault(strategy_name, {"success": 0, "attempts": 0, "seconds": 0.0})
+            entry["attempts"] += 1
+            entry["success"] += 1 if success else 0
+            entry["seconds"] = round(entry["seconds"] + seconds, 3)
+            self._save()
+        logger.info("Вход в Steam (%s): %s за %.1f с", strategy_name, 'успешно' if success else 'неудачно', seconds)
+
+    def stats(self, username: str) -> Dict[str, Dict[str, float]]:
+        """Статистика стратегий аккаунта"""
+        with self._lock:
+            account = self._stats.get(self._account_key(username), {})
+            return {name: dict(entry) for name, entry in account.items()}
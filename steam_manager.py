@@ -2,31 +2,60 @@
 Модуль для управления Steam процессами
 Блокирует доступ к Steam UI и управляет процессами
 """
+import logging
 import os
 import time
 import subprocess
 import psutil
+from typing import Optional, List, Callable
+
+from launch_state import LaunchCancelled
+from input_backend import InputBackend, InputTargetError, create_input_backend, fields_sequence
+from steam_login import LoginStrategySelector
+from profiler import timed
+from window_policy import WindowPolicyEnforcer, WindowPlatform, STEAM_RULES, create_window_platform
+
+logger = logging.getLogger(__name__)
+
 try:
     import win32gui
     import win32con
     import win32process
 except ImportError:
-    print("Предупреждение: pywin32 не установлен. Некоторые функции могут не работать.")
+    logger.warning("pywin32 не установлен. Некоторые функции могут не работать.")
     win32gui = None
     win32con = None
     win32process = None
-from typing import Optional, List
-import pyautogui
+
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+# Заголовки окон Steam (подстроки, без учета регистра): форма входа и запрос кода Steam Guard
+STEAM_LOGIN_TITLES = ("sign in", "login", "вход")
+STEAM_TWO_FACTOR_TITLES = ("steam guard",)
+
 
 class SteamManager:
     """Класс для управления Steam"""
     
-    def __init__(self, steam_path: str):
+    def __init__(self, steam_path: str, input_backend: Optional[InputBackend] = None,
+                 login_selector: Optional[LoginStrategySelector] = None,
+                 window_platform: Optional[WindowPlatform] = None):
         self.steam_path = steam_path
+        self.input_backend = input_backend or create_input_backend()
+        self.login_selector = login_selector or LoginStrategySelector()
+        # (логин, стратегия, время начала) входа, ожидающего подтверждения
+        self._pending_login: Optional[tuple] = None
         self.steam_process: Optional[psutil.Process] = None
         self.game_process: Optional[psutil.Process] = None
-        self.steam_windows: List[int] = []
+        self.window_platform = window_platform
+        self.window_policy: Optional[WindowPolicyEnforcer] = None
+        # Пауза вместо time.sleep (плагин ставит паузу, прерываемую отменой запуска)
+        self.wait_hook: Optional[Callable[[float], None]] = None
     
+    @timed("process_scan.steam_running")
     def is_steam_running(self) -> bool:
         """Проверяет, запущен ли Steam"""
         for proc in psutil.process_iter(['pid', 'name']):
@@ -40,80 +69,129 @@ class SteamManager:
     def start_steam(self):
         """Запускает Steam"""
         if self.is_steam_running():
-            print("Steam уже запущен")
+            logger.info("Steam уже запущен")
             return
         
         if not os.path.exists(self.steam_path):
             raise FileNotFoundError(f"Steam не найден по пути: {self.steam_path}")
         
         subprocess.Popen([self.steam_path], shell=True)
-        time.sleep(5)  # Ждем запуска Steam
+        self._wait(5)  # Ждем запуска Steam
     
-    def login_to_steam(self, username: str, password: str, two_factor_code: str = None):
-        """Автоматически входит в Steam"""
-        # Если Steam уже залогинен, выходим
-        if self.is_steam_running():
-            self.logout_from_steam()
-            time.sleep(3)
-        
-        # Запускаем Steam
-        subprocess.Popen([self.steam_path], shell=True)
-        time.sleep(5)  # Ждем запуска Steam
-        
-        # Ищем окно Steam
-        steam_window = None
-        for _ in range(10):  # Пытаемся найти окно в течение 10 секунд
+    def spawn_steam(self, args: Optional[List[str]] = None):
+        """Запускает процесс Steam с параметрами"""
+        if not args:
+            subprocess.Popen([self.steam_path], shell=True)
+            return
+        # Без shell: спецсимволы в пароле не должны разбираться оболочкой
+        subprocess.Popen([self.steam_path, *args])
+    
+    def wait_for_steam_window(self, timeout: float) -> Optional[int]:
+        """Ждет появления окна Steam не дольше timeout секунд"""
+        deadline = self._now() + timeout
+        while True:
             steam_window = self._find_steam_window()
-            if steam_window:
-                break
-            time.sleep(1)
-        
-        if not steam_window:
-            raise Exception("Не удалось найти окно Steam")
-        
-        # Активируем окно Steam
-        if win32gui and win32con:
+            if steam_window or self._now() >= deadline:
+                return steam_window
+            self._wait(1)
+    
+    def _wait(self, seconds: float):
+        if self.wait_hook:
+            self.wait_hook(seconds)
+        else:
+            time.sleep(seconds)
+    
+    def _now(self) -> float:
+        return time.monotonic()
+    
+    def login_to_steam(self, username: str, password: str, two_factor_code: str = None):
+        """Автоматически входит в Steam
+
+        Стратегии пробуются в порядке, выбранном по статистике аккаунта;
+        после ввода кода 2FA результат нужно подтвердить через finish_login().
+        """
+        last_error = None
+        for strategy in self.login_selector.order(username):
+            started = self._now()
             try:
-                win32gui.SetForegroundWindow(steam_window)
-                win32gui.ShowWindow(steam_window, win32con.SW_RESTORE)
-                time.sleep(1)
-            except:
-                pass
-        
-        # Шаг 1: Вводим логин
-        time.sleep(1)
-        pyautogui.write(username, interval=0.05)
-        time.sleep(0.5)
-        
-        # Переходим к полю пароля (Tab)
-        pyautogui.press('tab')
-        time.sleep(0.5)
-        
-        # Шаг 2: Вводим пароль
-        pyautogui.write(password, interval=0.05)
-        time.sleep(0.5)
+                logger.info("Вход в Steam: стратегия %s", strategy.name)
+                strategy.login(self, username, password)
+            except LaunchCancelled:
+                # Отмена - не неудача стратегии, следующую пробовать не нужно
+                raise
+            except Exception as e:
+                logger.warning("Стратегия входа %s не сработала: %s", strategy.name, e)
+                self.login_selector.record(username, strategy.name, False, self._now() - started)
+                last_error = e
+                continue
+            self._pending_login = (username, strategy.name, started)
+            break
+        else:
+            raise last_error or Exception("Нет доступных стратегий входа в Steam")
         
-        # Шаг 3: Нажимаем кнопку "Войти" (Enter)
-        pyautogui.press('enter')
-        time.sleep(3)  # Ждем обработки логина/пароля
+        self._wait(3)  # Ждем обработки логина/пароля
         
-        # Шаг 4: Если требуется код 2FA, вводим его
+        # Если код 2FA уже известен, вводим его
         # Steam покажет окно запроса 2FA после проверки логина/пароля
         if two_factor_code:
             # Ждем появления окна запроса 2FA
-            time.sleep(3)
-            
-            # Очищаем поле ввода (на случай если там что-то есть)
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(0.2)
-            
-            # Вводим код 2FA
-            pyautogui.write(two_factor_code, interval=0.1)
-            time.sleep(0.5)
-            
-            # Подтверждаем ввод кода
-            pyautogui.press('enter')
-            time.sleep(5)  # Ждем завершения входа
+            self._wait(3)
+            self.enter_two_factor_code(two_factor_code)
+            self.finish_login()
+    
+    def is_logged_in(self) -> Optional[bool]:
+        """Вошел ли Steam в аккаунт (None - определить нельзя)"""
+        if not winreg:
+            return None
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Valve\Steam\ActiveProcess") as key:
+                active_user, _ = winreg.QueryValueEx(key, "ActiveUser")
+            return bool(active_user)
+        except OSError:
+            return None
+    
+    def finish_login(self, timeout: float = 10) -> bool:
+        """Ждет завершения входа после кода 2FA и учитывает результат стратегии"""
+        logged_in = None
+        deadline = self._now() + timeout
+        while self._now() < deadline:
+            logged_in = self.is_logged_in()
+            if logged_in is None or logged_in:
+                break
+            self._wait(0.5)
+        if logged_in is None:
+            # Проверить нельзя - ждем как раньше и считаем вход успешным
+            self._wait(timeout)
+            logged_in = True
+        
+        if self._pending_login:
+            username, strategy_name, started = self._pending_login
+            self._pending_login = None
+            self.login_selector.record(username, strategy_name, logged_in, self._now() - started)
+        return logged_in
+    
+    def enter_two_factor_code(self, two_factor_code: str):
+        """Вводит код 2FA в окно Steam (поле очищается перед вводом)"""
+        self._enter_into_steam(fields_sequence([two_factor_code]))
+    
+    def _enter_into_steam(self, actions, steam_window: Optional[int] = None, attempts: int = 3):
+        """Вводит последовательность в окно Steam, повторяя при потере фокуса"""
+        for attempt in range(attempts):
+            if steam_window is None:
+                steam_window = self._find_steam_window()
+                # Без pywin32 окно не найти - ввод идет в активное окно
+                if not steam_window and win32gui:
+                    raise Exception("Не удалось найти окно Steam")
+            try:
+                self.input_backend.enter(steam_window, actions)
+                return
+            except InputTargetError as e:
+                logger.warning("Ввод в окно Steam не удался (попытка %s): %s", attempt + 1, e)
+                if attempt == attempts - 1:
+                    raise
+                # Окно могло смениться (логин -> запрос 2FA) - ищем заново
+                steam_window = None
+                self._wait(0.5)
     
     def launch_game(self, game_id: int):
         """Запускает игру через Steam"""
@@ -125,8 +203,24 @@ class SteamManager:
             str(game_id)
         ], shell=True)
         
-        time.sleep(5)
+        self._wait(5)
+    
+    def steam_prompt(self, hwnd: int) -> Optional[str]:
+        """Что показывает окно Steam: "login" - форма входа, "two_factor" - запрос кода,
+        None - определить нельзя"""
+        if not win32gui:
+            return None
+        try:
+            title = win32gui.GetWindowText(hwnd).lower()
+        except Exception:
+            return None
+        if any(part in title for part in STEAM_TWO_FACTOR_TITLES):
+            return "two_factor"
+        if any(part in title for part in STEAM_LOGIN_TITLES):
+            return "login"
+        return None
     
+    @timed("windows.find_steam")
     def _find_steam_window(self) -> Optional[int]:
         """Находит окно Steam"""
         if not win32gui:
@@ -143,46 +237,27 @@ class SteamManager:
         return windows[0] if windows else None
     
     def block_steam_ui(self):
-        """Блокирует доступ к Steam UI, скрывая окна"""
-        if not win32gui or not win32con:
-            print("Предупреждение: pywin32 не установлен, блокировка UI недоступна")
+        """Блокирует доступ к Steam UI, скрывая окна
+
+        Скрывает уже открытые окна Steam и все, что Steam откроет позже
+        (друзья, всплывающие окна магазина), до вызова unblock_steam_ui().
+        """
+        if self.window_policy and self.window_policy.running:
             return
         
-        def enum_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_title = win32gui.GetWindowText(hwnd)
-                class_name = win32gui.GetClassName(hwnd)
-                
-                # Ищем окна Steam
-                if 'steam' in window_title.lower() or 'steam' in class_name.lower():
-                    windows.append(hwnd)
-        
-        windows = []
-        win32gui.EnumWindows(enum_callback, windows)
+        platform = self.window_platform or create_window_platform()
+        if platform is None:
+            logger.warning("pywin32 не установлен, блокировка UI недоступна")
+            return
         
-        for hwnd in windows:
-            try:
-                # Минимизируем окно
-                win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-                # Скрываем окно
-                win32gui.ShowWindow(hwnd, win32con.SW_HIDE)
-                self.steam_windows.append(hwnd)
-            except Exception as e:
-                print(f"Ошибка при скрытии окна Steam: {e}")
+        self.window_policy = WindowPolicyEnforcer(platform, STEAM_RULES)
+        self.window_policy.start()
     
     def unblock_steam_ui(self):
         """Разблокирует доступ к Steam UI"""
-        if not win32gui or not win32con:
-            return
-        
-        for hwnd in self.steam_windows:
-            try:
-                win32gui.ShowWindow(hwnd, win32con.SW_SHOW)
-                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-            except Exception as e:
-                print(f"Ошибка при показе окна Steam: {e}")
-        
-        self.steam_windows.clear()
+        if self.window_policy:
+            self.window_policy.stop(restore=True)
+            self.window_policy = None
     
     def logout_from_steam(self):
         """Выходит из Steam аккаунта"""
@@ -195,24 +270,27 @@ class SteamManager:
         self.unblock_steam_ui()
         
         # Закрываем все процессы Steam
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if proc.info['name'] and 'steam' in proc.info['name'].lower():
-                    proc.terminate()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        with timed("process_scan.close_steam"):
+            for proc in psutil.process_iter(['pid', 'name']):
+                try:
+                    if proc.info['name'] and 'steam' in proc.info['name'].lower():
+                        proc.terminate()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
         
         # Ждем завершения процессов
         time.sleep(2)
         
         # Принудительно закрываем, если не закрылись
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if proc.info['name'] and 'steam' in proc.info['name'].lower():
-                    proc.kill()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        with timed("process_scan.close_steam"):
+            for proc in psutil.process_iter(['pid', 'name']):
+                try:
+                    if proc.info['name'] and 'steam' in proc.info['name'].lower():
+                        proc.kill()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
     
+    @timed("process_scan.find_game")
     def find_game_process(self, game_name: str) -> Optional[psutil.Process]:
         """Находит процесс игры"""
         for proc in psutil.process_iter(['pid', 'name']):
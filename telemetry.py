@@ -0,0 +1,222 @@
+"""
+Телеметрия игровой сессии
+Периодически снимает загрузку CPU, резидентную память, скорость чтения и
+записи и число потоков дерева процессов игры. Замеры хранятся в кольцевом
+буфере на массивах (по массиву на поле, без словаря на замер). При завершении
+сессии считается сводка p50/p95/max - по ней видно места с перегревом
+(падение CPU при той же игре) или медленным диском.
+"""
+import logging
+import time
+from array import array
+from typing import Optional, Dict, List, Sequence
+
+import psutil
+
+from scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Поля замера: процент CPU всей машины, резидентная память (байт),
+# чтение и запись (байт в секунду), потоки, процессы в дереве игры
+SAMPLE_FIELDS = ("cpu", "rss", "read_bps", "write_bps", "threads", "processes")
+
+
+class RingBuffer:
+    """Кольцевой буфер замеров фиксированного размера
+
+    Каждое поле хранится в array('d') на capacity элементов; запись замера
+    не создает объектов, кроме самих чисел.
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str] = SAMPLE_FIELDS):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._columns = [array('d', bytes(8 * capacity)) for _ in self.fields]
+        self._next = 0
+        self.count = 0
+
+    def append(self, *values: float):
+        index = self._next
+        for column, value in zip(self._columns, values):
+            column[index] = value
+        self._next = (index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def column(self, name: str) -> List[float]:
+        """Значения поля от старых к новым"""
+        column = self._columns[self.fields.index(name)]
+        if self.count < self.capacity:
+            return column[:self.count].tolist()
+        return column[self._next:].tolist() + column[:self._next].tolist()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class SessionSampler:
+    """Замеры дерева процессов игры на время сессии
+
+    Собственные затраты (процессорное время замеров) учитываются; если они
+    превышают overhead_budget от времени сессии, интервал удваивается, но не
+    больше max_interval.
+
+    Args:
+        process: Процесс игры
+        interval: Интервал замеров, секунд
+        capacity: Размер буфера (по умолчанию - час при интервале 5 с)
+        children_every: Раз в сколько замеров заново искать дочерние процессы
+        overhead_budget: Допустимая доля CPU одного ядра на замеры
+    """
+
+    def __init__(self, process: psutil.Process, interval: float = 5.0, capacity: int = 720,
+                 children_every: int = 6, overhead_budget: float = 0.005, max_interval: float = 60.0):
+        self.process = process
+        self.interval = interval
+        self.max_interval = max_interval
+        self.children_every = children_every
+        self.overhead_budget = overhead_budget
+        self.buffer = RingBuffer(capacity)
+        self.cpu_count = psutil.cpu_count() or 1
+        self._tree: List[psutil.Process] = []
+        self._samples = 0
+        # PID -> [время создания, CPU секунд, прочитано, записано] на прошлом замере;
+        # список процесса обновляется на месте и заводится только для нового процесса
+        self._state: Dict[int, list] = {}
+        self._previous_time: Optional[float] = None
+        self._task = None
+        self._stopped = False
+        self.started_at: Optional[float] = None
+        self.overhead_seconds = 0.0
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.sample()
+        self._schedule()
+
+    def _schedule(self):
+        self._task = get_scheduler().call_every(self.interval, self.sample, name="session-telemetry")
+
+    def stop(self):
+        self._stopped = True
+        self._cancel_task()
+
+    def _cancel_task(self):
+        if self._task is not None:
+            get_scheduler().cancel(self._task)
+            self._task = None
+
+    def _refresh_tree(self):
+        tree = [self.process]
+        try:
+            tree.extend(self.process.children(recursive=True))
+        except (psutil.Error, AttributeError):
+            pass
+        self._tree = tree
+        # Состояние завершившихся процессов больше не нужно
+        pids = {process.pid for process in tree}
+        for pid in [pid for pid in self._state if pid not in pids]:
+            del self._state[pid]
+
+    def sample(self):
+        """Один замер (вызывается из планировщика); сбой замера не прерывает сессию"""
+        try:
+            self._sample()
+        except Exception as e:
+            logger.warning("Ошибка замера телеметрии: %s", e, extra={"sample": True})
+
+    def _sample(self):
+        cpu_started = time.thread_time()
+        if self._samples % self.children_every == 0:
+            self._refresh_tree()
+        self._samples += 1
+
+        now = time.monotonic()
+        rss = 0.0
+        threads = 0
+        alive = 0
+        cpu_delta = read_delta = write_delta = 0.0
+        for process in self._tree:
+            try:
+                with process.oneshot():
+                    key = process.create_time()
+                    times = process.cpu_times()
+                    cpu = times.user + times.system
+                    rss += process.memory_info().rss
+                    threads += process.num_threads()
+                    try:
+                        io = process.io_counters()
+                        read, write = float(io.read_bytes), float(io.write_bytes)
+                    except (psutil.AccessDenied, AttributeError):
+                        read = write = 0.0
+            except (psutil.Error, OSError, AttributeError):
+                continue
+            alive += 1
+            state = self._state.get(process.pid)
+            if state is None:
+                self._state[process.pid] = [key, cpu, read, write]
+                continue
+            if state[0] == key:
+                cpu_delta += cpu - state[1]
+                read_delta += read - state[2]
+                write_delta += write - state[3]
+            state[0] = key
+            state[1] = cpu
+            state[2] = read
+            state[3] = write
+
+        elapsed = now - self._previous_time if self._previous_time is not None else 0.0
+        self._previous_time = now
+        if elapsed > 0 and alive:
+            self.buffer.append(
+                cpu_delta / elapsed / self.cpu_count * 100,
+                rss,
+                read_delta / elapsed,
+                write_delta / elapsed,
+                threads,
+                alive,
+            )
+
+        self.overhead_seconds += time.thread_time() - cpu_started
+        self._check_budget(now)
+
+    def _check_budget(self, now: float):
+        if self.started_at is None or self._stopped:
+            return
+        wall = now - self.started_at
+        if wall < 60 or self.interval >= self.max_interval:
+            return
+        if self.overhead_seconds / wall > self.overhead_budget:
+            self.interval = min(self.interval * 2, self.max_interval)
+            logger.info("Телеметрия: затраты выше %.1f%%, интервал увеличен до %.0f с",
+                        self.overhead_budget * 100, self.interval)
+            self._cancel_task()
+            if not self._stopped:
+                self._schedule()
+
+    def summary(self) -> Dict[str, object]:
+        """Сводка сессии: p50/p95/max по каждому полю и собственные затраты"""
+        result: Dict[str, object] = {
+            "samples": len(self.buffer),
+            "interval": self.interval,
+            "duration": round(time.monotonic() - self.started_at, 1) if self.started_at else 0.0,
+        }
+        if self.started_at:
+            wall = max(time.monotonic() - self.started_at, 1e-9)
+            result["overhead_pct"] = round(self.overhead_seconds / wall * 100, 4)
+        for name in self.buffer.fields:
+            values = sorted(self.buffer.column(name))
+            result[name] = {
+                "p50": round(_percentile(values, 0.5), 2),
+                "p95": round(_percentile(values, 0.95), 2),
+                "max": round(values[-1], 2) if values else 0.0,
+            }
+        return result
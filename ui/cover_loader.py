@@ -0,0 +1,210 @@
+"""
+Асинхронная загрузка обложек игр
+Загрузка и декодирование выполняются в пуле потоков (QImage потокобезопасен),
+в главном потоке готовые миниатюры превращаются в QPixmap и кладутся в LRU
+"""
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Optional, Iterable
+
+import requests
+from PyQt5.QtCore import (QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice,
+                          QSize, Qt, pyqtSignal)
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+
+from image_cache import DiskImageCache
+
+
+logger = logging.getLogger(__name__)
+
+class PixmapLRUCache:
+    """LRU кэш QPixmap, ограниченный суммарным объемом в байтах"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, QPixmap]" = OrderedDict()
+        self._total_bytes = 0
+
+    @staticmethod
+    def _cost(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, key: str) -> Optional[QPixmap]:
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key: str, pixmap: QPixmap):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._total_bytes -= self._cost(old)
+        self._items[key] = pixmap
+        self._total_bytes += self._cost(pixmap)
+        while self._total_bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self._total_bytes -= self._cost(evicted)
+
+    def clear(self):
+        self._items.clear()
+        self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+class _CoverSignals(QObject):
+    """Сигналы воркеров (живут в главном потоке, доставка через очередь)"""
+    loaded = pyqtSignal(str, QImage)
+    failed = pyqtSignal(str)
+
+
+class _CoverWorker(QRunnable):
+    """Воркер пула: забирает URL из очереди загрузчика, пока она не опустеет"""
+
+    def __init__(self, loader: 'CoverLoader'):
+        super().__init__()
+        self.loader = loader
+
+    def run(self):
+        while True:
+            url = self.loader._next_url()
+            if url is None:
+                return
+            self.loader._load(url)
+
+
+class CoverLoader(QObject):
+    """Загрузчик обложек с ограниченным параллелизмом
+
+    Очередь содержит только обложки видимых строк: при прокрутке она
+    заменяется целиком, поэтому ушедшие из вида строки не загружаются.
+    Сигнал cover_ready(url, pixmap) испускается в главном потоке.
+    """
+    cover_ready = pyqtSignal(str, QPixmap)
+
+    def __init__(self, disk_cache: DiskImageCache, thumbnail_size: QSize = QSize(48, 64),
+                 max_concurrency: int = 4, memory_bytes: int = 32 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.disk_cache = disk_cache
+        self.thumbnail_size = thumbnail_size
+        self.memory_cache = PixmapLRUCache(memory_bytes)
+        self.max_concurrency = max_concurrency
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_concurrency)
+        self._signals = _CoverSignals(self)
+        self._signals.loaded.connect(self._on_loaded)
+        self._signals.failed.connect(self._on_failed)
+
+        self._lock = threading.Lock()
+        self._queue: deque = deque()
+        self._in_flight = set()
+        self._workers = 0
+        self._failed = set()
+
+    def cached(self, url: str) -> Optional[QPixmap]:
+        """Возвращает обложку из памяти, если она уже загружена"""
+        return self.memory_cache.get(url)
+
+    def request(self, urls: Iterable[str]):
+        """Запрашивает обложки для видимых строк (заменяет прежнюю очередь)"""
+        queue = []
+        seen = set()
+        for url in urls:
+            if not url or url in seen or url in self._failed:
+                continue
+            seen.add(url)
+            pixmap = self.memory_cache.get(url)
+            if pixmap is not None:
+                self.cover_ready.emit(url, pixmap)
+                continue
+            queue.append(url)
+
+        with self._lock:
+            self._queue = deque(url for url in queue if url not in self._in_flight)
+            to_start = min(self.max_concurrency - self._workers, len(self._queue))
+            self._workers += max(0, to_start)
+
+        for _ in range(max(0, to_start)):
+            self._pool.start(_CoverWorker(self))
+
+    def clear(self):
+        """Сбрасывает очередь и кэш в памяти"""
+        with self._lock:
+            self._queue.clear()
+        self.memory_cache.clear()
+        self._failed.clear()
+
+    def _next_url(self) -> Optional[str]:
+        """Следующий URL для воркера; None - воркер завершается"""
+        with self._lock:
+            if self._queue:
+                url = self._queue.popleft()
+                self._in_flight.add(url)
+                return url
+            self._workers -= 1
+            return None
+
+    def _load(self, url: str):
+        """Загружает одну обложку: диск -> сеть (выполняется в воркере)"""
+        try:
+            data = self.disk_cache.get(url)
+            from_disk = data is not None
+            if not from_disk:
+                response = requests.get(url, timeout=15)
+                response.raise_for_status()
+                data = response.content
+
+            image = self._decode(data)
+            if image is None:
+                self._signals.failed.emit(url)
+                return
+
+            if not from_disk:
+                # На диск кладем уже уменьшенную миниатюру, а не оригинал
+                self.disk_cache.put(url, self._encode(image))
+
+            self._signals.loaded.emit(url, image)
+        except Exception as e:
+            logger.warning("Ошибка загрузки обложки %s: %s", url, e, extra={"sample": True})
+            self._signals.failed.emit(url)
+
+    def _decode(self, data: bytes) -> Optional[QImage]:
+        """Декодирует сразу в уменьшенном размере (JPEG декодируется с масштабом)"""
+        size = self.thumbnail_size
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        original = reader.size()
+        if original.isValid() and (original.width() > size.width() or original.height() > size.height()):
+            reader.setScaledSize(original.scaled(size, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return None
+        if image.width() > size.width() or image.height() > size.height():
+            image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return image
+
+    @staticmethod
+    def _encode(image: QImage) -> bytes:
+        array = QByteArray()
+        buffer = QBuffer(array)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "JPG", 85)
+        return bytes(array)
+
+    def _on_loaded(self, url: str, image: QImage):
+        with self._lock:
+            self._in_flight.discard(url)
+        pixmap = QPixmap.fromImage(image)
+        self.memory_cache.put(url, pixmap)
+        self.cover_ready.emit(url, pixmap)
+
+    def _on_failed(self, url: str):
+        with self._lock:
+            self._in_flight.discard(url)
+        self._failed.add(url)
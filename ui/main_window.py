@@ -1,91 +1,138 @@
 """
 Главное окно приложения
 """
+import logging
 import sys
-import threading
 import time
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QListWidget, QListWidgetItem,
-                             QMessageBox, QProgressBar, QMenuBar, QAction)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, QThread
-from PyQt5.QtGui import QPixmap, QIcon
+                             QMessageBox, QProgressBar, QMenuBar, QAction, QMenu,
+                             QSystemTrayIcon, QStyle)
+from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSignal, QObject
+from PyQt5.QtGui import QPixmap, QIcon, QPixmapCache
 from api_client import APIClient
+from catalog_cache import CatalogCache
+from footprint import FootprintReport, rss_bytes, trim_memory
 from game_launcher import GameLauncher
+from launch_state import LaunchBusyError, LaunchSnapshot, LAUNCH_STATES, IDLE, RENTING, LOGGING_IN, LAUNCHING, RUNNING, ENDING
 from config import Config
+from image_cache import DiskImageCache
+from launcher_discovery import LauncherDiscovery
+from models import Game, Rental
+from profiler import ProfilerControl
+from scheduler import get_job_scheduler, get_scheduler
 from ui.settings_dialog import SettingsDialog
+from ui.cover_loader import CoverLoader
+from ui.update_bus import UIUpdateBus
+from ui.update_queue import StatusText, RentalUpdate, Invoke
 
-class GameMonitorWorker(QObject):
-    """Воркер для мониторинга игры в отдельном потоке"""
-    game_closed = pyqtSignal()
-    status_updated = pyqtSignal(str)
-    
-    def __init__(self, game_launcher):
-        super().__init__()
-        self.game_launcher = game_launcher
-        self.running = False
-    
-    def start_monitoring(self):
-        """Начинает мониторинг"""
-        self.running = True
-    
-    def stop_monitoring(self):
-        """Останавливает мониторинг"""
-        self.running = False
-    
-    def monitor_loop(self):
-        """Цикл мониторинга - выполняется в отдельном потоке"""
-        while self.running:
-            if not self.game_launcher.monitor_game():
-                self.game_closed.emit()
-                break
-            time.sleep(2)
+logger = logging.getLogger(__name__)
 
 class GameMonitor(QObject):
-    """Класс для управления мониторингом игры"""
+    """Класс для управления мониторингом игры
+
+    Проверка выполняется периодической задачей общего планировщика, сигнал
+    game_closed доставляется в главный поток через очередь событий Qt.
+    """
     game_closed = pyqtSignal()
     
     def __init__(self, game_launcher, parent=None):
         super().__init__(parent)
         self.game_launcher = game_launcher
-        self.thread = None
-        self.worker = None
+        self.task = None
     
     def start_monitoring(self):
-        """Начинает мониторинг в отдельном потоке"""
-        self.thread = QThread()
-        self.worker = GameMonitorWorker(self.game_launcher)
-        self.worker.moveToThread(self.thread)
-        
-        # Подключаем сигналы
-        self.thread.started.connect(self.worker.monitor_loop)
-        self.worker.game_closed.connect(self.game_closed)
-        self.worker.game_closed.connect(self.stop_monitoring)
-        
-        # Запускаем поток
-        self.worker.start_monitoring()
-        self.thread.start()
+        """Начинает периодический мониторинг"""
+        self.stop_monitoring()
+        self.task = get_scheduler().call_every(2, self._check, name="game-monitor")
     
     def stop_monitoring(self):
         """Останавливает мониторинг"""
-        if self.worker:
-            self.worker.stop_monitoring()
-        if self.thread:
-            self.thread.quit()
-            self.thread.wait()
-            self.thread = None
-            self.worker = None
+        if self.task:
+            get_scheduler().cancel(self.task)
+            self.task = None
+    
+    def _check(self):
+        """Одна проверка процесса игры - выполняется в пуле планировщика"""
+        task = self.task
+        if task is None or task.cancelled:
+            return
+        if not self.game_launcher.monitor_game():
+            task.cancel()
+            self.game_closed.emit()
 
 class MainWindow(QMainWindow):
     """Главное окно приложения"""
     
-    def __init__(self):
+    # Результат фоновой проверки путей лаунчеров: ключ настройки -> найденный путь
+    launcher_paths_checked = pyqtSignal(dict)
+    # Переходы состояния запуска (из любого потока)
+    launch_state_changed = pyqtSignal(object)
+    
+    LAUNCH_STATUS = {
+        RENTING: "Аренда игры {title}...",
+        LOGGING_IN: "Вход в лаунчер: {title}...",
+        LAUNCHING: "Запуск игры {title}...",
+        ENDING: "Завершение сессии...",
+    }
+    
+    # Интервал обновления статуса аренды: обычный и в игровом режиме (окно в трее,
+    # окончание аренды отслеживают и процессы мониторинга)
+    STATUS_INTERVAL = 5
+    GAME_MODE_STATUS_INTERVAL = 30
+    # Сколько секунд данные старта, полученные в main.py, считаются свежими
+    BOOTSTRAP_MAX_AGE = 30
+    # Пустой список заполняется страницами по мере загрузки каталога
+    CATALOG_PAGE = 50
+    
+    def __init__(self, config: Config | None = None, api_client: APIClient | None = None):
         super().__init__()
-        self.config = Config()
-        self.api_client = APIClient()
+        self.config = config or Config()
+        # Клиент из main.py уже хранит данные старта (аренда и каталог)
+        self.api_client = api_client or APIClient.from_config(self.config)
         self.game_launcher = GameLauncher(self.api_client, self.config)
-        self.games = []
-        self.current_rental = None
+        # Состояние запуска меняется в пуле планировщика - в UI оно приходит через очередь сигналов
+        self.launch_state_changed.connect(self._on_launch_state)
+        self.game_launcher.launch_state.subscribe(self.launch_state_changed.emit)
+        # Обновления из потоков пула: доставляются в главный поток раз в кадр,
+        # из нескольких текстов статуса показывается последний
+        self.ui_bus = UIUpdateBus(self)
+        self.ui_bus.on(StatusText, lambda event: self.status_label.setText(event.text))
+        self.ui_bus.on(RentalUpdate, lambda event: self._apply_rental_status(event.rental))
+        self.games: list[Game] = []
+        self.games_by_id: dict[int, Game] = {}
+        self.current_rental: Rental | None = None
         self.monitor = None
+        self.status_task = None
+        
+        # Обложки: загружаются только для видимых строк списка
+        self.cover_loader = CoverLoader(DiskImageCache(self.config.cache_dir / "covers"), parent=self)
+        self.cover_loader.cover_ready.connect(self._on_cover_ready)
+        self.cover_rows: dict[str, list[int]] = {}
+        # Строки с установленной обложкой: у ушедших из вида обложка снимается,
+        # иначе элементы списка держат все миниатюры мимо ограниченного кэша
+        self.icon_rows: set[int] = set()
+        self.cover_timer = QTimer(self)
+        self.cover_timer.setSingleShot(True)
+        self.cover_timer.setInterval(50)
+        self.cover_timer.timeout.connect(self._load_visible_covers)
+        
+        # Поиск лаунчеров: кэш в конфигурации, пути проверяются в фоне при запуске
+        self.launcher_discovery = LauncherDiscovery(self.config.config_dir / "launcher_discovery.json")
+        self.launcher_paths_checked.connect(self._on_launcher_paths_checked)
+        
+        # Игровой режим: на время сессии окно уходит в трей, каталог и обложки
+        # выгружаются, после сессии каталог восстанавливается из кэша на диске
+        self.catalog_cache = CatalogCache(self.config.cache_dir / "catalog.json")
+        # Номер загрузки каталога: страницы устаревшей загрузки отбрасываются
+        self._catalog_generation = 0
+        self.in_game_mode = False
+        self.tray_icon: QSystemTrayIcon | None = None
+        self.footprint: FootprintReport | None = None
+        
+        # Профилирование по требованию: приложение и процессы мониторинга
+        self.profiling = ProfilerControl(self.config.config_dir / "profiles", "app",
+                                         self.game_launcher.set_monitor_profiling)
         
         # Загружаем ключ
         pc_key = self.config.load_key()
@@ -97,11 +144,12 @@ class MainWindow(QMainWindow):
         # Завершаем активную аренду перед загрузкой игр (асинхронно, чтобы не блокировать UI)
         # Используем QTimer для выполнения после инициализации UI
         QTimer.singleShot(100, self.end_active_rental_on_startup)
+        get_job_scheduler().submit(self._check_launcher_paths, name="launcher-discovery")
+        if self.config.get_setting('profiling', False):
+            self.set_profiling(True)
         
-        # Таймер для обновления статуса
-        self.status_timer = QTimer()
-        self.status_timer.timeout.connect(self.update_status)
-        self.status_timer.start(5000)  # Обновляем каждые 5 секунд
+        # Обновление статуса планируется только на время активной аренды,
+        # чтобы в простое приложение не просыпалось впустую
     
     def setup_ui(self):
         """Настраивает интерфейс"""
@@ -123,6 +171,13 @@ class MainWindow(QMainWindow):
         settings_action.triggered.connect(self.show_settings)
         menubar.addAction(settings_action)
         
+        # Скрытое действие: профилирование включается горячей клавишей, без пункта меню
+        self.profiling_action = QAction("Профилирование", self)
+        self.profiling_action.setCheckable(True)
+        self.profiling_action.setShortcut("Ctrl+Shift+P")
+        self.profiling_action.toggled.connect(self.set_profiling)
+        self.addAction(self.profiling_action)
+        
         # Заголовок
         title = QLabel("Доступные игры")
         title.setStyleSheet("font-size: 18px; font-weight: bold;")
@@ -130,7 +185,12 @@ class MainWindow(QMainWindow):
         
         # Список игр
         self.games_list = QListWidget()
+        self.games_list.setIconSize(self.cover_loader.thumbnail_size)
+        # Одинаковая высота строк - прокрутка без пересчета размеров всех элементов
+        self.games_list.setUniformItemSizes(True)
         self.games_list.itemDoubleClicked.connect(self.on_game_double_clicked)
+        self.games_list.currentItemChanged.connect(self.on_game_selected)
+        self.games_list.verticalScrollBar().valueChanged.connect(self._schedule_cover_load)
         main_layout.addWidget(self.games_list)
         
         # Кнопки
@@ -141,6 +201,11 @@ class MainWindow(QMainWindow):
         self.play_button.setEnabled(False)
         button_layout.addWidget(self.play_button)
         
+        self.cancel_button = QPushButton("Отменить запуск")
+        self.cancel_button.clicked.connect(self.game_launcher.cancel_launch)
+        self.cancel_button.setVisible(False)
+        button_layout.addWidget(self.cancel_button)
+        
         self.refresh_button = QPushButton("Обновить")
         self.refresh_button.clicked.connect(self.load_games)
         button_layout.addWidget(self.refresh_button)
@@ -157,103 +222,259 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         main_layout.addWidget(self.progress_bar)
     
+    def _check_launcher_paths(self):
+        """Проверяет пути лаунчеров в настройках (в фоне) и заполняет найденными"""
+        try:
+            changes = self.launcher_discovery.check_settings(self.config)
+        except Exception as e:
+            logger.error("Ошибка поиска лаунчеров: %s", e)
+            return
+        if changes:
+            self.launcher_paths_checked.emit(changes)
+    
+    def _on_launcher_paths_checked(self, changes: dict):
+        if 'steam_path' in changes:
+            self.status_label.setText(f"Steam найден: {changes['steam_path']}")
+    
     def end_active_rental_on_startup(self):
-        """Завершает активную аренду при запуске и затем загружает игры"""
+        """Завершает активную аренду при запуске и показывает каталог
+        
+        Аренда обычно уже получена в main.py при проверке ключа
+        (APIClient.bootstrap без каталога); каталог загружается потоком.
+        """
         def do_end_and_load():
             """Выполняется в отдельном потоке"""
+            if not self.api_client.pc_key:
+                # Если нет ключа, сразу загружаем игры
+                self.ui_bus.post(Invoke(self.load_games, coalesce_key="catalog"))
+                return
+            
+            logger.info("Проверка активной аренды при запуске...")
+            self.ui_bus.post(StatusText("Проверка активной аренды..."))
             try:
-                if not self.api_client.pc_key:
-                    # Если нет ключа, сразу загружаем игры
-                    QTimer.singleShot(0, self.load_games)
-                    return
-                
-                print("Проверка активной аренды при запуске...")
-                QTimer.singleShot(0, lambda: self.status_label.setText("Проверка активной аренды..."))
-                
-                # Получаем информацию об активной аренде
-                rental_info = self.api_client.get_active_rental()
-                
-                if rental_info.get('hasActiveRental') and rental_info.get('rental'):
-                    active_rental = rental_info['rental']
-                    session_id = active_rental.get('id')
-                    game_title = active_rental.get('gameTitle', 'Неизвестная игра')
-                    
-                    print(f"Обнаружена активная аренда: {game_title} (session_id: {session_id})")
-                    QTimer.singleShot(0, lambda: self.status_label.setText(f"Завершение активной аренды: {game_title}..."))
-                    
-                    # Завершаем активную аренду
-                    try:
-                        if session_id:
-                            print(f"Завершаем аренду с session_id: {session_id}")
-                            self.api_client.end_rental(session_id)
-                        else:
-                            print("Завершаем аренду без session_id")
-                            self.api_client.end_rental()
-                        
-                        print("Активная аренда успешно завершена при запуске")
-                        QTimer.singleShot(0, lambda: self.status_label.setText("Активная аренда завершена"))
-                        
-                    except Exception as e:
-                        print(f"Ошибка при завершении активной аренды при запуске: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        # Продолжаем работу даже если не удалось завершить аренду
-                        QTimer.singleShot(0, lambda: self.status_label.setText(f"Не удалось завершить активную аренду"))
-                else:
-                    print("Активная аренда не найдена при запуске")
-                    QTimer.singleShot(0, lambda: self.status_label.setText("Активная аренда не найдена"))
-                
-                # Загружаем игры после завершения проверки
-                QTimer.singleShot(500, self.load_games)
-                
+                bootstrap = self.api_client.bootstrap(max_age=self.BOOTSTRAP_MAX_AGE, games=False)
             except Exception as e:
-                print(f"Ошибка при проверке активной аренды при запуске: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Ошибка при проверке активной аренды при запуске: %s", e)
                 # Продолжаем работу даже при ошибке
-                QTimer.singleShot(0, lambda: self.status_label.setText("Ошибка проверки аренды"))
+                self.ui_bus.post(StatusText("Ошибка проверки аренды"))
                 # Загружаем игры даже при ошибке
-                QTimer.singleShot(500, self.load_games)
+                self.ui_bus.post(Invoke(self.load_games, coalesce_key="catalog"))
+                return
+            
+            # Каталог показываем по страницам, не дожидаясь завершения аренды
+            self.ui_bus.post(Invoke(self.load_games, coalesce_key="catalog"))
+            
+            active_rental = bootstrap.active_rental
+            if not active_rental:
+                logger.info("Активная аренда не найдена при запуске")
+                return
+            
+            session_id = active_rental.id
+            game_title = active_rental.game_title
+            logger.info("Обнаружена активная аренда: %s (session_id: %s)", game_title, session_id)
+            self.ui_bus.post(StatusText(f"Завершение активной аренды: {game_title}..."))
+            
+            # Завершаем активную аренду
+            try:
+                if session_id:
+                    logger.info("Завершаем аренду с session_id: %s", session_id)
+                    self.api_client.end_rental(session_id)
+                else:
+                    logger.info("Завершаем аренду без session_id")
+                    self.api_client.end_rental()
+                logger.info("Активная аренда успешно завершена при запуске")
+                self.ui_bus.post(StatusText("Активная аренда завершена"))
+            except Exception as e:
+                logger.exception("Ошибка при завершении активной аренды при запуске: %s", e)
+                # Продолжаем работу даже если не удалось завершить аренду
+                self.ui_bus.post(StatusText("Не удалось завершить активную аренду"))
+                return
+            
+            # Аккаунт аренды освободился - число доступных аккаунтов в каталоге изменилось
+            try:
+                self.ui_bus.post(Invoke(self._apply_catalog, (self.api_client.get_games(),), "catalog"))
+            except Exception as e:
+                logger.warning("Не удалось обновить каталог после завершения аренды: %s", e)
         
-        # Запускаем в отдельном потоке, чтобы не блокировать UI
-        thread = threading.Thread(target=do_end_and_load, daemon=True)
-        thread.start()
+        # Запускаем в пуле долгих задач, чтобы не блокировать UI
+        get_job_scheduler().submit(do_end_and_load, name="startup-rental-check")
     
     def load_games(self):
-        """Загружает список игр"""
+        """Загружает список игр в фоне
+        
+        Если список пуст, игры показываются страницами по мере загрузки;
+        иначе текущий список заменяется, когда каталог загружен целиком.
+        """
+        self._catalog_generation += 1
+        self.status_label.setText("Загрузка игр...")
+        get_job_scheduler().submit(self._stream_catalog, self._catalog_generation, not self.games,
+                                   name="catalog-load")
+    
+    def _stream_catalog(self, generation: int, progressive: bool):
+        """Читает каталог потоком - выполняется в пуле долгих задач"""
+        games: list[Game] = []
         try:
-            self.status_label.setText("Загрузка игр...")
-            self.games = self.api_client.get_games()
-            self.update_games_list()
-            self.status_label.setText(f"Загружено игр: {len(self.games)}")
+            for game in self.api_client.iter_games():
+                if generation != self._catalog_generation:
+                    return
+                games.append(game)
+                if progressive and len(games) % self.CATALOG_PAGE == 0:
+                    # Из нескольких страниц за кадр интерфейс покажет последнюю
+                    self.ui_bus.post(Invoke(self._show_catalog_page, (generation, games[:]), "catalog-page"))
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить игры: {e}")
-            self.status_label.setText("Ошибка загрузки игр")
+            logger.error("Не удалось загрузить игры: %s", e)
+            self.ui_bus.post(Invoke(self._on_catalog_failed, (generation, e)))
+            return
+        self.ui_bus.post(Invoke(self._on_catalog_loaded, (generation, games, progressive)))
+    
+    def _show_catalog_page(self, generation: int, games: list[Game]):
+        if generation != self._catalog_generation:
+            return
+        self._append_games(games)
+        self.status_label.setText(f"Загрузка игр: {len(self.games)}...")
+    
+    def _on_catalog_loaded(self, generation: int, games: list[Game], progressive: bool):
+        if generation != self._catalog_generation:
+            return
+        if progressive:
+            self._append_games(games)
+            self.catalog_cache.save(self.games)
+            self.status_label.setText(f"Загружено игр: {len(self.games)}")
+        else:
+            self._show_catalog(games)
+    
+    def _on_catalog_failed(self, generation: int, error: Exception):
+        if generation != self._catalog_generation:
+            return
+        QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить игры: {error}")
+        self.status_label.setText("Ошибка загрузки игр")
+    
+    def _apply_catalog(self, games: list[Game]):
+        """Показывает полученный целиком каталог (вызывается из главного потока)"""
+        # Начатая раньше загрузка устарела
+        self._catalog_generation += 1
+        self._show_catalog(games)
+    
+    def _show_catalog(self, games: list[Game]):
+        self._set_games(games)
+        self.catalog_cache.save(self.games)
+        self.status_label.setText(f"Загружено игр: {len(self.games)}")
+    
+    def _set_games(self, games: list[Game]):
+        self.games = games
+        self.games_by_id = {game.id: game for game in games}
+        self.update_games_list()
+    
+    def _append_games(self, games: list[Game]):
+        """Добавляет в список игры, которых в нем еще нет (games начинается с self.games)"""
+        start = len(self.games)
+        added = games[start:]
+        self.games.extend(added)
+        self.games_by_id.update((game.id, game) for game in added)
+        self._add_game_rows(start, added)
+        self._schedule_cover_load()
     
     def update_games_list(self):
         """Обновляет список игр"""
         self.games_list.clear()
-        
-        for game in self.games:
-            item_text = f"{game['title']}"
-            if game.get('availableAccounts', 0) > 0:
-                item_text += f" (Доступно: {game['availableAccounts']})"
+        self.cover_rows = {}
+        self.icon_rows = set()
+        self._add_game_rows(0, self.games)
+        self._schedule_cover_load()
+    
+    def _add_game_rows(self, start: int, games: list[Game]):
+        """Добавляет строки списка для игр, начиная со строки start"""
+        for row, game in enumerate(games, start):
+            item_text = game.title
+            if game.is_available:
+                item_text += f" (Доступно: {game.available_accounts})"
             else:
                 item_text += " (Недоступно)"
             
             item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, game)
+            # В элементе храним только ID, сама игра - в self.games_by_id
+            item.setData(Qt.UserRole, game.id)
             
             # Отключаем недоступные игры
-            if game.get('availableAccounts', 0) == 0:
+            if not game.is_available:
                 item.setFlags(item.flags() & ~Qt.ItemIsEnabled)
             
+            if game.image_url:
+                # Обложку поставит _load_visible_covers, если строка видна
+                self.cover_rows.setdefault(game.image_url, []).append(row)
+            
             self.games_list.addItem(item)
     
+    def _schedule_cover_load(self, *args):
+        """Откладывает загрузку обложек до остановки прокрутки"""
+        self.cover_timer.start()
+    
+    def _visible_rows(self) -> range:
+        """Диапазон видимых строк списка с небольшим запасом"""
+        count = self.games_list.count()
+        if not count:
+            return range(0)
+        viewport = self.games_list.viewport()
+        first = self.games_list.indexAt(QPoint(0, 0)).row()
+        last = self.games_list.indexAt(QPoint(0, viewport.height() - 1)).row()
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = count - 1
+        margin = max(1, last - first)
+        return range(max(0, first - margin), min(count, last + margin + 1))
+    
+    def _load_visible_covers(self):
+        """Ставит обложки видимым строкам (из кэша или после загрузки), снимает с остальных"""
+        visible = self._visible_rows()
+        for row in [row for row in self.icon_rows if row not in visible]:
+            item = self.games_list.item(row)
+            if item:
+                item.setIcon(QIcon())
+            self.icon_rows.discard(row)
+        urls = []
+        for row in visible:
+            if row in self.icon_rows:
+                continue
+            item = self.games_list.item(row)
+            game = self.games_by_id.get(item.data(Qt.UserRole)) if item else None
+            if not game or not game.image_url:
+                continue
+            cached = self.cover_loader.cached(game.image_url)
+            if cached is not None:
+                item.setIcon(QIcon(cached))
+                self.icon_rows.add(row)
+            else:
+                urls.append(game.image_url)
+        self.cover_loader.request(urls)
+    
+    def _on_cover_ready(self, url: str, pixmap: QPixmap):
+        """Устанавливает загруженную обложку в видимые строки списка"""
+        icon = QIcon(pixmap)
+        visible = self._visible_rows()
+        for row in self.cover_rows.get(url, ()):
+            item = self.games_list.item(row) if row in visible else None
+            if item:
+                item.setIcon(icon)
+                self.icon_rows.add(row)
+    
+    def resizeEvent(self, event):
+        """При изменении размера окна видимыми становятся другие строки"""
+        super().resizeEvent(event)
+        self._schedule_cover_load()
+    
+    def on_game_selected(self, item: QListWidgetItem, previous=None):
+        """При выборе игры заранее загружаем плагин ее лаунчера"""
+        if item is None:
+            return
+        game = self.games_by_id.get(item.data(Qt.UserRole))
+        if game and game.is_available:
+            self.game_launcher.warm_up(game)
+    
     def on_game_double_clicked(self, item: QListWidgetItem):
         """Обработчик двойного клика по игре"""
-        game = item.data(Qt.UserRole)
-        if game and game.get('availableAccounts', 0) > 0:
+        game = self.games_by_id.get(item.data(Qt.UserRole))
+        if game and game.is_available:
             self.launch_game(game)
     
     def on_play_clicked(self):
@@ -262,14 +483,19 @@ class MainWindow(QMainWindow):
         if not current_item:
             return
         
-        game = current_item.data(Qt.UserRole)
+        game = self.games_by_id.get(current_item.data(Qt.UserRole))
         if game:
             self.launch_game(game)
     
-    def launch_game(self, game: dict):
+    def launch_game(self, game: Game):
         """Запускает игру"""
         # Проверяем настройки
         steam_path = self.config.get_setting('steam_path')
+        if not steam_path:
+            # Результат поиска обычно уже в кэше после проверки при запуске
+            steam_path = self.launcher_discovery.find('steam')
+            if steam_path:
+                self.config.set_setting('steam_path', steam_path)
         if not steam_path:
             QMessageBox.warning(
                 self, 
@@ -279,8 +505,8 @@ class MainWindow(QMainWindow):
             self.show_settings()
             return
         
-        # Проверяем активную аренду
-        if self.current_rental:
+        # Проверяем активную аренду (или сессию, для которой аренда не нашлась)
+        if self.current_rental or self.game_launcher.launch_state.state == RUNNING:
             reply = QMessageBox.question(
                 self,
                 "Активная аренда",
@@ -293,64 +519,76 @@ class MainWindow(QMainWindow):
             else:
                 return
         
-        # Запускаем игру
+        # Запускаем игру: повторный клик во время запуска новую аренду не начнет
         try:
-            self.status_label.setText(f"Запуск игры {game['title']}...")
-            self.play_button.setEnabled(False)
-            
-            # Запускаем в отдельном потоке
-            thread = threading.Thread(
-                target=self._launch_game_thread,
-                args=(game,),
-                daemon=True
-            )
-            thread.start()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось запустить игру: {e}")
-            self.status_label.setText("Ошибка запуска игры")
-            self.play_button.setEnabled(True)
+            self.game_launcher.request_launch(game, duration_hours=1)
+        except LaunchBusyError as e:
+            logger.info("Запуск не начат: %s", e)
+            self.status_label.setText("Запуск уже выполняется")
+    
+    def _on_launch_state(self, snapshot: LaunchSnapshot):
+        """Переход состояния запуска (вызывается в главном потоке)"""
+        self.cancel_button.setVisible(snapshot.state in LAUNCH_STATES)
+        self._update_play_button(snapshot.state)
+        if snapshot.state in self.LAUNCH_STATUS:
+            self.status_label.setText(self.LAUNCH_STATUS[snapshot.state].format(title=snapshot.game_title))
+        elif snapshot.state == RUNNING:
+            # Аренду запрашиваем вне главного потока
+            get_job_scheduler().submit(self._fetch_rental_after_launch, snapshot.game_title, name="launch-rental")
+        elif snapshot.error:
+            self.status_label.setText(f"Ошибка: {snapshot.error}")
+        elif snapshot.cancelled:
+            self.status_label.setText("Запуск отменен")
     
-    def _launch_game_thread(self, game: dict):
-        """Запускает игру в отдельном потоке"""
+    def _update_play_button(self, state: str):
+        """Кнопка "Играть" доступна вне запуска; в игровом режиме каталог выгружен"""
+        self.play_button.setEnabled(state in (IDLE, RUNNING) and not self.in_game_mode)
+    
+    def _fetch_rental_after_launch(self, title: str):
+        """Получает активную аренду после запуска - выполняется в пуле долгих задач"""
         try:
-            success = self.game_launcher.launch_game(game, duration_hours=1)
-            
-            if success:
-                # Получаем информацию об активной аренде
-                try:
-                    rental_info = self.api_client.get_active_rental()
-                    if rental_info.get('hasActiveRental'):
-                        self.current_rental = rental_info['rental']
-                        
-                        # Запускаем мониторинг в отдельном Qt потоке
-                        self.monitor = GameMonitor(self.game_launcher, self)
-                        self.monitor.game_closed.connect(self.on_game_closed)
-                        self.monitor.start_monitoring()
-                        
-                        # Используем QTimer для безопасного обновления UI из другого потока
-                        QTimer.singleShot(0, lambda: self._update_ui_after_launch(game))
-                    else:
-                        QTimer.singleShot(0, lambda: self.status_label.setText("Игра запущена, но аренда не найдена"))
-                except Exception as e:
-                    print(f"Ошибка при получении информации об аренде: {e}")
-                    QTimer.singleShot(0, lambda: self.status_label.setText(f"Игра запущена: {game['title']}"))
-            else:
-                QTimer.singleShot(0, lambda: self.status_label.setText("Ошибка запуска игры"))
-                
+            rental = self.api_client.get_active_rental()
         except Exception as e:
-            import traceback
-            error_msg = str(e)
-            print(f"Ошибка при запуске игры: {traceback.format_exc()}")
-            QTimer.singleShot(0, lambda: self.status_label.setText(f"Ошибка: {error_msg}"))
-        finally:
-            QTimer.singleShot(0, lambda: self.play_button.setEnabled(True))
-    
-    def _update_ui_after_launch(self, game: dict):
+            logger.error("Ошибка при получении информации об аренде: %s", e)
+            rental = None
+        self.ui_bus.post(Invoke(self._on_rental_fetched, (rental, title)))
+    
+    def _on_rental_fetched(self, rental, title: str):
+        if self.game_launcher.launch_state.state != RUNNING:
+            # Сессия завершилась, пока шел запрос
+            return
+        self.current_rental = rental
+        self._update_ui_after_launch(title)
+        if rental is None:
+            self.status_label.setText("Игра запущена, но аренда не найдена")
+    
+    def _update_ui_after_launch(self, title: str):
         """Безопасно обновляет UI после запуска игры (вызывается из главного потока)"""
-        self.status_label.setText(f"Игра запущена: {game['title']}")
+        # Запускаем мониторинг игры
+        self.monitor = GameMonitor(self.game_launcher, self)
+        self.monitor.game_closed.connect(self.on_game_closed)
+        self.monitor.start_monitoring()
+        
+        # Обновляем статус аренды каждые 5 секунд
+        self._start_status_updates(self.STATUS_INTERVAL)
+        
+        self.status_label.setText(f"Игра запущена: {title}")
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        
+        if self.config.get_setting('game_mode', True):
+            self.enter_game_mode()
+    
+    def _start_status_updates(self, interval: float):
+        """(Пере)запускает периодическое обновление статуса аренды"""
+        self._stop_status_updates()
+        self.status_task = get_scheduler().call_every(interval, self.update_status, name="status-update")
+    
+    def _stop_status_updates(self):
+        """Останавливает периодическое обновление статуса"""
+        if self.status_task:
+            get_scheduler().cancel(self.status_task)
+            self.status_task = None
     
     def on_game_closed(self):
         """Обработчик закрытия игры"""
@@ -363,46 +601,162 @@ class MainWindow(QMainWindow):
             self.monitor.stop_monitoring()
             self.monitor = None
         
+        self._stop_status_updates()
+        
         if self.game_launcher:
             self.game_launcher.end_session()
         
         self.current_rental = None
         self.progress_bar.setVisible(False)
         self.status_label.setText("Готов к работе")
+        self.exit_game_mode()
+    
+    def enter_game_mode(self):
+        """Сворачивает окно в трей и освобождает память на время игры"""
+        if self.in_game_mode:
+            return
+        self.in_game_mode = True
+        report = FootprintReport(rss_bytes())
+        
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray_icon is None:
+                self.tray_icon = self._create_tray_icon()
+            self.tray_icon.show()
+            self.hide()
+        else:
+            self.showMinimized()
+        
+        # Каталог, строки списка и обложки в памяти; обложки остаются в кэше на диске
+        self._catalog_generation += 1
+        self.cover_timer.stop()
+        self.games_list.clear()
+        self.cover_rows = {}
+        self.icon_rows = set()
+        self.games = []
+        self.games_by_id = {}
+        self.cover_loader.clear()
+        QPixmapCache.clear()
+        self.play_button.setEnabled(False)
+        
+        self._start_status_updates(self.GAME_MODE_STATUS_INTERVAL)
+        # Виджеты удаляются в цикле событий - освобождаем память после него
+        QTimer.singleShot(0, lambda: self._trim_memory(report))
+    
+    def _trim_memory(self, report: FootprintReport):
+        trim_memory()
+        report.after = rss_bytes()
+        self.footprint = report
+        logger.info("Игровой режим: память %s", report)
+    
+    def _create_tray_icon(self) -> QSystemTrayIcon:
+        tray_icon = QSystemTrayIcon(self.style().standardIcon(QStyle.SP_ComputerIcon), self)
+        tray_icon.setToolTip("Rental Games Desktop: идет игровая сессия")
+        menu = QMenu(self)
+        show_action = menu.addAction("Показать окно")
+        show_action.triggered.connect(self._show_from_tray)
+        end_action = menu.addAction("Завершить сессию")
+        end_action.triggered.connect(self.end_current_rental)
+        tray_icon.setContextMenu(menu)
+        tray_icon.activated.connect(
+            lambda reason: self._show_from_tray() if reason == QSystemTrayIcon.DoubleClick else None
+        )
+        return tray_icon
+    
+    def _show_from_tray(self):
+        """Показывает окно во время сессии (каталог остается выгруженным)"""
+        self.showNormal()
+        self.activateWindow()
+        self._start_status_updates(self.STATUS_INTERVAL)
+    
+    def exit_game_mode(self):
+        """Возвращает окно и восстанавливает каталог из кэша на диске"""
+        if not self.in_game_mode:
+            return
+        self.in_game_mode = False
+        if self.tray_icon:
+            self.tray_icon.hide()
+        self.showNormal()
+        self.activateWindow()
+        
+        started = time.perf_counter()
+        games = self.catalog_cache.load()
+        if games:
+            self._set_games(games)
+        # Переход в idle мог прийти, пока окно было в игровом режиме (end_current_rental
+        # выполняется в главном потоке до выхода из режима)
+        self._update_play_button(self.game_launcher.launch_state.state)
+        logger.info("Каталог восстановлен из кэша за %.0f мс (%s игр), память %s",
+                    (time.perf_counter() - started) * 1000, len(self.games), FootprintReport(rss_bytes()))
+        # Наличие аккаунтов могло измениться за время сессии
+        QTimer.singleShot(0, self.load_games)
     
     def update_status(self):
-        """Обновляет статус - вызывается из главного потока"""
-        if self.current_rental:
-            # Обновляем информацию об аренде
-            try:
-                rental_info = self.api_client.get_active_rental()
-                if rental_info.get('hasActiveRental'):
-                    rental = rental_info['rental']
-                    remaining = rental.get('remainingHours', 0)
-                    self.status_label.setText(
-                        f"Аренда активна: {rental['gameTitle']} "
-                        f"(Осталось: {remaining:.1f} ч.)"
-                    )
-                    
-                    # Обновляем прогресс бар
-                    total_hours = rental.get('plannedDurationHours', 1)
-                    if total_hours > 0:
-                        progress = int((1 - remaining / total_hours) * 100)
-                        self.progress_bar.setValue(progress)
-                else:
-                    # Аренда завершена
-                    self.end_current_rental()
-            except Exception as e:
-                print(f"Ошибка при обновлении статуса: {e}")
+        """Обновляет статус - вызывается периодически из пула планировщика"""
+        if not self.current_rental:
+            return
+        
+        # Обновляем информацию об аренде (сетевой запрос вне главного потока)
+        try:
+            rental = self.api_client.get_active_rental()
+        except Exception as e:
+            logger.warning("Ошибка при обновлении статуса: %s", e, extra={"sample": True})
+            return
+        
+        if rental:
+            self.ui_bus.post(RentalUpdate(rental))
+        else:
+            # Аренда завершена
+            self.ui_bus.post(Invoke(self.end_current_rental, coalesce_key="end-rental"))
+    
+    def _apply_rental_status(self, rental: Rental):
+        """Показывает состояние аренды (вызывается из главного потока)"""
+        if not self.current_rental:
+            return
+        
+        remaining = rental.remaining_hours
+        self.status_label.setText(
+            f"Аренда активна: {rental.game_title} "
+            f"(Осталось: {remaining:.1f} ч.)"
+        )
+        if self.in_game_mode and self.tray_icon:
+            self.tray_icon.setToolTip(self.status_label.text())
+        
+        # Обновляем прогресс бар
+        total_hours = rental.planned_duration_hours
+        if total_hours > 0:
+            progress = int((1 - remaining / total_hours) * 100)
+            self.progress_bar.setValue(progress)
     
     def show_settings(self):
         """Показывает диалог настроек"""
-        dialog = SettingsDialog(self.config, self)
-        dialog.exec_()
+        dialog = SettingsDialog(self.config, self, discovery=self.launcher_discovery)
+        if dialog.exec_():
+            self.set_profiling(bool(self.config.get_setting('profiling', False)))
+    
+    def set_profiling(self, enabled: bool):
+        """Включает или выключает профилирование (остановка и запись файлов - в пуле)"""
+        if self.profiling_action.isChecked() != enabled:
+            # toggled снова вызовет set_profiling с тем же значением
+            self.profiling_action.setChecked(enabled)
+            return
+        if self.profiling.wanted == enabled:
+            return
+        self.profiling.request(enabled)
+        get_job_scheduler().submit(self._apply_profiling, name="profiling")
+    
+    def _apply_profiling(self):
+        result = self.profiling.apply()
+        if result is None:
+            return
+        if result["running"]:
+            text = "Профилирование включено (Ctrl+Shift+P - остановить)"
+        else:
+            text = f"Профилирование остановлено, файлов: {len(result['files'])} в {self.profiling.output_dir}"
+        self.ui_bus.post(StatusText(text))
     
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
-        if self.current_rental:
+        if self.current_rental or self.game_launcher.launch_state.busy:
             reply = QMessageBox.question(
                 self,
                 "Активная аренда",
@@ -414,5 +768,7 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.end_current_rental()
         
+        if self.profiling.running:
+            self.profiling.stop()
         event.accept()
 
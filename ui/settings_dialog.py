@@ -1,18 +1,27 @@
 """
 Диалог настроек приложения
 """
+import os
+
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QLineEdit, QPushButton, QFileDialog, QMessageBox)
-from PyQt5.QtCore import Qt
+                             QLineEdit, QPushButton, QFileDialog, QMessageBox, QCheckBox)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from scheduler import get_job_scheduler
 
 class SettingsDialog(QDialog):
     """Диалог настроек"""
     
-    def __init__(self, config, parent=None):
+    # Результат поиска лаунчеров: имя лаунчера -> путь
+    discovery_finished = pyqtSignal(dict)
+    
+    def __init__(self, config, parent=None, discovery=None):
         super().__init__(parent)
         self.config = config
+        self.discovery = discovery
+        self.discovery_finished.connect(self._apply_discovered)
         self.setWindowTitle("Настройки")
-        self.setFixedSize(600, 400)
+        self.setFixedSize(600, 470)
         self.setWindowFlags(Qt.Dialog | Qt.MSWindowsFixedSizeDialogHint)
         
         self.setup_ui()
@@ -106,9 +115,29 @@ class SettingsDialog(QDialog):
         
         layout.addLayout(ea_layout)
         
+        # Адрес API (бэкенд или прокси клуба)
+        api_layout = QHBoxLayout()
+        api_label = QLabel("Адрес API / прокси клуба:")
+        api_layout.addWidget(api_label)
+        
+        self.api_input = QLineEdit()
+        self.api_input.setPlaceholderText("https://passplay.ru")
+        api_layout.addWidget(self.api_input)
+        
+        layout.addLayout(api_layout)
+        
+        # Профилирование (разбор медленных ПК), то же - Ctrl+Shift+P в главном окне
+        self.profiling_check = QCheckBox("Профилирование (файлы в папке profiles)")
+        layout.addWidget(self.profiling_check)
+        
         # Кнопки
         button_layout = QHBoxLayout()
         
+        if self.discovery:
+            self.discover_button = QPushButton("Найти автоматически")
+            self.discover_button.clicked.connect(self.discover_launchers)
+            button_layout.addWidget(self.discover_button)
+        
         btn_save = QPushButton("Сохранить")
         btn_save.clicked.connect(self.save_settings)
         button_layout.addWidget(btn_save)
@@ -132,6 +161,41 @@ class SettingsDialog(QDialog):
         if file_path:
             line_edit.setText(file_path)
     
+    def _launcher_inputs(self) -> dict:
+        return {
+            'steam': self.steam_input,
+            'epic': self.epic_input,
+            'riot': self.riot_input,
+            'battlenet': self.battlenet_input,
+            'vkplay': self.vkplay_input,
+            'ea': self.ea_input,
+        }
+    
+    def discover_launchers(self):
+        """Ищет лаунчеры в фоне; найденные пути подставляются в пустые и неверные поля"""
+        self.discover_button.setEnabled(False)
+        self.discover_button.setText("Поиск...")
+        
+        def run():
+            try:
+                results = self.discovery.discover(force=True)
+                found = {name: result.path for name, result in results.items() if result}
+            except Exception:
+                found = {}
+            self.discovery_finished.emit(found)
+        
+        get_job_scheduler().submit(run, name="launcher-discovery")
+    
+    def _apply_discovered(self, found: dict):
+        self.discover_button.setEnabled(True)
+        self.discover_button.setText("Найти автоматически")
+        for name, line_edit in self._launcher_inputs().items():
+            current = line_edit.text().strip()
+            if name in found and (not current or not os.path.isfile(current)):
+                line_edit.setText(found[name])
+        if not found:
+            QMessageBox.information(self, "Поиск", "Лаунчеры не найдены, укажите пути вручную")
+    
     def load_settings(self):
         """Загружает настройки"""
         self.steam_input.setText(self.config.get_setting('steam_path', ''))
@@ -140,6 +204,8 @@ class SettingsDialog(QDialog):
         self.battlenet_input.setText(self.config.get_setting('battlenet_path', ''))
         self.vkplay_input.setText(self.config.get_setting('vkplay_path', ''))
         self.ea_input.setText(self.config.get_setting('ea_path', ''))
+        self.api_input.setText(self.config.get_setting('api_base_url', ''))
+        self.profiling_check.setChecked(bool(self.config.get_setting('profiling', False)))
     
     def save_settings(self):
         """Сохраняет настройки"""
@@ -149,6 +215,8 @@ class SettingsDialog(QDialog):
         self.config.set_setting('battlenet_path', self.battlenet_input.text())
         self.config.set_setting('vkplay_path', self.vkplay_input.text())
         self.config.set_setting('ea_path', self.ea_input.text())
+        self.config.set_setting('api_base_url', self.api_input.text().strip())
+        self.config.set_setting('profiling', self.profiling_check.isChecked())
         
         QMessageBox.information(self, "Успех", "Настройки сохранены")
         self.accept()
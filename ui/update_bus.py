@@ -0,0 +1,71 @@
+"""
+Шина обновлений интерфейса
+Потоки пула вызывают post(событие) вместо QTimer.singleShot(0, lambda: ...):
+из потока без цикла событий Qt singleShot ненадежен, а каждое обновление
+текста - отдельная перерисовка. Шина будит главный поток сигналом через
+очередь событий, собирает события за кадр (16 мс) и применяет пачкой, причем
+из нескольких текстов статуса виден только последний.
+"""
+import logging
+from typing import Callable, Dict, Type
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from ui.update_queue import UpdateQueue, UIEvent, Invoke
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 16
+
+
+class UIUpdateBus(QObject):
+    """Доставка событий из потоков пула в главный поток, не чаще раза в кадр
+
+    Шину нужно создать в главном потоке.
+    """
+
+    _wake = pyqtSignal()
+
+    def __init__(self, parent=None, frame_ms: int = FRAME_MS, max_pending: int = 256):
+        super().__init__(parent)
+        self.queue = UpdateQueue(max_pending, on_wake=self._wake.emit)
+        self._handlers: Dict[Type[UIEvent], Callable[[UIEvent], None]] = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(frame_ms)
+        self._timer.timeout.connect(self.flush)
+        # Из потока пула сигнал доставляется через очередь главного потока
+        self._wake.connect(self._schedule_frame)
+        self._dropped_reported = 0
+
+    def on(self, event_type: Type[UIEvent], handler: Callable[[UIEvent], None]):
+        """Обработчик событий типа (вызывается в главном потоке)"""
+        self._handlers[event_type] = handler
+
+    def post(self, event: UIEvent):
+        """Публикует событие; безопасно из любого потока"""
+        self.queue.post(event)
+
+    def _schedule_frame(self):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Применяет накопленные события"""
+        for event in self.queue.drain():
+            try:
+                if isinstance(event, Invoke):
+                    event.func(*event.args)
+                else:
+                    handler = self._handlers.get(type(event))
+                    if handler is None:
+                        logger.warning("Нет обработчика события %s", type(event).__name__)
+                        continue
+                    handler(event)
+            except Exception as e:
+                logger.exception("Ошибка обработки события интерфейса %s: %s", type(event).__name__, e)
+        dropped = self.queue.stats["dropped"]
+        if dropped > self._dropped_reported:
+            logger.warning("Очередь обновлений интерфейса переполнена, отброшено событий: %s",
+                           dropped - self._dropped_reported)
+            self._dropped_reported = dropped
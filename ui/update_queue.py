@@ -0,0 +1,125 @@
+"""
+Очередь обновлений интерфейса без зависимости от Qt
+Потоки пула кладут типизированные события; главный поток забирает их пачкой
+раз в кадр. События с ключом (текст статуса, состояние аренды) схлопываются:
+в пачку попадает только последнее, на место последней публикации. Очередь
+ограничена по событиям с ключом: при переполнении отбрасываются самые старые
+из них. События без ключа (разовые вызовы вроде завершения загрузки каталога)
+не отбрасываются никогда - без них интерфейс может остаться в ожидании.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Callable, Hashable, List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Метка ключей событий без схлопывания в очереди: (_KEYLESS, номер)
+_KEYLESS = object()
+
+
+class UIEvent:
+    """Базовый класс событий; key не None - схлопывать события с этим ключом"""
+
+    @property
+    def key(self) -> Optional[Hashable]:
+        return None
+
+
+@dataclass(frozen=True)
+class StatusText(UIEvent):
+    """Текст строки состояния"""
+    text: str
+
+    @property
+    def key(self) -> Optional[Hashable]:
+        return StatusText
+
+
+@dataclass(frozen=True)
+class RentalUpdate(UIEvent):
+    """Свежее состояние аренды (текст статуса и прогресс)"""
+    rental: Any
+
+    @property
+    def key(self) -> Optional[Hashable]:
+        return RentalUpdate
+
+
+@dataclass(frozen=True)
+class Invoke(UIEvent):
+    """Вызов функции в главном потоке; с coalesce_key повторные вызовы схлопываются"""
+    func: Callable
+    args: tuple = ()
+    coalesce_key: Optional[Hashable] = None
+
+    @property
+    def key(self) -> Optional[Hashable]:
+        return self.coalesce_key
+
+
+class UpdateQueue:
+    """Потокобезопасная ограниченная очередь событий со схлопыванием
+
+    Args:
+        max_pending: Сколько событий с ключом может ждать следующего кадра;
+            события без ключа не ограничены
+        on_wake: Вызывается (вне блокировки) при первом событии после drain -
+            сигнал главному потоку, что пора запланировать кадр
+    """
+
+    def __init__(self, max_pending: int = 256, on_wake: Optional[Callable[[], None]] = None):
+        self.max_pending = max_pending
+        self.on_wake = on_wake
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[Hashable, UIEvent]" = OrderedDict()
+        self._sequence = 0
+        self._keyed = 0
+        self._wake_pending = False
+        self.stats: Dict[str, int] = dict.fromkeys(
+            ("posted", "coalesced", "dropped", "delivered", "batches"), 0)
+
+    def post(self, event: UIEvent):
+        """Добавляет событие (из любого потока)"""
+        key = event.key
+        with self._lock:
+            self.stats["posted"] += 1
+            if key is None:
+                self._sequence += 1
+                key = (_KEYLESS, self._sequence)
+            elif self._pending.pop(key, None) is not None:
+                self.stats["coalesced"] += 1
+            else:
+                self._keyed += 1
+            self._pending[key] = event
+            if self._keyed > self.max_pending:
+                self._drop_oldest_keyed()
+            wake = not self._wake_pending
+            self._wake_pending = True
+        if wake and self.on_wake:
+            self.on_wake()
+
+    def _drop_oldest_keyed(self):
+        for key in self._pending:
+            if not (isinstance(key, tuple) and key and key[0] is _KEYLESS):
+                del self._pending[key]
+                self._keyed -= 1
+                self.stats["dropped"] += 1
+                return
+
+    def drain(self) -> List[UIEvent]:
+        """Забирает накопленные события в порядке публикации (в главном потоке)"""
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._keyed = 0
+            self._wake_pending = False
+            self.stats["delivered"] += len(events)
+            if events:
+                self.stats["batches"] += 1
+        return events
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
@@ -0,0 +1,443 @@
+"""
+Политика окон: скрытие окон Steam по событиям
+Вместо однократного перебора всех окон после входа подписывается на события
+создания и показа окон (SetWinEventHook) и скрывает подходящие окна сразу
+после появления. Если подписка недоступна, окна проверяются опросом.
+Платформа вынесена в отдельный интерфейс, правила проверяются на фейке
+"""
+import ctypes
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Callable, Sequence, Iterable, Set
+
+import psutil
+
+from profiler import timed
+from scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+try:
+    import win32gui
+    import win32con
+    import win32process
+except ImportError:
+    win32gui = None
+    win32con = None
+    win32process = None
+
+
+@dataclass(frozen=True)
+class WindowInfo:
+    """Сведения об окне верхнего уровня"""
+    hwnd: int
+    title: str
+    class_name: str
+    pid: int
+    process_name: str = ""
+
+
+@dataclass(frozen=True)
+class WindowRule:
+    """Правило скрытия (без учета регистра)
+
+    Окно должно принадлежать процессу из process_names (если они заданы) и
+    содержать в заголовке или классе одну из подстрок (если они заданы).
+    Заголовок без процесса не годится для постоянного слежения: "Steam" есть
+    и в названиях игр (SteamWorld Dig), и в окнах браузера со страницами Steam.
+    """
+    title_contains: Sequence[str] = ()
+    class_contains: Sequence[str] = ()
+    process_names: Sequence[str] = ()
+
+    def matches(self, info: WindowInfo) -> bool:
+        if self.process_names and info.process_name.lower() not in self.process_names:
+            return False
+        if not self.title_contains and not self.class_contains:
+            return bool(self.process_names)
+        title = info.title.lower()
+        class_name = info.class_name.lower()
+        return (any(part in title for part in self.title_contains)
+                or any(part in class_name for part in self.class_contains))
+
+
+# Все окна клиента Steam и его встроенного браузера, и только они
+STEAM_RULES = (
+    WindowRule(process_names=("steam.exe", "steamwebhelper.exe")),
+)
+
+
+class WindowPlatform:
+    """Интерфейс оконной системы"""
+
+    def visible_windows(self) -> List[int]:
+        """Видимые окна верхнего уровня"""
+        raise NotImplementedError
+
+    def window_pid(self, hwnd: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def window_text(self, hwnd: int) -> tuple:
+        """(заголовок, класс) окна"""
+        raise NotImplementedError
+
+    def is_window(self, hwnd: int) -> bool:
+        raise NotImplementedError
+
+    def is_visible(self, hwnd: int) -> bool:
+        raise NotImplementedError
+
+    def hide(self, hwnd: int):
+        raise NotImplementedError
+
+    def show(self, hwnd: int):
+        raise NotImplementedError
+
+    def subscribe(self, on_window: Callable[[int], None], on_destroy: Callable[[int], None]) -> bool:
+        """Подписка на появление и уничтожение окон; False - не поддерживается"""
+        return False
+
+    def unsubscribe(self):
+        pass
+
+
+class Win32WindowPlatform(WindowPlatform):
+    """Windows: pywin32 для окон и SetWinEventHook для событий"""
+
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+    GA_ROOT = 2
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        if win32gui is None:
+            raise RuntimeError("pywin32 не установлен")
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id: Optional[int] = None
+        self._callback_ref = None
+
+    def visible_windows(self) -> List[int]:
+        windows = []
+
+        def callback(hwnd, result):
+            if win32gui.IsWindowVisible(hwnd):
+                result.append(hwnd)
+
+        win32gui.EnumWindows(callback, windows)
+        return windows
+
+    def window_pid(self, hwnd: int) -> Optional[int]:
+        try:
+            return win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            return None
+
+    def window_text(self, hwnd: int) -> tuple:
+        return win32gui.GetWindowText(hwnd), win32gui.GetClassName(hwnd)
+
+    def is_window(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindow(hwnd))
+
+    def is_visible(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindowVisible(hwnd))
+
+    def hide(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+        win32gui.ShowWindow(hwnd, win32con.SW_HIDE)
+
+    def show(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_SHOW)
+        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+
+    def subscribe(self, on_window: Callable[[int], None], on_destroy: Callable[[int], None]) -> bool:
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.GetAncestor.restype = wintypes.HWND
+
+        def handle_event(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            if not hwnd or id_object != self.OBJID_WINDOW or id_child != self.CHILDID_SELF:
+                return
+            try:
+                if event == self.EVENT_OBJECT_DESTROY:
+                    on_destroy(hwnd)
+                elif user32.GetAncestor(hwnd, self.GA_ROOT) == hwnd:
+                    on_window(hwnd)
+            except Exception:
+                logger.exception("Ошибка обработки события окна")
+
+        # Ссылку нужно держать, иначе колбэк соберет сборщик мусора
+        self._callback_ref = WinEventProc(handle_event)
+        ready = threading.Event()
+        hooks = []
+
+        def loop():
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+            for first, last in ((self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_SHOW),
+                                (self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE)):
+                hook = user32.SetWinEventHook(first, last, 0, self._callback_ref, 0, 0, flags)
+                if hook:
+                    hooks.append(hook)
+            ready.set()
+            if not hooks:
+                return
+            # События вне процесса доставляются через очередь сообщений этого потока
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+
+        self._thread = threading.Thread(target=loop, name="window-events", daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+        return bool(hooks)
+
+    def unsubscribe(self):
+        if self._thread and self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread.join(timeout=2)
+        self._thread = None
+        self._thread_id = None
+
+
+class FakeWindowPlatform(WindowPlatform):
+    """Оконная система в памяти для проверки правил без Windows"""
+
+    def __init__(self, events: bool = True):
+        self.events = events
+        self._lock = threading.Lock()
+        self._next_hwnd = 100
+        # hwnd -> {"title", "class_name", "pid", "visible"}
+        self.windows: Dict[int, dict] = {}
+        self.process_names: Dict[int, str] = {}
+        self.pid_lookups = 0
+        self._on_window: Optional[Callable[[int], None]] = None
+        self._on_destroy: Optional[Callable[[int], None]] = None
+
+    def create_window(self, title: str, class_name: str = "", pid: int = 1, visible: bool = True) -> int:
+        with self._lock:
+            hwnd = self._next_hwnd
+            self._next_hwnd += 1
+            self.windows[hwnd] = {"title": title, "class_name": class_name, "pid": pid, "visible": visible}
+        if visible and self._on_window:
+            self._on_window(hwnd)
+        return hwnd
+
+    def destroy_window(self, hwnd: int):
+        with self._lock:
+            self.windows.pop(hwnd, None)
+        if self._on_destroy:
+            self._on_destroy(hwnd)
+
+    def show(self, hwnd: int):
+        with self._lock:
+            if hwnd in self.windows:
+                self.windows[hwnd]["visible"] = True
+        if self._on_window:
+            self._on_window(hwnd)
+
+    def hide(self, hwnd: int):
+        with self._lock:
+            if hwnd in self.windows:
+                self.windows[hwnd]["visible"] = False
+
+    def visible_windows(self) -> List[int]:
+        with self._lock:
+            return [hwnd for hwnd, window in self.windows.items() if window["visible"]]
+
+    def window_pid(self, hwnd: int) -> Optional[int]:
+        self.pid_lookups += 1
+        window = self.windows.get(hwnd)
+        return window["pid"] if window else None
+
+    def window_text(self, hwnd: int) -> tuple:
+        window = self.windows.get(hwnd, {})
+        return window.get("title", ""), window.get("class_name", "")
+
+    def is_window(self, hwnd: int) -> bool:
+        return hwnd in self.windows
+
+    def is_visible(self, hwnd: int) -> bool:
+        window = self.windows.get(hwnd)
+        return bool(window and window["visible"])
+
+    def subscribe(self, on_window: Callable[[int], None], on_destroy: Callable[[int], None]) -> bool:
+        if not self.events:
+            return False
+        self._on_window = on_window
+        self._on_destroy = on_destroy
+        return True
+
+    def unsubscribe(self):
+        self._on_window = None
+        self._on_destroy = None
+
+
+class WindowPolicyEnforcer:
+    """Применяет правила скрытия к появляющимся окнам
+
+    Имя процесса-владельца определяется один раз на окно (кэш hwnd -> PID и
+    PID -> имя процесса), поэтому повторные события и опрос дешевы. Имя
+    процесса забывается вместе с последним его окном: Steam перезапускается
+    при каждом входе, и его PID может достаться игре. Пустое имя (нет доступа
+    к процессу) не кэшируется. При наличии событий опрос остается редкой
+    страховкой.
+    """
+
+    def __init__(self, platform: WindowPlatform, rules: Iterable[WindowRule] = STEAM_RULES,
+                 poll_interval: float = 2.0, safety_poll_interval: float = 30.0,
+                 process_name_resolver: Optional[Callable[[int], str]] = None):
+        self.platform = platform
+        self.rules = list(rules)
+        self.poll_interval = poll_interval
+        self.safety_poll_interval = safety_poll_interval
+        self._resolve_process_name = process_name_resolver or self._process_name_from_psutil
+
+        self._lock = threading.RLock()
+        self._pids: Dict[int, int] = {}
+        self._process_names: Dict[int, str] = {}
+        self.hidden: List[int] = []
+        self._hidden_set: Set[int] = set()
+        self._poll_task = None
+        self.event_driven = False
+        self.running = False
+        self.stats = {"events": 0, "polls": 0, "hidden": 0, "max_hide_ms": 0.0}
+
+    @staticmethod
+    def _process_name_from_psutil(pid: int) -> str:
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return ""
+
+    def start(self):
+        """Скрывает уже открытые окна и начинает следить за новыми"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+        self.event_driven = self.platform.subscribe(self._on_window_event, self._forget)
+        self.poll()
+
+        interval = self.safety_poll_interval if self.event_driven else self.poll_interval
+        self._poll_task = get_scheduler().call_every(interval, self.poll, name="window-policy")
+        logger.info("Политика окон запущена (%s + опрос раз в %g с)", 'события' if self.event_driven else 'опрос',
+                    interval)
+
+    def stop(self, restore: bool = True):
+        """Останавливает слежение и (по умолчанию) показывает скрытые окна"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+        get_scheduler().cancel(self._poll_task)
+        self._poll_task = None
+        self.platform.unsubscribe()
+
+        with self._lock:
+            hidden = list(self.hidden)
+            self.hidden.clear()
+            self._hidden_set.clear()
+        if restore:
+            for hwnd in hidden:
+                try:
+                    if self.platform.is_window(hwnd):
+                        self.platform.show(hwnd)
+                except Exception as e:
+                    logger.warning("Ошибка при показе окна: %s", e, extra={"sample": True})
+
+    def _on_window_event(self, hwnd: int):
+        self.stats["events"] += 1
+        self._evaluate(hwnd, time.perf_counter())
+
+    def _forget(self, hwnd: int):
+        """Окно уничтожено: hwnd может быть переиспользован другим окном"""
+        with self._lock:
+            pid = self._pids.pop(hwnd, None)
+            # Последнее окно процесса: процесс мог завершиться, а PID - перейти к другому
+            if pid is not None and pid not in self._pids.values():
+                self._process_names.pop(pid, None)
+            if hwnd in self._hidden_set:
+                self._hidden_set.discard(hwnd)
+                self.hidden.remove(hwnd)
+
+    def poll(self):
+        """Проверяет все видимые окна (начальный проход и страховочный опрос)"""
+        if not self.running:
+            return
+        self.stats["polls"] += 1
+        with timed("windows.enumerate"):
+            visible = self.platform.visible_windows()
+        with self._lock:
+            # Уничтоженные окна, о которых не пришло событие
+            for hwnd in [hwnd for hwnd in self._pids if not self.platform.is_window(hwnd)]:
+                self._forget(hwnd)
+        started = time.perf_counter()
+        with timed("windows.evaluate"):
+            for hwnd in visible:
+                self._evaluate(hwnd, started)
+
+    def _describe(self, hwnd: int) -> Optional[WindowInfo]:
+        with self._lock:
+            pid = self._pids.get(hwnd)
+        if pid is None:
+            pid = self.platform.window_pid(hwnd)
+            if pid is None:
+                return None
+            with self._lock:
+                self._pids[hwnd] = pid
+        with self._lock:
+            process_name = self._process_names.get(pid)
+        if process_name is None:
+            process_name = self._resolve_process_name(pid) or ""
+            # Пустое имя (AccessDenied) не запоминаем: доступ может появиться позже
+            if process_name:
+                with self._lock:
+                    self._process_names[pid] = process_name
+        try:
+            title, class_name = self.platform.window_text(hwnd)
+        except Exception:
+            return None
+        return WindowInfo(hwnd, title, class_name, pid, process_name)
+
+    def _evaluate(self, hwnd: int, started: float):
+        if not self.running or not self.platform.is_visible(hwnd):
+            return
+        info = self._describe(hwnd)
+        if info is None or not any(rule.matches(info) for rule in self.rules):
+            return
+        try:
+            self.platform.hide(hwnd)
+        except Exception as e:
+            logger.warning("Ошибка при скрытии окна Steam: %s", e, extra={"sample": True})
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            if hwnd not in self._hidden_set:
+                self._hidden_set.add(hwnd)
+                self.hidden.append(hwnd)
+            self.stats["hidden"] += 1
+            self.stats["max_hide_ms"] = max(self.stats["max_hide_ms"], elapsed_ms)
+        logger.debug("Скрыто окно %s '%s' (%s) за %.2f мс", hwnd, info.title, info.process_name, elapsed_ms)
+
+
+def create_window_platform() -> Optional[WindowPlatform]:
+    """Оконная платформа текущей ОС или None, если она не поддерживается"""
+    try:
+        return Win32WindowPlatform()
+    except Exception:
+        return None